@@ -21,19 +21,325 @@
 
 from __future__ import division
 from math import ceil
-from multiprocessing import (cpu_count, Process, Queue as ProcessQueue)
+import os.path
 from six import string_types
-import warnings
+from six.moves.urllib.parse import urlparse
+
+import numpy
 
 from glue.lal import (Cache, CacheEntry)
 
 from astropy.io.registry import _get_valid_format
 
 from .. import version
+from ..utils.parallel import (map_shared, share)
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __version__ = version.version
 
+__all__ = ['IndexedCache', 'open_cache', 'cache_segments']
+
+
+class IndexedCache(object):
+    """A cache of data files indexed by their GPS [start, end) times.
+
+    Unlike a :class:`glue.lal.Cache`, which holds one
+    :class:`~glue.lal.CacheEntry` per file, an `IndexedCache` stores the
+    start and end times of each file in sorted `numpy.ndarray` columns,
+    so that :meth:`sieve` is a binary search, and :meth:`segments` and
+    :meth:`gaps` are computed without creating any per-file Python
+    objects. :class:`~glue.lal.CacheEntry` objects are only created on
+    iteration, indexing, or :meth:`to_cache`.
+
+    Parameters
+    ----------
+    url : `list` of `str`
+        URL (or path) of each file
+    start : `numpy.ndarray`
+        GPS start time of each file
+    end : `numpy.ndarray`
+        GPS end time of each file
+    observatory : `list` of `str`, optional
+        observatory identifier of each file, defaults to ``'-'``
+    description : `list` of `str`, optional
+        description of each file, defaults to ``'-'``
+
+    Notes
+    -----
+    Entries are sorted by start time on creation.
+    """
+    def __init__(self, url, start, end, observatory=None, description=None):
+        url = numpy.asarray(url, dtype=object)
+        start = numpy.asarray(start, dtype=numpy.float64)
+        end = numpy.asarray(end, dtype=numpy.float64)
+        if observatory is None:
+            observatory = numpy.repeat('-', url.size).astype(object)
+        if description is None:
+            description = numpy.repeat('-', url.size).astype(object)
+        observatory = numpy.asarray(observatory, dtype=object)
+        description = numpy.asarray(description, dtype=object)
+        if not (url.size == start.size == end.size == observatory.size ==
+                description.size):
+            raise ValueError("All IndexedCache columns must have the "
+                             "same length")
+        order = numpy.argsort(start, kind='mergesort')
+        if (order[1:] < order[:-1]).any():
+            url, start, end, observatory, description = (
+                url[order], start[order], end[order], observatory[order],
+                description[order])
+        self.url = url
+        self.start = start
+        self.end = end
+        self.observatory = observatory
+        self.description = description
+        # running maximum of end times, for binary search on end
+        self._maxend = numpy.maximum.accumulate(end) if end.size else end
+
+    # -------------------------------------------------------------------
+    # construction
+
+    @classmethod
+    def from_cache(cls, cache):
+        """Build an `IndexedCache` from a :class:`~glue.lal.Cache`.
+
+        Parameters
+        ----------
+        cache : :class:`~glue.lal.Cache`, `list`
+            list of :class:`~glue.lal.CacheEntry` objects
+
+        Returns
+        -------
+        cache : `IndexedCache`
+            a new cache indexing the same files
+        """
+        if isinstance(cache, cls):
+            return cache
+        n = len(cache)
+        url = numpy.empty(n, dtype=object)
+        obs = numpy.empty(n, dtype=object)
+        desc = numpy.empty(n, dtype=object)
+        start = numpy.empty(n, dtype=numpy.float64)
+        end = numpy.empty(n, dtype=numpy.float64)
+        for i, entry in enumerate(cache):
+            url[i] = entry.url
+            obs[i] = entry.observatory
+            desc[i] = entry.description
+            start[i], end[i] = entry.segment
+        return cls(url, start, end, observatory=obs, description=desc)
+
+    @classmethod
+    def read(cls, lcf):
+        """Read a LAL-format cache file into an `IndexedCache`.
+
+        The file is split into columns in one pass, rather than being
+        parsed line-by-line.
+
+        Parameters
+        ----------
+        lcf : `str`, `file`
+            path of, or open file object for, a LAL-format cache file,
+            with five columns: observatory, description, GPS start time,
+            duration, and URL
+
+        Returns
+        -------
+        cache : `IndexedCache`
+            a new cache indexing the files listed in the cache file
+
+        Raises
+        ------
+        ValueError
+            if the file cannot be parsed as a LAL-format cache
+        """
+        if isinstance(lcf, file):
+            words = lcf.read().split()
+            name = lcf.name
+        else:
+            with open(lcf, 'r') as f:
+                words = f.read().split()
+            name = lcf
+        if len(words) % 5:
+            raise ValueError("Cannot parse %s as a LAL-format cache file, "
+                             "each line must have five columns" % name)
+        cols = numpy.array(words, dtype=object).reshape(-1, 5)
+        start = cols[:, 2].astype(numpy.float64)
+        end = start + cols[:, 3].astype(numpy.float64)
+        return cls(cols[:, 4], start, end, observatory=cols[:, 0],
+                   description=cols[:, 1])
+
+    # -------------------------------------------------------------------
+    # list-like interface
+
+    def __len__(self):
+        return self.url.size
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, long, numpy.integer)):
+            return self._entry(item)
+        return self._take(item)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self._entry(i)
+
+    def __repr__(self):
+        return '<IndexedCache(%d entries)>' % len(self)
+
+    def _entry(self, i):
+        """Build the :class:`~glue.lal.CacheEntry` for the ``i``'th file.
+        """
+        from ..segments import Segment
+        return CacheEntry(self.observatory[i], self.description[i],
+                          Segment(float(self.start[i]), float(self.end[i])),
+                          self.url[i])
+
+    def _take(self, index):
+        """Return a new `IndexedCache` with a subset of the entries.
+        """
+        new = object.__new__(self.__class__)
+        for attr in ['url', 'start', 'end', 'observatory', 'description']:
+            setattr(new, attr, getattr(self, attr)[index])
+        new._maxend = (numpy.maximum.accumulate(new.end) if new.end.size
+                       else new.end)
+        return new
+
+    def sort(self, *args, **kwargs):
+        """Does nothing, entries are always sorted by start time.
+
+        This method is provided for compatibility with
+        :class:`~glue.lal.Cache`.
+        """
+        pass
+
+    def pfnlist(self):
+        """Return the list of physical file names in this cache.
+        """
+        return [urlparse(url).path if '://' in url else url for
+                url in self.url]
+
+    def to_cache(self):
+        """Convert this `IndexedCache` into a :class:`~glue.lal.Cache`.
+        """
+        return Cache(self)
+
+    # -------------------------------------------------------------------
+    # segment handling
+
+    @property
+    def span(self):
+        """The GPS [start, end) `~gwpy.segments.Segment` of this cache.
+        """
+        from ..segments import Segment
+        if not len(self):
+            raise ValueError("Cannot determine span of empty cache")
+        return Segment(float(self.start[0]), float(self._maxend[-1]))
+
+    def sieve(self, segment=None):
+        """Return the entries that overlap the given segment.
+
+        Parameters
+        ----------
+        segment : `~gwpy.segments.Segment`
+            GPS [start, end) interval of interest
+
+        Returns
+        -------
+        cache : `IndexedCache`
+            a new cache containing only those entries that intersect
+            ``segment``
+        """
+        if segment is None:
+            return self
+        a, b = map(float, segment)
+        # entries [lo, hi) are the only ones that might overlap
+        hi = numpy.searchsorted(self.start, b, side='left')
+        lo = numpy.searchsorted(self._maxend[:hi], a, side='right')
+        keep = numpy.arange(lo, hi)[self.end[lo:hi] > a]
+        if keep.size == hi - lo:
+            return self._take(slice(lo, hi))
+        return self._take(keep)
+
+    def checkfilesexist(self, on_missing='warn'):
+        """Find which files in this cache exist on disk.
+
+        Parameters
+        ----------
+        on_missing : `str`, optional, default: ``'warn'``
+            what to do if files are missing, one of ``'warn'``,
+            ``'error'``, or ``'ignore'``
+
+        Returns
+        -------
+        found, missing : `IndexedCache`
+            the entries that were, and were not found
+        """
+        if on_missing not in ['warn', 'error', 'ignore']:
+            raise ValueError("on_missing must be 'warn', 'error', or "
+                             "'ignore'.")
+        exists = numpy.array([os.path.isfile(f) for f in self.pfnlist()],
+                             dtype=bool)
+        nmissing = len(self) - exists.sum()
+        if nmissing and on_missing == 'error':
+            raise ValueError("%d of %d files in the cache were not found"
+                             % (nmissing, len(self)))
+        elif nmissing and on_missing == 'warn':
+            import warnings
+            warnings.warn("%d of %d files in the cache were not found"
+                          % (nmissing, len(self)))
+        return self._take(exists), self._take(~exists)
+
+    def _coalesce(self):
+        """Return the start and end arrays of the contiguous coverage.
+        """
+        if not len(self):
+            return self.start, self.end
+        breaks = numpy.flatnonzero(self.start[1:] > self._maxend[:-1]) + 1
+        starts = self.start[numpy.concatenate(([0], breaks))]
+        ends = self._maxend[numpy.concatenate((breaks - 1, [len(self) - 1]))]
+        return starts, ends
+
+    def segments(self):
+        """Return the coverage of this cache as a `SegmentList`.
+
+        Files are not checked on disk, see :meth:`checkfilesexist`.
+
+        Returns
+        -------
+        segments : `~gwpy.segments.SegmentList`
+            a coalesced list of segments during which data are available
+        """
+        from ..segments import (Segment, SegmentList)
+        starts, ends = self._coalesce()
+        return SegmentList(Segment(a, b) for (a, b) in
+                           zip(starts.tolist(), ends.tolist()))
+
+    def gaps(self, segment=None):
+        """Return the gaps in the coverage of this cache.
+
+        Parameters
+        ----------
+        segment : `~gwpy.segments.Segment`, optional
+            GPS [start, end) interval over which to find gaps, defaults
+            to the :attr:`span` of this cache
+
+        Returns
+        -------
+        gaps : `~gwpy.segments.SegmentList`
+            a list of segments during which no data are available
+        """
+        from ..segments import (Segment, SegmentList)
+        if segment is None:
+            segment = self.span
+        a, b = map(float, segment)
+        starts, ends = self.sieve(segment)._coalesce()
+        gstarts = numpy.concatenate(([a], ends))
+        gends = numpy.concatenate((starts, [b]))
+        gstarts = numpy.clip(gstarts, a, b)
+        gends = numpy.clip(gends, a, b)
+        keep = gends > gstarts
+        return SegmentList(Segment(x, y) for (x, y) in
+                           zip(gstarts[keep].tolist(), gends[keep].tolist()))
+
 
 def open_cache(lcf):
     """Read a LAL-format cache file into memory as a
@@ -114,7 +420,9 @@ def read_cache(cache, target, nproc, post, *args, **kwargs):
         other positional arguments to pass to the target.read()
         classmethod.
     **kwargs
-        keyword arguments to pass to the target.read() classmethod.
+        keyword arguments to pass to the target.read() classmethod,
+        the ``backend`` keyword (``'process'`` or ``'thread'``) selects
+        the type of parallel worker, see :mod:`gwpy.utils.parallel`.
 
     Returns
     -------
@@ -149,11 +457,8 @@ def read_cache(cache, target, nproc, post, *args, **kwargs):
         cache.sort(key=lambda ce: ce.segment[0])
 
     # force one file per process minimum
-    nproc = min(nproc, len(cache))
-    if nproc > cpu_count():
-        warnings.warn("Using %d processes on a %d-core machine is "
-                      "unrecommended...but not forbidden."
-                      % (nproc, cpu_count()))
+    nsplit = min(nproc, len(cache))
+    backend = kwargs.pop('backend', 'process')
 
     # work out underlying data type
     try:
@@ -167,42 +472,20 @@ def read_cache(cache, target, nproc, post, *args, **kwargs):
         if 'format' not in kwargs:
             raise
 
-    if nproc <= 1:
+    if nsplit <= 1:
         return target.read(cache, *args, **kwargs)
 
-    # define how to read each sub-cache
-    def _read(q, sc, i):
-        try:
-            q.put((i, target.read(sc, *args, **kwargs)))
-        except Exception as e:
-            q.put(e)
-
     # separate cache into parts
-    fperproc = int(ceil(len(cache) / nproc))
+    fperproc = int(ceil(len(cache) / nsplit))
     subcaches = [cache.__class__(cache[i:i+fperproc]) for
                  i in range(0, len(cache), fperproc)]
 
-    # start all processes
-    queue = ProcessQueue(nproc)
-    proclist = []
-    for i, subcache in enumerate(subcaches):
-        process = Process(target=_read, args=(queue, subcache, i))
-        process.daemon = True
-        proclist.append(process)
-        process.start()
-
-    # get data and block
-    pout = []
-    for i in range(len(proclist)):
-        result = queue.get()
-        if isinstance(result, Exception):
-            raise result
-        pout.append(result)
-    for process in proclist:
-        process.join()
+    # read each sub-cache in a pool of workers
+    tasks = [(target, subcache, backend, args, kwargs) for
+             subcache in subcaches]
+    data = map_shared(_read_worker, tasks, nproc=nproc, backend=backend)
 
     # combine and return
-    data = zip(*sorted(pout, key=lambda out: out[0]))[1]
     try:
         out = data[0].copy()
     except AttributeError:
@@ -216,6 +499,15 @@ def read_cache(cache, target, nproc, post, *args, **kwargs):
         return out
 
 
+def _read_worker(task):
+    """Read a sub-cache inside a parallel worker.
+
+    Array data are returned through shared memory.
+    """
+    target, cache, backend, args, kwargs = task
+    return share(target.read(cache, *args, **kwargs), backend=backend)
+
+
 def read_cache_factory(target):
     """Generate a read_cache method specific to a given target class.
 
@@ -266,6 +558,11 @@ def cache_segments(*caches, **kwargs):
     nframes = sum(len(c) for c in caches)
     if nframes == 0:
         return out
+    if all(isinstance(c, IndexedCache) for c in caches):
+        for cache in caches:
+            found, _ = cache.checkfilesexist(on_missing=on_missing)
+            out.extend(found.segments())
+        return out.coalesce()
     for cache in caches:
         found, _ = cache.checkfilesexist(on_missing=on_missing)
         # build segment for this cache
@@ -32,6 +32,7 @@ from glue import iterutils
 from glue.ligolw.table import Table
 
 from ..table.utils import get_table_column
+from ..table.events import EventTable
 from .axes import Axes
 from .core import Plot
 from ..data import Series
@@ -201,7 +202,7 @@ class HistogramPlot(Plot):
             dataset = data.pop(0)
             if isinstance(dataset, Series):
                 ax.hist_series(dataset, **histargs)
-            elif isinstance(dataset, Table):
+            elif isinstance(dataset, (Table, EventTable)):
                 column = data.pop()
                 ax.hist_table(dataset, column, **histargs)
             else:
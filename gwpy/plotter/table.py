@@ -44,6 +44,7 @@ from .timeseries import (TimeSeriesAxes, TimeSeriesPlot)
 from .spectrum import SpectrumPlot
 from .utils import float_to_latex
 from ..table.utils import (get_table_column, get_row_value)
+from ..table.events import EventTable
 
 __all__ = ['EventTableAxes', 'EventTablePlot']
 
@@ -64,14 +65,14 @@ class EventTableAxes(TimeSeriesAxes):
         Parameters
         ----------
         *args
-            a single :class:`~glue.ligolw.table.Table` (or sub-class)
-            or anything valid for
+            a single :class:`~glue.ligolw.table.Table` (or sub-class),
+            or `~gwpy.table.EventTable`, or anything valid for
             :meth:`~gwpy.plotter.TimeSeriesPlot.plot`.
         **kwargs
             keyword arguments applicable to
             :meth:`~matplotlib.axes.Axes.plot`
         """
-        if isinstance(args[0], Table):
+        if isinstance(args[0], (Table, EventTable)):
             return self.plot_table(*args, **kwargs)
         else:
             return super(EventTableAxes, self).plot(*args, **kwargs)
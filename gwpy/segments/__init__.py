@@ -29,6 +29,7 @@ __author__ = "Duncan Macleod <duncan.macleod@ligo.org>"
 __version__ = version.version
 
 from .segments import (Segment, SegmentList, SegmentListDict)
+from .array import SegmentArray
 from .flag import *
 from .io import *
 
@@ -36,6 +37,7 @@ __all__ = [
     'Segment',
     'SegmentList',
     'SegmentListDict',
+    'SegmentArray',
     'DataQualityFlag',
     'DataQualityDict',
 ]
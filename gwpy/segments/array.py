@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compact segment lists stored as arrays of GPS times.
+
+The `SegmentList` inherits from the pure-Python
+:class:`glue.segments.segmentlist`, which stores each interval as a
+separate `Segment` object, so that set operations on lists of many
+thousands of segments are very slow.
+The `SegmentArray` stores the same information as two arrays, one of
+start times and one of end times, and implements all set operations as
+a single sort-and-sweep over the boundaries of its operands.
+Segments with `LIGOTimeGPS` bounds are stored as integer nanoseconds,
+so that no precision is lost.
+"""
+
+import numbers
+import operator
+
+import numpy
+
+from glue.segments import infinity
+
+from .. import version
+from ..time import LIGOTimeGPS
+from .segments import (Segment, SegmentList)
+
+__author__ = "Duncan Macleod <duncan.macleod@ligo.org>"
+__version__ = version.version
+
+__all__ = ['SegmentArray']
+
+NANOSECONDS = 1000000000
+
+# nanosecond representation of +/- infinity
+NS_INF = numpy.iinfo(numpy.int64).max
+
+
+class SegmentArray(object):
+    """A list of GPS [start, end) segments, stored as two arrays.
+
+    All set operations (``&``, ``|``, ``-``, ``~``) return a new,
+    coalesced `SegmentArray`, that is one where the segments are sorted,
+    and none overlap or touch.
+
+    Parameters
+    ----------
+    start : `numpy.ndarray`, `list`
+        the GPS start time of each segment
+    end : `numpy.ndarray`, `list`
+        the GPS end time of each segment
+    ns : `bool`, optional, default: `False`
+        if `True`, ``start`` and ``end`` are integer GPS nanoseconds
+
+    Notes
+    -----
+    Times are held in an array of whatever numeric type they are given,
+    so that integer segments stay as integers. Any `~glue.segments.infinity`
+    (e.g. from the complement of a list) is stored as a ``float`` infinity,
+    and restored when converting back to a `SegmentList`.
+
+    Segments with `LIGOTimeGPS` bounds are stored as `int64` nanoseconds
+    (with infinity stored as ``+/-NS_INF``), and converted back to
+    `LIGOTimeGPS` exactly. Operations combining nanosecond and other
+    lists return nanosecond lists.
+    """
+    def __init__(self, start=(), end=(), ns=False):
+        self.ns = ns
+        if ns:
+            self.start = numpy.asarray(start, dtype=numpy.int64)
+            self.end = numpy.asarray(end, dtype=numpy.int64)
+        else:
+            self.start = numpy.asarray(start)
+            self.end = numpy.asarray(end)
+        if self.start.shape != self.end.shape or self.start.ndim != 1:
+            raise ValueError("start and end must be one-dimensional arrays "
+                             "of the same length")
+
+    # -------------------------------------------
+    # conversions
+
+    @classmethod
+    def from_segmentlist(cls, segmentlist):
+        """Build a new `SegmentArray` from a list of segments.
+
+        Parameters
+        ----------
+        segmentlist : `SegmentList`, `list`
+            list of ``(start, end)`` segments
+
+        Returns
+        -------
+        segmentarray : `SegmentArray`
+            a new `SegmentArray` with the same segments, in the same order
+        """
+        if isinstance(segmentlist, cls):
+            return segmentlist
+        times = list(zip(*segmentlist)) or [(), ()]
+        start = numpy.asarray(times[0])
+        end = numpy.asarray(times[1])
+        if _has_gps(start) or _has_gps(end):
+            return cls(_to_ns(start), _to_ns(end), ns=True)
+        return cls(_to_array(start), _to_array(end))
+
+    def to_segmentlist(self):
+        """Convert this `SegmentArray` into a `SegmentList`.
+
+        Returns
+        -------
+        segmentlist : `SegmentList`
+            a new list of `Segments <Segment>`, in the same order
+        """
+        return SegmentList(iter(self))
+
+    def to_seconds(self):
+        """Return the segment bounds as arrays of GPS seconds.
+
+        Returns
+        -------
+        start, end : `numpy.ndarray`
+            the `float64` GPS start and end times of each segment
+        """
+        if not self.ns:
+            return (self.start.astype(numpy.float64),
+                    self.end.astype(numpy.float64))
+        return _ns_to_seconds(self.start), _ns_to_seconds(self.end)
+
+    def to_ns(self):
+        """Return a copy of this list, with times stored as nanoseconds.
+        """
+        if self.ns:
+            return self
+        return type(self)(_to_ns(self.start), _to_ns(self.end), ns=True)
+
+    # -------------------------------------------
+    # list methods
+
+    def __len__(self):
+        return self.start.size
+
+    def __iter__(self):
+        convert = self.ns and _from_ns or _from_float
+        return (Segment(convert(a), convert(b)) for (a, b) in
+                zip(self.start.tolist(), self.end.tolist()))
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, numpy.integer)):
+            convert = self.ns and _from_ns or _from_float
+            return Segment(convert(self.start[item].tolist()),
+                           convert(self.end[item].tolist()))
+        return type(self)(self.start[item], self.end[item], ns=self.ns)
+
+    def __eq__(self, other):
+        a, b = _common(self, self.from_segmentlist(other))
+        return (numpy.array_equal(a.start, b.start) and
+                numpy.array_equal(a.end, b.end))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __abs__(self):
+        """Total duration of the segments in this `SegmentArray`.
+
+        The segments are not coalesced first, use
+        ``abs(segarray.coalesce())`` to get the livetime.
+        For nanosecond lists, the duration is returned as a
+        `LIGOTimeGPS`.
+        """
+        if not self.ns:
+            return (self.end - self.start).sum()
+        if (numpy.abs(self.start) == NS_INF).any() or (
+                numpy.abs(self.end) == NS_INF).any():
+            return numpy.inf
+        return LIGOTimeGPS(*divmod(int((self.end - self.start).sum()),
+                                   NANOSECONDS))
+
+    def __repr__(self):
+        return "<%s(%d segments)>" % (type(self).__name__, len(self))
+
+    def extent(self):
+        """Return the smallest `Segment` containing all of these segments.
+
+        Raises
+        ------
+        ValueError
+            if this `SegmentArray` is empty
+        """
+        if not len(self):
+            raise ValueError("empty list")
+        convert = self.ns and _from_ns or _from_float
+        return Segment(convert(self.start.min().tolist()),
+                       convert(self.end.max().tolist()))
+
+    # -------------------------------------------
+    # set operations
+
+    def coalesce(self):
+        """Return a sorted copy of this list, with overlapping and
+        touching segments merged.
+
+        Empty segments are removed.
+        """
+        return _sweep(lambda a: a, self)
+
+    def __or__(self, other):
+        return _sweep(operator.or_, self, self.from_segmentlist(other))
+
+    def __and__(self, other):
+        return _sweep(operator.and_, self, self.from_segmentlist(other))
+
+    def __sub__(self, other):
+        return _sweep(lambda a, b: a & ~b, self,
+                      self.from_segmentlist(other))
+
+    def __invert__(self):
+        return _sweep(lambda a, b: b & ~a, self,
+                      type(self)([-numpy.inf], [numpy.inf]))
+
+    def _shift(self, times, x):
+        """Add ``x`` seconds to an array of times, keeping infinities.
+        """
+        if not self.ns:
+            return times + x
+        return numpy.where(numpy.abs(times) == NS_INF, times,
+                           times + _to_ns([x])[0])
+
+    __add__ = __or__
+
+    # -------------------------------------------
+    # segment operations
+
+    def protract(self, x):
+        """Move each segment's bounds outward by ``x``, and coalesce.
+        """
+        return type(self)(self._shift(self.start, -x),
+                          self._shift(self.end, x), ns=self.ns).coalesce()
+
+    def contract(self, x):
+        """Move each segment's bounds inward by ``x``, and coalesce.
+
+        Segments contracted to zero (or negative) length are removed.
+        """
+        start = self._shift(self.start, x)
+        end = self._shift(self.end, -x)
+        # inverted segments must not reach the sweep, where they would
+        # cut holes in their neighbours
+        keep = start < end
+        return type(self)(start[keep], end[keep], ns=self.ns).coalesce()
+
+    def shift(self, x):
+        """Return a copy of this list with every segment moved by ``x``.
+        """
+        return type(self)(self._shift(self.start, x),
+                          self._shift(self.end, x), ns=self.ns)
+
+    def round(self):
+        """Round each segment out to the enclosing integer boundaries,
+        and coalesce.
+
+        Returns
+        -------
+        segmentarray : `SegmentArray`
+            a new list, holding integer times unless any segment is
+            unbounded
+        """
+        if self.ns:
+            # round in integer nanoseconds, then restore infinities
+            start = (self.start // NANOSECONDS).astype(numpy.float64)
+            end = (-(-self.end // NANOSECONDS)).astype(numpy.float64)
+            start[self.start == -NS_INF] = -numpy.inf
+            end[self.end == NS_INF] = numpy.inf
+        else:
+            start = numpy.floor(self.start)
+            end = numpy.ceil(self.end)
+        if numpy.isfinite(start).all() and numpy.isfinite(end).all():
+            start = start.astype(numpy.int64)
+            end = end.astype(numpy.int64)
+        return type(self)(start, end).coalesce()
+
+
+# ---------------------------------------------------------------------------
+# utilities
+
+def _to_array(times):
+    """Convert a sequence of GPS times into a numeric array.
+
+    Objects that numpy doesn't understand (e.g. `LIGOTimeGPS` or
+    `~glue.segments.infinity`) are converted to `float`.
+    """
+    times = numpy.asarray(times)
+    if times.dtype.kind not in 'iuf':
+        times = numpy.array([_to_float(t) for t in times.tolist()],
+                            dtype=numpy.float64)
+    return times
+
+
+def _has_gps(times):
+    """Return `True` if a sequence of times contains any `LIGOTimeGPS`.
+    """
+    return times.dtype.kind == 'O' and any(
+        hasattr(t, 'nanoseconds') or hasattr(t, 'gpsNanoSeconds') for
+        t in times.tolist())
+
+
+def _to_ns(times):
+    """Convert a sequence of GPS times into an `int64` array of
+    nanoseconds, with infinities stored as ``+/-NS_INF``.
+    """
+    times = numpy.asarray(times)
+    if times.dtype.kind in 'iu':
+        return times.astype(numpy.int64) * NANOSECONDS
+    if times.dtype.kind == 'f':
+        inf = numpy.isinf(times)
+        finite = numpy.where(inf, 0, times)
+        sec = numpy.floor(finite)
+        out = (sec.astype(numpy.int64) * NANOSECONDS +
+               numpy.round((finite - sec) * 1e9).astype(numpy.int64))
+        out[inf] = numpy.sign(times[inf]).astype(numpy.int64) * NS_INF
+        return out
+    return numpy.array([_gps_to_ns(t) for t in times.tolist()],
+                       dtype=numpy.int64)
+
+
+def _gps_to_ns(t):
+    """Convert a single GPS time into integer nanoseconds.
+    """
+    if isinstance(t, infinity):
+        return t > 0 and NS_INF or -NS_INF
+    if hasattr(t, 'gpsSeconds'):
+        return t.gpsSeconds * NANOSECONDS + t.gpsNanoSeconds
+    if isinstance(t, numbers.Integral):
+        return t * NANOSECONDS
+    if not isinstance(t, LIGOTimeGPS):
+        t = LIGOTimeGPS(t)
+    return t.seconds * NANOSECONDS + t.nanoseconds
+
+
+def _from_ns(t):
+    """Convert integer nanoseconds into a `LIGOTimeGPS`.
+    """
+    if t == NS_INF:
+        return infinity()
+    elif t == -NS_INF:
+        return -infinity()
+    return LIGOTimeGPS(*divmod(t, NANOSECONDS))
+
+
+def _ns_to_seconds(times):
+    """Convert an array of nanoseconds into `float64` seconds.
+    """
+    sec, nsec = divmod(times, NANOSECONDS)
+    out = sec.astype(numpy.float64) + nsec * 1e-9
+    out[times == NS_INF] = numpy.inf
+    out[times == -NS_INF] = -numpy.inf
+    return out
+
+
+def _common(*operands):
+    """Convert a number of `SegmentArrays` to a common representation.
+
+    If any operand stores nanoseconds, all are converted to nanoseconds.
+    """
+    if any(seg.ns for seg in operands):
+        return [seg.to_ns() for seg in operands]
+    return list(operands)
+
+
+def _to_float(t):
+    if isinstance(t, infinity):
+        return t > 0 and numpy.inf or -numpy.inf
+    return float(t)
+
+
+def _from_float(t):
+    if t == numpy.inf:
+        return infinity()
+    elif t == -numpy.inf:
+        return -infinity()
+    return t
+
+
+def _sweep(op, *operands):
+    """Evaluate a set operation over a number of `SegmentArrays`.
+
+    The start and end times of all operands are sorted together, and the
+    number of segments from each operand covering each interval between
+    consecutive boundaries is counted as a running sum of +1 (for each
+    start) and -1 (for each end). ``op`` is then applied to the boolean
+    arrays saying whether each operand covers each interval, and runs of
+    covered intervals are joined into the output segments.
+
+    Parameters
+    ----------
+    op : `callable`
+        function taking one boolean array per operand, and returning
+        a boolean array saying which intervals are in the output
+    *operands
+        one or more `SegmentArray`
+
+    Returns
+    -------
+    segmentarray : `SegmentArray`
+        a new, coalesced list of segments
+    """
+    operands = _common(*operands)
+    ns = operands[0].ns
+    times = numpy.concatenate([numpy.concatenate((seg.start, seg.end)) for
+                               seg in operands])
+    order = numpy.argsort(times, kind='mergesort')
+    times = times[order]
+    # only the state after the last boundary at each time matters
+    last = numpy.ones(times.size, dtype=bool)
+    last[:-1] = times[1:] != times[:-1]
+    bounds = times[last]
+    if not bounds.size:
+        return SegmentArray(bounds, bounds, ns=ns)
+    covered = []
+    offset = 0
+    for seg in operands:
+        n = len(seg)
+        delta = numpy.zeros(times.size, dtype=numpy.int64)
+        delta[offset:offset + n] = 1
+        delta[offset + n:offset + 2 * n] = -1
+        covered.append(delta[order].cumsum()[last][:-1] > 0)
+        offset += 2 * n
+    keep = numpy.zeros(bounds.size + 1, dtype=numpy.int8)
+    keep[1:bounds.size] = op(*covered)
+    edges = numpy.diff(keep)
+    return SegmentArray(bounds[edges == 1], bounds[edges == -1], ns=ns)
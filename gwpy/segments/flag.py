@@ -31,7 +31,6 @@ import re
 import warnings
 from urlparse import urlparse
 from copy import copy as shallowcopy
-from math import (floor, ceil)
 
 try:
     from collections import OrderedDict
@@ -45,6 +44,9 @@ from .. import version
 from ..utils.deps import with_import
 from ..io import (reader, writer)
 from .segments import Segment, SegmentList
+from .array import SegmentArray
+from .querycache import get_segment_cache
+from .query import query_segments
 
 __version__ = version.version
 __author__ = "Duncan Macleod <duncan.macleod@ligo.org>"
@@ -192,12 +194,17 @@ class DataQualityFlag(object):
         """The set of segments during which this `DataQualityFlag` was
         active.
         """
+        if isinstance(self._active, SegmentArray):
+            self._active = self._ListClass(map(self._EntryClass,
+                                               self._active))
         return self._active
 
     @active.setter
     def active(self, segmentlist):
         if segmentlist is None:
             del self.active
+        elif isinstance(segmentlist, SegmentArray):
+            self._active = segmentlist
         else:
             self._active = self._ListClass(map(self._EntryClass, segmentlist))
 
@@ -210,12 +217,17 @@ class DataQualityFlag(object):
         """The set of segments during which this `DataQualityFlag` was
         known, and its state was well defined.
         """
+        if isinstance(self._known, SegmentArray):
+            self._known = self._ListClass(map(self._EntryClass,
+                                              self._known))
         return self._known
 
     @known.setter
     def known(self, segmentlist):
         if segmentlist is None:
             del self.known
+        elif isinstance(segmentlist, SegmentArray):
+            self._known = segmentlist
         else:
             self._known = self._ListClass(map(self._EntryClass, segmentlist))
 
@@ -326,7 +338,7 @@ class DataQualityFlag(object):
 
         :type: `Segment`
         """
-        return self.known.extent()
+        return self._segmentarray('known').extent()
 
     @property
     def livetime(self):
@@ -334,7 +346,7 @@ class DataQualityFlag(object):
 
         :type: `float`
         """
-        return abs(self.active)
+        return abs(self._segmentarray('active'))
 
     @property
     def regular(self):
@@ -342,7 +354,8 @@ class DataQualityFlag(object):
 
         :type: `bool`
         """
-        return abs(self.active - self.known) == 0
+        return abs(self._segmentarray('active') -
+                   self._segmentarray('known')) == 0
 
     # -------------------------------------------------------------------------
     # classmethods
@@ -361,6 +374,9 @@ class DataQualityFlag(object):
             defining a number of summary segments
         url : `str`, optional, default: ``'https://segdb.ligo.caltech.edu'``
             URL of the segment database
+        cache : `bool`, `str`, `SegmentQueryCache`, optional
+            local cache of query results to use, see
+            :func:`~gwpy.segments.querycache.get_segment_cache`
 
         Returns
         -------
@@ -412,6 +428,14 @@ class DataQualityFlag(object):
             defining a number of summary segments
         url : `str`, optional, default: ``'https://dqsegdb.ligo.org'``
             URL of the segment database
+        cache : `bool`, `str`, `SegmentQueryCache`, optional
+            local cache of query results to use, see
+            :func:`~gwpy.segments.querycache.get_segment_cache`
+        nproc : `int`, optional, default: ``1``
+            number of requests to send in parallel, if greater than
+            ``1`` the query is executed by
+            :func:`~gwpy.segments.query.query_segments`, see that function
+            for other keyword arguments
 
         Returns
         -------
@@ -430,6 +454,14 @@ class DataQualityFlag(object):
             raise ValueError("DataQualityFlag.query must be called with a "
                              "flag name, and either GPS start and stop times, "
                              "or a SegmentList of query segments")
+        # send concurrent requests, or use cached results where possible
+        if (kwargs.get('nproc', 1) > 1 or
+                get_segment_cache(kwargs.get('cache')) is not None):
+            return DataQualityDict.query_dqsegdb([flag], qsegs,
+                                                 **kwargs)[flag]
+        kwargs.pop('nproc', None)
+        kwargs.pop('cache', None)
+
         # get server
         protocol, server = kwargs.pop(
             'url', 'https://dqsegdb.ligo.org').split('://', 1)
@@ -446,21 +478,21 @@ class DataQualityFlag(object):
         # other keyword arguments
         request = kwargs.pop('request', 'metadata,active,known')
 
-        # process query
+        # process query, merging adjacent query segments
+        qsegs = SegmentArray.from_segmentlist(qsegs).coalesce()
         new = cls(name=flag)
+        known = []
+        active = []
         for seg in qsegs:
             data, uri = apicalls.dqsegdbQueryTimes(protocol, server, ifo,
                                                    name, version, request,
                                                    seg[0], seg[1])
-            for s2 in data['active']:
-                new.active.append(Segment(*s2))
-            for s2 in data['known']:
-                new.known.append(Segment(*s2))
-            segl = SegmentList([seg])
-            new.known &= segl
-            new.active &= segl
+            active.extend(data['active'])
+            known.extend(data['known'])
             new.description = data['metadata']['comment']
             new.isgood = not data['metadata']['active_indicates_ifo_badness']
+        new.known = SegmentArray.from_segmentlist(known) & qsegs
+        new.active = SegmentArray.from_segmentlist(active) & qsegs
         new.coalesce()
 
         return new
@@ -572,7 +604,7 @@ class DataQualityFlag(object):
         x : `float`
             number of seconds by which to contract each `Segment`.
         """
-        self.active = self.active.contract(x)
+        self.active = self._segmentarray('active').contract(x)
         return self.active
 
     def protract(self, x):
@@ -590,7 +622,7 @@ class DataQualityFlag(object):
         x : `float`
             number of seconds by which to protact each `Segment`.
         """
-        self.active = self.active.protract(x)
+        self.active = self._segmentarray('active').protract(x)
         return self.active
 
     def round(self):
@@ -603,12 +635,8 @@ class DataQualityFlag(object):
             padded out to the enclosing integer boundaries.
         """
         new = self.copy()
-        new.active = self._ListClass([self._EntryClass(int(floor(s[0])),
-                                                       int(ceil(s[1]))) for
-                                     s in new.active])
-        new.known = self._ListClass([self._EntryClass(int(floor(s[0])),
-                                                      int(ceil(s[1]))) for
-                                     s in new.known])
+        new.active = new._segmentarray('active').round()
+        new.known = new._segmentarray('known').round()
         return new.coalesce()
 
     def coalesce(self):
@@ -630,8 +658,9 @@ class DataQualityFlag(object):
         self
             a view of this flag, not a copy.
         """
-        self.known = self.known.coalesce()
-        self.active = (self.known & self.active).coalesce()
+        known = self._segmentarray('known').coalesce()
+        self.known = known
+        self.active = known & self._segmentarray('active')
         return self
 
     def __repr__(self):
@@ -665,12 +694,26 @@ class DataQualityFlag(object):
         new.name = self.name
         new.version = self.version
         new.description = self.description
-        new.known = self._ListClass([self._EntryClass(s[0], s[1]) for
-                                    s in self.known])
-        new.active = self._ListClass([self._EntryClass(s[0], s[1]) for
-                                     s in self.active])
+        # a SegmentArray is never modified in place, so can be shared
+        for attr in ('known', 'active'):
+            segments = getattr(self, '_%s' % attr)
+            if not isinstance(segments, SegmentArray):
+                segments = self._ListClass([self._EntryClass(s[0], s[1]) for
+                                            s in segments])
+            setattr(new, attr, segments)
         return new
 
+    def _segmentarray(self, attr):
+        """Return the ``'known'`` or ``'active'`` segments as a
+        `SegmentArray`.
+
+        Segments are stored as a `SegmentArray` after any set operation,
+        and only converted to a `SegmentList` when the `known` or `active`
+        property is accessed, so that chains of operations don't convert
+        back and forth.
+        """
+        return SegmentArray.from_segmentlist(getattr(self, '_%s' % attr))
+
     def plot(self, **kwargs):
         """Plot this `DataQualityFlag`.
 
@@ -762,8 +805,8 @@ class DataQualityFlag(object):
     def __iand__(self, other):
         """Intersect this `DataQualityFlag` with ``other`` in-place.
         """
-        self.known &= other.known
-        self.active &= other.active
+        self.known = _segment_op(operator.and_, self, other, 'known')
+        self.active = _segment_op(operator.and_, self, other, 'active')
         return self
 
     def __sub__(self, other):
@@ -775,7 +818,7 @@ class DataQualityFlag(object):
         """Subtract the ``other`` `DataQualityFlag` from this one in-place.
         """
         #self.known -= other.known
-        self.active -= other.active
+        self.active = _segment_op(operator.sub, self, other, 'active')
         return self
 
     def __or__(self, other):
@@ -786,13 +829,47 @@ class DataQualityFlag(object):
     def __ior__(self, other):
         """Add the ``other`` `DataQualityFlag` to this one in-place.
         """
-        self.known |= other.known
-        self.active |= other.active
+        self.known = _segment_op(operator.or_, self, other, 'known')
+        self.active = _segment_op(operator.or_, self, other, 'active')
         return self
 
     __add__ = __or__
     __iadd__ = __ior__
 
+    def __invert__(self):
+        """Return the logical inverse of this `DataQualityFlag`.
+
+        The `known` and `active` segments are each replaced by their
+        complement, with the new `active` segments restricted to the
+        new `known` segments.
+        """
+        new = self.copy()
+        known = ~self._segmentarray('known')
+        new.known = known
+        new.active = known & ~self._segmentarray('active')
+        return new
+
+
+def _segment_op(op, a, b, attr):
+    """Apply a set operation to the segments of two flags, using
+    `SegmentArray`.
+
+    Parameters
+    ----------
+    op : `callable`
+        binary operator, e.g. :func:`operator.and_`
+    a, b : `DataQualityFlag`
+        the operands
+    attr : `str`
+        the segments to operate on, ``'known'`` or ``'active'``
+
+    Returns
+    -------
+    result : `SegmentArray`
+        the coalesced result of ``op(a.<attr>, b.<attr>)``
+    """
+    return op(a._segmentarray(attr), b._segmentarray(attr))
+
 
 class DataQualityDict(OrderedDict):
     """An `OrderedDict` of (key, `DataQualityFlag`) pairs.
@@ -819,6 +896,9 @@ class DataQualityDict(OrderedDict):
             defining a number of summary segments.
         url : `str`, optional, default: ``'https://segdb.ligo.caltech.edu'``
             URL of the segment database.
+        cache : `bool`, `str`, `SegmentQueryCache`, optional
+            local cache of query results to use, see
+            :func:`~gwpy.segments.querycache.get_segment_cache`
 
         Returns
         -------
@@ -838,6 +918,7 @@ class DataQualityDict(OrderedDict):
                              "flag name, and either GPS start and stop times, "
                              "or a SegmentList of query segments")
         url = kwargs.pop('url', 'https://segdb.ligo.caltech.edu')
+        cache = get_segment_cache(kwargs.pop('cache', None))
         if kwargs.keys():
             raise TypeError("DataQualityDict.query has no keyword argument "
                             "'%s'" % kwargs.keys()[0])
@@ -846,6 +927,14 @@ class DataQualityDict(OrderedDict):
             flags = flags.split(',')
         else:
             flags = flags
+        # use cached results where possible
+        if cache is not None:
+            out = cls()
+            for flag in flags:
+                out[flag] = cache.query(
+                    flag, qsegs, lambda segs: cls.query(
+                        [flag], segs, url=url, cache=False)[flag], url=url)
+            return out
         # process query
         from glue.segmentdb import (segmentdb_utils as segdb_utils,
                                     query_engine as segdb_engine)
@@ -913,6 +1002,15 @@ class DataQualityDict(OrderedDict):
             defining a number of summary segments.
         url : `str`, optional, default: ``'https://dqsegdb.ligo.org'``
             URL of the segment database.
+        cache : `bool`, `str`, `SegmentQueryCache`, optional
+            local cache of query results to use, see
+            :func:`~gwpy.segments.querycache.get_segment_cache`
+        nproc : `int`, optional, default: ``1``
+            number of requests to send in parallel, if greater than
+            ``1``, or if a ``cache`` is used, the requests for all flags
+            are sent together by
+            :func:`~gwpy.segments.query.query_segments`, see that function
+            for other keyword arguments
 
         Returns
         -------
@@ -920,9 +1018,64 @@ class DataQualityDict(OrderedDict):
             An ordered `DataQualityDict` of (name, `DataQualityFlag`)
             pairs.
         """
+        nproc = kwargs.pop('nproc', 1)
+        cache = get_segment_cache(kwargs.pop('cache', None))
+        if nproc == 1 and cache is None:
+            new = cls()
+            for flag in flags:
+                new[flag] = cls._EntryClass.query_dqsegdb(flag, *args,
+                                                          cache=False,
+                                                          **kwargs)
+            return new
+
+        # send concurrent requests for all flags
+        if len(args) == 1 and isinstance(args[0], SegmentList):
+            qsegs = args[0]
+        elif len(args) == 1 and len(args[0]) == 2:
+            qsegs = SegmentList([Segment(args[0])])
+        elif len(args) == 2:
+            qsegs = SegmentList([Segment(args)])
+        else:
+            raise ValueError("DataQualityDict.query_dqsegdb must be called "
+                             "with a list of flag names, and either GPS start "
+                             "and stop times, or a SegmentList of query "
+                             "segments")
+        url = kwargs.setdefault('url', 'https://dqsegdb.ligo.org')
+
+        # look up cached results first, and only fetch what is missing
+        if cache is None:
+            missing = OrderedDict((flag, qsegs) for flag in flags)
+        else:
+            lookups = dict((flag, cache.lookup(flag, qsegs, url=url)) for
+                           flag in flags)
+            missing = OrderedDict((flag, lookups[flag][1]) for
+                                  flag in flags if len(lookups[flag][1]))
+        if missing:
+            results = query_segments(list(missing), missing, nproc=nproc,
+                                     **kwargs)
+        else:
+            results = {}
+
         new = cls()
         for flag in flags:
-            new[flag] = cls._EntryClass.query_dqsegdb(flag, *args, **kwargs)
+            fetched = None
+            if flag in results:
+                result = results[flag]
+                fetched = cls._EntryClass(name=flag, known=result['known'],
+                                          active=result['active'])
+                metadata = result['metadata']
+                if 'comment' in metadata:
+                    fetched.description = metadata['comment']
+                if 'active_indicates_ifo_badness' in metadata:
+                    fetched.isgood = not metadata[
+                        'active_indicates_ifo_badness']
+            if cache is None:
+                new[flag] = fetched
+            else:
+                record, segs = lookups[flag]
+                new[flag] = cache.update(flag, qsegs, record, segs, fetched,
+                                         url=url)
+            new[flag].coalesce()
         return new
 
     # use input/output registry to allow multi-format reading
@@ -1028,17 +1181,18 @@ class DataQualityDict(OrderedDict):
         """
         # format source
         source = urlparse(source)
-        known = reduce(operator.or_,
-                       [f.known for f in self.values()]).coalesce()
+        known = SegmentArray()
+        for flag in self.values():
+            known = known | flag._segmentarray('known')
         if segments:
             known &= SegmentList(segments)
         if source.netloc:
-            tmp = type(self).query(self.keys(), known,
+            tmp = type(self).query(self.keys(), known.to_segmentlist(),
                                    url=source.geturl(), **kwargs)
         else:
             tmp = type(self).read(source.geturl(), self.name, **kwargs)
         for key, flag in self.iteritems():
-            self[key].known &= known
+            self[key].known = flag._segmentarray('known') & known
             self[key].active = [type(seg)(seg[0] - flag.padding[0],
                                           seg[1] + flag.padding[1])
                                 for seg in tmp[key].active]
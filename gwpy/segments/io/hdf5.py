@@ -31,19 +31,30 @@ from astropy.io.registry import (register_reader, register_writer,
                                  register_identifier)
 from astropy.units import (UnitBase, Quantity)
 
-from glue.lal import LIGOTimeGPS
-
 from ... import version
 from ...io.hdf5 import (open_hdf5, identify_hdf5)
+from ..array import (SegmentArray, NANOSECONDS, _to_ns, _from_ns,
+                     _ns_to_seconds)
 from ..flag import DataQualityFlag
 from ..segments import (SegmentList, Segment)
+from ...time import (to_gps, LIGOTimeGPS)
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __version__ = version.version
 
+# supported dataset layouts for segment lists
+LAYOUTS = ['sec-ns', 'float', 'ns']
+CHUNK_ROWS = 4096
+MAX_INDEX_SIZE = 2048
+
 
-def flag_from_hdf5(f, name=None, gpstype=LIGOTimeGPS, coalesce=True, nproc=1):
+def flag_from_hdf5(f, name=None, gpstype=LIGOTimeGPS, coalesce=True, nproc=1,
+                   start=None, end=None):
     """Read a `DataQualityFlag` object from an HDF5 file or group.
+
+    If ``start`` or ``end`` are given, only those segments overlapping
+    the ``[start, end)`` interval are returned, see
+    :func:`segmentlist_from_hdf5` for details.
     """
     # hook multiprocessing
     if nproc != 1:
@@ -62,12 +73,17 @@ def flag_from_hdf5(f, name=None, gpstype=LIGOTimeGPS, coalesce=True, nproc=1):
         else:
             dqfgroup = h5file
 
-        active = SegmentList.read(dqfgroup['active'])
+        active = segmentlist_from_hdf5(dqfgroup['active'], gpstype=gpstype,
+                                       start=start, end=end)
         try:
-            known = SegmentList.read(dqfgroup['known'])
+            known = segmentlist_from_hdf5(dqfgroup['known'],
+                                          gpstype=gpstype, start=start,
+                                          end=end)
         except KeyError as e:
             try:
-                known = SegmentList.read(dqfgroup['valid'])
+                known = segmentlist_from_hdf5(dqfgroup['valid'],
+                                              gpstype=gpstype, start=start,
+                                              end=end)
             except KeyError:
                 raise e
 
@@ -159,8 +175,35 @@ def flag_to_hdf5(flag, output, name=None, group=None, compression='gzip',
     return dqfgroup
 
 
-def segmentlist_from_hdf5(f, name=None, gpstype=LIGOTimeGPS):
+def segmentlist_from_hdf5(f, name=None, gpstype=LIGOTimeGPS, start=None,
+                          end=None):
     """Read a `SegmentList` object from an HDF5 file or group.
+
+    Parameters
+    ----------
+    f : `str`, :class:`h5py.Group`, :class:`h5py.Dataset`
+        path of file, or open HDF5 object, to read
+    name : `str`, optional
+        name of dataset to read, required unless ``f`` is a dataset
+    gpstype : `type`, optional, default: `~gwpy.time.LIGOTimeGPS`
+        datatype to force for segment GPS times
+    start : `float`, optional
+        GPS start time of interval of interest
+    end : `float`, optional
+        GPS end time of interval of interest
+
+    Returns
+    -------
+    segmentlist : `SegmentList`
+        the segments read from the dataset; if ``start`` or ``end`` are
+        given, only those segments overlapping the interval are returned,
+        cropped to fit
+
+    Notes
+    -----
+    For datasets written with a compact layout (see
+    :func:`segmentlist_to_hdf5`), only those rows of the dataset that
+    overlap the ``[start, end)`` interval are read from disk.
     """
     h5file = open_hdf5(f)
 
@@ -170,39 +213,102 @@ def segmentlist_from_hdf5(f, name=None, gpstype=LIGOTimeGPS):
             dataset = h5file
         else:
             dataset = h5file[name]
+        layout = dataset.attrs.get('layout', 'sec-ns')
+        if layout not in LAYOUTS:
+            raise ValueError("Cannot read segments from unknown layout %r"
+                             % layout)
+
+        # convert interval into the units of the dataset
+        if layout == 'float':
+            convert = lambda t: float(to_gps(t))
+        else:
+            convert = lambda t: int(_to_ns([to_gps(t)])[0])
+        span = [None if t is None else convert(t) for t in (start, end)]
 
-        try:
-            data = dataset[()]
-        except ValueError:
-            data = []
-
-        out = SegmentList()
-        for row in data:
-            row = map(int, row)
-            # extract as LIGOTimeGPS
-            start = LIGOTimeGPS(*row[:2])
-            end = LIGOTimeGPS(*row[2:])
-            # convert to user type
-            try:
-                start = gpstype(start)
-            except TypeError:
-                start = gpstype(float(start))
+        # read data
+        if layout == 'sec-ns':
             try:
-                end = gpstype(end)
-            except TypeError:
-                end = gpstype(float(end))
-            out.append(Segment(start, end))
+                data = dataset[()].astype(numpy.int64).reshape((-1, 4))
+            except ValueError:
+                data = numpy.zeros((0, 4), dtype=numpy.int64)
+            starts = data[:, 0] * NANOSECONDS + data[:, 1]
+            ends = data[:, 2] * NANOSECONDS + data[:, 3]
+        else:
+            data = _read_compact_rows(dataset, *span)
+            starts = data[:, 0]
+            ends = data[:, 1]
     finally:
         if not isinstance(f, (h5py.Dataset, h5py.Group)):
             h5file.close()
 
-    return out
+    # crop to the interval of interest
+    if span[0] is not None:
+        keep = ends > span[0]
+        starts = numpy.maximum(starts[keep], span[0])
+        ends = ends[keep]
+    if span[1] is not None:
+        keep = starts < span[1]
+        starts = starts[keep]
+        ends = numpy.minimum(ends[keep], span[1])
+
+    # convert to user type
+    if layout == 'float':
+        starts = _from_seconds(starts, gpstype)
+        ends = _from_seconds(ends, gpstype)
+    else:
+        starts = _from_nanoseconds(starts, gpstype)
+        ends = _from_nanoseconds(ends, gpstype)
+    return SegmentList(Segment(a, b) for (a, b) in zip(starts, ends))
 
 
 def segmentlist_to_hdf5(seglist, output, name, group=None,
-                        compression='gzip', **kwargs):
-    """Write a `SegmentList`
+                        compression='gzip', layout='sec-ns', **kwargs):
+    """Write a `SegmentList` to an HDF5 file or group.
+
+    Parameters
+    ----------
+    seglist : `SegmentList`
+        the segments to write
+    output : `str`, :class:`h5py.Group`
+        path to new output file, or open h5py `Group` to write to.
+    name : `str`
+        name of the new dataset
+    group : `str`, optional
+        parent group to create for this dataset.
+    compression : `str`, optional
+        name of compression filter to use
+    layout : `str`, optional, default: ``'sec-ns'``
+        layout of the dataset, one of
+
+        - ``'sec-ns'`` - ``(N, 4)`` integer array of
+          ``(start sec, start ns, end sec, end ns)`` rows
+        - ``'float'`` - compact ``(N, 2)`` `float64` array of
+          ``(start, end)`` rows
+        - ``'ns'`` - compact ``(N, 2)`` `int64` array of
+          ``(start, end)`` rows, in nanoseconds
+
+    **kwargs
+        other keyword arguments passed to
+        :meth:`h5py.Group.create_dataset`.
+
+    Returns
+    -------
+    dset : :class:`h5py.Dataset`
+        the new dataset
+
+    Notes
+    -----
+    The compact layouts are chunked, and are stored sorted by start
+    time, with a coarse index of the start times stored in the
+    attributes of the dataset, so that
+    :func:`segmentlist_from_hdf5` can read the segments overlapping a
+    given interval without reading the whole dataset.
     """
+    if layout not in LAYOUTS:
+        raise ValueError("Cannot write segments with unknown layout %r, "
+                         "please select one of: '%s'"
+                         % (layout, "', '".join(LAYOUTS)))
+
     # create output object
     import h5py
     if isinstance(output, h5py.Group):
@@ -221,17 +327,25 @@ def segmentlist_to_hdf5(seglist, output, name, group=None,
             h5group = h5file
 
         # create dataset
-        data = numpy.zeros((len(seglist), 4), dtype=int)
-        for i, seg in enumerate(seglist):
-            start, end = map(LIGOTimeGPS, seg)
-            data[i, :] = (start.seconds, start.nanoseconds,
-                          end.seconds, end.nanoseconds)
-        if (not len(seglist) and
-                LooseVersion(h5py.version.version).version[0] < 2):
-            kwargs.setdefault('maxshape', (None, 4))
-            kwargs.setdefault('chunks', (1, 1))
-        dset = h5group.create_dataset(name, data=data,
-                                      compression=compression, **kwargs)
+        segments = SegmentArray.from_segmentlist(seglist)
+        if layout == 'float':
+            starts, ends = segments.to_seconds()
+        else:
+            segments = segments.to_ns()
+            starts, ends = segments.start, segments.end
+        if layout == 'sec-ns':
+            data = numpy.zeros((len(seglist), 4), dtype=int)
+            data[:, 0], data[:, 1] = divmod(starts, NANOSECONDS)
+            data[:, 2], data[:, 3] = divmod(ends, NANOSECONDS)
+            if (not len(seglist) and
+                    LooseVersion(h5py.version.version).version[0] < 2):
+                kwargs.setdefault('maxshape', (None, 4))
+                kwargs.setdefault('chunks', (1, 1))
+            dset = h5group.create_dataset(name, data=data,
+                                          compression=compression, **kwargs)
+        else:
+            dset = _write_compact(h5group, name, starts, ends, layout,
+                                  compression=compression, **kwargs)
     finally:
         if not isinstance(output, h5py.Group):
             h5file.close()
@@ -239,6 +353,81 @@ def segmentlist_to_hdf5(seglist, output, name, group=None,
     return dset
 
 
+# ---------------------------------------------------------------------------
+# utilities
+
+def _write_compact(h5group, name, starts, ends, layout, **kwargs):
+    """Write segments to a compact ``(N, 2)`` dataset, with an index.
+
+    ``starts`` and ``ends`` must already be in the units of the layout,
+    `float64` seconds, or `int64` nanoseconds.
+    """
+    data = numpy.column_stack((starts, ends)).reshape((-1, 2))
+    data = data[numpy.argsort(data[:, 0], kind='mergesort')]
+    nrows = data.shape[0]
+    kwargs.setdefault('chunks', (max(min(nrows, CHUNK_ROWS), 1), 2))
+    kwargs.setdefault('shuffle', True)
+    kwargs.setdefault('maxshape', (None, 2))
+    dset = h5group.create_dataset(name, data=data, **kwargs)
+    dset.attrs['layout'] = layout
+    if not nrows:
+        return dset
+    # index the start of each block of rows, and the latest end time of
+    # all rows up to the end of each block
+    block = max(dset.chunks and dset.chunks[0] or CHUNK_ROWS,
+                int(numpy.ceil(nrows / float(MAX_INDEX_SIZE))))
+    blockends = numpy.arange(block, nrows + block, block).clip(max=nrows)
+    dset.attrs['index_block'] = block
+    dset.attrs['index_start'] = data[::block, 0]
+    dset.attrs['index_end'] = numpy.maximum.accumulate(
+        data[:, 1])[blockends - 1]
+    return dset
+
+
+def _read_compact_rows(dataset, start=None, end=None):
+    """Read the rows of a compact segment dataset overlapping an interval.
+
+    The index stored with the dataset is used to select a hyperslab of
+    whole blocks of rows containing all segments that overlap the
+    ``[start, end)`` interval; segments outside of the interval may
+    still be included.
+    """
+    nrows = dataset.shape[0]
+    if not nrows:
+        return numpy.zeros((0, 2), dtype=dataset.dtype)
+    block = int(dataset.attrs['index_block'])
+    if start is None:
+        idx0 = 0
+    else:
+        idx0 = numpy.searchsorted(dataset.attrs['index_end'], start,
+                                  side='right') * block
+    if end is None:
+        idx1 = nrows
+    else:
+        idx1 = numpy.searchsorted(dataset.attrs['index_start'], end,
+                                  side='left') * block
+    idx1 = min(idx1, nrows)
+    if idx1 <= idx0:
+        return numpy.zeros((0, 2), dtype=dataset.dtype)
+    return dataset[idx0:idx1]
+
+
+def _from_nanoseconds(ns, gpstype):
+    """Convert an array of GPS nanoseconds into a list of ``gpstype``.
+    """
+    if gpstype is LIGOTimeGPS:
+        return [_from_ns(t) for t in ns.tolist()]
+    return _from_seconds(_ns_to_seconds(ns), gpstype)
+
+
+def _from_seconds(times, gpstype):
+    """Convert an array of GPS seconds into a list of ``gpstype``.
+    """
+    if gpstype in (float, numpy.float64):
+        return times.tolist()
+    return [gpstype(t) for t in times.tolist()]
+
+
 register_reader('hdf', SegmentList, segmentlist_from_hdf5)
 register_writer('hdf', SegmentList, segmentlist_to_hdf5)
 register_identifier('hdf', SegmentList, identify_hdf5)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Concurrent queries of the DQSegDB segment database.
+
+Each (flag, interval) pair needs its own HTTP request to the DQSegDB,
+so querying many flags over many intervals is dominated by the
+round-trip time to the server. Here, adjacent query intervals are merged
+into as few requests as possible, and those requests are issued from a
+bounded pool of threads. A single session is kept for each server, in
+which each thread keeps a persistent connection, and failed requests are
+retried with an exponential backoff.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from math import (floor, ceil)
+from httplib import (HTTPConnection, HTTPSConnection, HTTPException)
+from urlparse import urlparse
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .. import version
+from ..utils.parallel import map_pool
+from .array import SegmentArray
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['DQSegDBSession', 'get_session', 'query_segments']
+
+DEFAULT_URL = 'https://dqsegdb.ligo.org'
+DEFAULT_REQUEST = 'metadata,active,known'
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+class DQSegDBSession(object):
+    """A persistent connection to a DQSegDB server.
+
+    Each thread that uses a session gets its own connection, which is
+    kept open between requests.
+
+    Parameters
+    ----------
+    url : `str`, optional
+        URL of the segment database
+    retries : `int`, optional, default: ``3``
+        number of times to retry a request that fails with a connection
+        error, or a server (5xx) error
+    backoff : `float`, optional, default: ``1``
+        time (seconds) to wait before the first retry, this is doubled
+        for every subsequent retry
+    timeout : `float`, optional
+        time (seconds) to wait for a response before giving up
+    """
+    def __init__(self, url=DEFAULT_URL, retries=3, backoff=1., timeout=None):
+        url = urlparse(url)
+        self.scheme = url.scheme
+        self.host = url.netloc
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        """The open connection to the server for this thread.
+        """
+        try:
+            return self._local.connection
+        except AttributeError:
+            if self.scheme == 'https':
+                cert, key = find_credential()
+                conn = HTTPSConnection(self.host, cert_file=cert,
+                                       key_file=key, timeout=self.timeout)
+            else:
+                conn = HTTPConnection(self.host, timeout=self.timeout)
+            self._local.connection = conn
+            return conn
+
+    def close(self):
+        """Close the connection to the server for this thread.
+        """
+        try:
+            self._local.connection.close()
+        except AttributeError:
+            pass
+        else:
+            del self._local.connection
+
+    def get(self, path):
+        """Request a path from the server, and decode the JSON response.
+
+        Raises
+        ------
+        IOError
+            if the request fails, after any retries
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                self.connection.request('GET', path)
+                response = self.connection.getresponse()
+                body = response.read()
+            except (HTTPException, socket.error) as e:
+                self.close()
+                error = IOError("Failed to query %s://%s%s: %s"
+                                % (self.scheme, self.host, path, str(e)))
+                continue
+            if response.status == 200:
+                return json.loads(body)
+            error = IOError("Failed to query %s://%s%s: %d %s"
+                            % (self.scheme, self.host, path,
+                               response.status, response.reason))
+            if response.status < 500:
+                break
+        raise error
+
+    def query_times(self, ifo, name, version, start, end,
+                    request=DEFAULT_REQUEST):
+        """Query the segments for a single flag over a GPS interval.
+
+        This is the equivalent of
+        :func:`dqsegdb.apicalls.dqsegdbQueryTimes`.
+
+        Returns
+        -------
+        data : `dict`
+            the decoded JSON response from the server
+        """
+        return self.get('/dq/%s/%s/%d?s=%d&e=%d&include=%s'
+                        % (ifo, name, version, floor(start), ceil(end),
+                           request))
+
+
+def get_session(url=DEFAULT_URL, retries=3, backoff=1., timeout=None):
+    """Return the `DQSegDBSession` to use for a server.
+
+    A single session is created for each set of arguments, and reused by
+    every subsequent query, so that open connections are kept between
+    queries.
+
+    Parameters
+    ----------
+    url : `str`, optional
+        URL of the segment database
+    retries : `int`, optional, default: ``3``
+        number of times to retry each failed request
+    backoff : `float`, optional, default: ``1``
+        time (seconds) to wait before the first retry of a request
+    timeout : `float`, optional
+        time (seconds) to wait for each response
+
+    Returns
+    -------
+    session : `DQSegDBSession`
+        the session for this server
+    """
+    key = (url, retries, backoff, timeout)
+    with _SESSIONS_LOCK:
+        try:
+            return _SESSIONS[key]
+        except KeyError:
+            _SESSIONS[key] = DQSegDBSession(url, retries=retries,
+                                            backoff=backoff, timeout=timeout)
+            return _SESSIONS[key]
+
+
+def query_segments(flags, segments, url=DEFAULT_URL, request=DEFAULT_REQUEST,
+                   nproc=1, retries=3, backoff=1., timeout=None, maxgap=0):
+    """Query the DQSegDB for a number of flags over a number of intervals.
+
+    Parameters
+    ----------
+    flags : `list` of `str`
+        list of flag names, each of the form ``IFO:FLAG-NAME:VERSION``
+    segments : `SegmentList`, `dict`
+        list of GPS [start, end) intervals to query, or a `dict` of
+        (flag, `SegmentList`) pairs giving different intervals for
+        each flag
+    url : `str`, optional
+        URL of the segment database
+    request : `str`, optional
+        comma-separated list of information to request for each flag
+    nproc : `int`, optional, default: ``1``
+        number of requests to send in parallel
+    retries : `int`, optional, default: ``3``
+        number of times to retry each failed request
+    backoff : `float`, optional, default: ``1``
+        time (seconds) to wait before the first retry of a request
+    timeout : `float`, optional
+        time (seconds) to wait for each response
+    maxgap : `float`, optional, default: ``0``
+        query intervals separated by no more than this many seconds are
+        merged into a single request
+
+    Returns
+    -------
+    results : `OrderedDict`
+        (flag, `dict`) pairs, each `dict` holding the flag ``'metadata'``
+        from the server, and the ``'known'`` and ``'active'``
+        `SegmentArray` restricted to the query ``segments``
+    """
+    if not isinstance(segments, dict):
+        segments = dict((flag, segments) for flag in flags)
+    qsegs = [SegmentArray.from_segmentlist(segments[flag]).coalesce() for
+             flag in flags]
+    session = get_session(url, retries=retries, backoff=backoff,
+                          timeout=timeout)
+
+    def _query(task):
+        (ifo, name, version), span = task
+        return session.query_times(ifo, name, version, span[0], span[1],
+                                   request=request)
+
+    tasks = []
+    nspans = []
+    for flag, segs in zip(flags, qsegs):
+        spans = segs.protract(maxgap / 2.).contract(maxgap / 2.)
+        parsed = _parse_flag(flag)
+        tasks.extend((parsed, span) for span in spans)
+        nspans.append(len(spans))
+    data = map_pool(_query, tasks, nproc=nproc, backend='thread')
+
+    # assemble results for each flag
+    out = OrderedDict()
+    i = 0
+    for flag, segs, n in zip(flags, qsegs, nspans):
+        results = data[i:i + n]
+        i += n
+        known = [seg for result in results for seg in result['known']]
+        active = [seg for result in results for seg in result['active']]
+        out[flag] = {
+            'metadata': results and results[-1].get('metadata', {}) or {},
+            'known': SegmentArray.from_segmentlist(known) & segs,
+            'active': SegmentArray.from_segmentlist(active) & segs,
+        }
+    return out
+
+
+def find_credential():
+    """Locate the X509 certificate and key to use for HTTPS requests.
+
+    Returns
+    -------
+    cert, key : `str`
+        the paths of the certificate and key files, or `None` if no
+        credential was found
+    """
+    if 'X509_USER_PROXY' in os.environ:
+        return os.environ['X509_USER_PROXY'], os.environ['X509_USER_PROXY']
+    if 'X509_USER_CERT' in os.environ and 'X509_USER_KEY' in os.environ:
+        return os.environ['X509_USER_CERT'], os.environ['X509_USER_KEY']
+    proxy = '/tmp/x509up_u%d' % os.getuid()
+    if os.access(proxy, os.R_OK):
+        return proxy, proxy
+    return None, None
+
+
+def _parse_flag(flag):
+    """Split a flag name into its ``(ifo, name, version)`` components.
+    """
+    try:
+        ifo, name, version = flag.split(':', 2)
+    except ValueError as e:
+        e.args = ('Flag must be of the form \'IFO:FLAG-NAME:VERSION\'',)
+        raise
+    return ifo, name, int(version)
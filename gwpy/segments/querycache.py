@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent on-disk cache of segment database query results.
+
+Each record holds the ``known`` and ``active`` segments for a single
+flag from a single server, along with the list of ``covered`` intervals
+for which those segments are complete. Queries for a flag only go to the
+server for those parts of the requested interval that aren't already
+covered.
+
+Segments for recent times may still be changing on the server, so only
+query results older than the cache ``latency`` (relative to the current
+GPS time) are recorded as covered; anything newer is always fetched again.
+Records are evicted when they haven't been used for ``maxage`` seconds,
+and least-recently-used records are evicted whenever the total size of
+the cache exceeds ``maxsize`` bytes.
+
+The cache is opt-in. Pass ``cache=True`` (or a path, or a
+`SegmentQueryCache`) to any of the segment database query methods,
+or set the ``GWPY_SEGMENT_CACHE`` environment variable to the path of the
+database to use it by default.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from math import floor
+
+import numpy
+
+from .. import version
+from ..time import to_gps
+from .array import SegmentArray
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['SegmentQueryCache', 'get_segment_cache']
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.gwpy',
+                             'segment-cache.sqlite')
+DEFAULT_MAXSIZE = 512 * 1024 ** 2  # bytes
+DEFAULT_MAXAGE = 30 * 86400  # seconds
+DEFAULT_LATENCY = 3600  # seconds
+
+# marks a blob of int64 nanoseconds; float64 blobs are a multiple of 8
+# bytes long, so the two can never be confused
+NS_PREFIX = b'ns'
+
+_CACHE = {}
+
+
+class SegmentQueryCache(object):
+    """An on-disk cache of segment database query results.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        path of the SQLite database, use ``':memory:'`` for a cache
+        that only lasts as long as this object
+    maxsize : `int`, optional
+        maximum total size (bytes) of the cached segments
+    maxage : `float`, optional
+        time (seconds) after which an unused record is evicted
+    latency : `float`, optional
+        time (seconds) before the current GPS time within which query
+        results are not cached, since they may still change
+    """
+    def __init__(self, path=DEFAULT_CACHE, maxsize=DEFAULT_MAXSIZE,
+                 maxage=DEFAULT_MAXAGE, latency=DEFAULT_LATENCY):
+        self.path = path
+        self.maxsize = maxsize
+        self.maxage = maxage
+        self.latency = latency
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        """Open connection to the cache database.
+
+        A new connection is opened in each process that uses this cache.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            if self.path != ':memory:':
+                dir_ = os.path.dirname(self.path)
+                if dir_ and not os.path.isdir(dir_):
+                    os.makedirs(dir_)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (url TEXT, flag TEXT, "
+                "covered BLOB, known BLOB, active BLOB, metadata TEXT, "
+                "size INTEGER, accessed REAL, PRIMARY KEY (url, flag))")
+            self._pid = os.getpid()
+        return self._connection
+
+    # -------------------------------------------
+    # record access
+
+    def get(self, flag, url=''):
+        """Return the cached record for a flag.
+
+        Parameters
+        ----------
+        flag : `str`
+            name of the flag
+        url : `str`, optional
+            URL of the server from which the flag was queried
+
+        Returns
+        -------
+        record : `dict`
+            `dict` with ``'covered'``, ``'known'``, and ``'active'``
+            `SegmentArray` entries, and the flag ``'metadata'``, or `None`
+            if this flag has not been cached
+        """
+        row = self.connection.execute(
+            "SELECT covered, known, active, metadata FROM results "
+            "WHERE url=? AND flag=?", (url, str(flag))).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute(
+                "UPDATE results SET accessed=? WHERE url=? AND flag=?",
+                (time.time(), url, str(flag)))
+        return {'covered': _from_blob(row[0]), 'known': _from_blob(row[1]),
+                'active': _from_blob(row[2]), 'metadata': json.loads(row[3])}
+
+    def add(self, flag, covered, known, active, metadata=None, url=''):
+        """Add (or replace) the cached record for a flag.
+
+        Old records are evicted afterwards, as required.
+
+        Parameters
+        ----------
+        flag : `str`
+            name of the flag
+        covered : `SegmentArray`
+            the intervals for which ``known`` and ``active`` are complete
+        known : `SegmentArray`
+            the known segments for this flag
+        active : `SegmentArray`
+            the active segments for this flag
+        metadata : `dict`, optional
+            other flag attributes to store, must be JSON-serialisable
+        url : `str`, optional
+            URL of the server from which the flag was queried
+        """
+        blobs = [_to_blob(segs) for segs in (covered, known, active)]
+        size = sum(len(b) for b in blobs)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, "
+                "?)", [url, str(flag)] + blobs +
+                [json.dumps(metadata or {}), size, time.time()])
+        self.evict()
+
+    def remove(self, flag, url=''):
+        """Remove the cached record for a flag.
+        """
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM results WHERE url=? AND flag=?", (url, str(flag)))
+
+    def clear(self):
+        """Remove all records from this cache.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+    def evict(self):
+        """Remove records that are too old, or that don't fit in this cache.
+
+        Records are removed if they haven't been accessed within
+        `maxage` seconds, then the least-recently-used records are
+        removed until the total size is no larger than `maxsize`.
+        """
+        with self.connection:
+            if self.maxage is not None:
+                self.connection.execute(
+                    "DELETE FROM results WHERE accessed < ?",
+                    (time.time() - self.maxage,))
+            if self.maxsize is not None:
+                rows = self.connection.execute(
+                    "SELECT url, flag, size FROM results "
+                    "ORDER BY accessed DESC").fetchall()
+                total = 0
+                for url, flag, size in rows:
+                    total += size
+                    if total > self.maxsize:
+                        self.connection.execute(
+                            "DELETE FROM results WHERE url=? AND flag=?",
+                            (url, flag))
+
+    # -------------------------------------------
+    # queries
+
+    def query(self, flag, segments, fetch, url='', now=None):
+        """Query for a flag, using cached results where available.
+
+        Parameters
+        ----------
+        flag : `str`
+            name of the flag
+        segments : `SegmentList`
+            the intervals to query
+        fetch : `callable`
+            function to query the server, taking a `SegmentList` of
+            intervals, and returning a `DataQualityFlag` for those
+            intervals; this is only called for intervals not already
+            covered by the cache
+        url : `str`, optional
+            URL of the server, used (with the flag name) to key the cache
+        now : `float`, optional
+            current GPS time, defaults to the system clock
+
+        Returns
+        -------
+        flag : `DataQualityFlag`
+            a new `DataQualityFlag`, with `known` and `active` segments
+            restricted to the query ``segments``
+
+        See Also
+        --------
+        SegmentQueryCache.lookup
+        SegmentQueryCache.update
+            to split the query, e.g. to fetch the missing intervals for
+            many flags at once
+        """
+        record, missing = self.lookup(flag, segments, url=url)
+        new = None
+        if len(missing):
+            new = fetch(missing.to_segmentlist())
+        return self.update(flag, segments, record, missing, new, url=url,
+                           now=now)
+
+    def lookup(self, flag, segments, url=''):
+        """Find the cached record for a flag, and the intervals of a query
+        that it doesn't cover.
+
+        Parameters
+        ----------
+        flag : `str`
+            name of the flag
+        segments : `SegmentList`
+            the intervals to query
+        url : `str`, optional
+            URL of the server from which the flag was queried
+
+        Returns
+        -------
+        record : `dict`
+            the cached record, see :meth:`SegmentQueryCache.get`, this is
+            empty if the flag has not been cached
+        missing : `SegmentArray`
+            the intervals of the query that must be fetched from the
+            server
+        """
+        qsegs = SegmentArray.from_segmentlist(segments).coalesce()
+        record = self.get(flag, url=url)
+        if record is None:
+            record = {'covered': SegmentArray(), 'known': SegmentArray(),
+                      'active': SegmentArray(), 'metadata': {}}
+        return record, qsegs - record['covered']
+
+    def update(self, flag, segments, record, missing, new, url='',
+               now=None):
+        """Combine a cached record with newly fetched results for a query.
+
+        Any new results that can no longer change are added to the cache.
+
+        Parameters
+        ----------
+        flag : `str`
+            name of the flag
+        segments : `SegmentList`
+            the intervals to query
+        record : `dict`
+            the cached record, as returned by :meth:`SegmentQueryCache.lookup`
+        missing : `SegmentArray`
+            the intervals not covered by ``record``
+        new : `DataQualityFlag`
+            the flag as fetched from the server for the ``missing``
+            intervals, or `None` if nothing was missing
+        url : `str`, optional
+            URL of the server, used (with the flag name) to key the cache
+        now : `float`, optional
+            current GPS time, defaults to the system clock
+
+        Returns
+        -------
+        flag : `DataQualityFlag`
+            a new `DataQualityFlag`, with `known` and `active` segments
+            restricted to the query ``segments``
+        """
+        from .flag import DataQualityFlag
+        qsegs = SegmentArray.from_segmentlist(segments).coalesce()
+        newknown = newactive = SegmentArray()
+        if new is not None and len(missing):
+            newknown = new._segmentarray('known') & missing
+            newactive = new._segmentarray('active') & newknown
+            record['metadata'] = {'description': new.description,
+                                  'isgood': new.isgood}
+            # only cache results that can no longer change
+            if now is None:
+                now = float(to_gps('now'))
+            stable = missing & SegmentArray(
+                [-numpy.inf], [floor(float(now) - self.latency)])
+            if len(stable):
+                record['covered'] = record['covered'] | stable
+                record['known'] = record['known'] | (newknown & stable)
+                record['active'] = record['active'] | (newactive & stable)
+                self.add(flag, record['covered'], record['known'],
+                         record['active'], metadata=record['metadata'],
+                         url=url)
+        out = DataQualityFlag(name=flag)
+        for attr, value in record['metadata'].items():
+            setattr(out, str(attr), value)
+        out.known = (record['known'] & qsegs) | newknown
+        out.active = (record['active'] & qsegs) | newactive
+        return out
+
+
+def get_segment_cache(cache=None):
+    """Return the `SegmentQueryCache` to use for a query.
+
+    Parameters
+    ----------
+    cache : `bool`, `str`, `SegmentQueryCache`, optional
+        the cache to use, one of
+
+        - `None` : use the cache at the path given by the
+          ``GWPY_SEGMENT_CACHE`` environment variable, if set
+        - `True` : use the cache at the default path
+          (``~/.gwpy/segment-cache.sqlite``)
+        - `False` : don't use a cache
+        - `str` : use the cache at this path
+        - `SegmentQueryCache` : use this cache
+
+    Returns
+    -------
+    cache : `SegmentQueryCache`
+        the cache, a single instance is returned for each path, or `None`
+        if no cache should be used
+    """
+    if isinstance(cache, SegmentQueryCache):
+        return cache
+    if cache is None:
+        cache = os.environ.get('GWPY_SEGMENT_CACHE', None)
+    elif cache is True:
+        cache = DEFAULT_CACHE
+    if not cache:
+        return None
+    try:
+        return _CACHE[cache]
+    except KeyError:
+        _CACHE[cache] = SegmentQueryCache(cache)
+        return _CACHE[cache]
+
+
+# ---------------------------------------------------------------------------
+# utilities
+
+def _to_blob(segments):
+    """Serialise a `SegmentArray` as a buffer of `float64` times.
+
+    Nanosecond segment lists are stored exactly, as `int64` times
+    following the ``NS_PREFIX`` marker.
+    """
+    segments = SegmentArray.from_segmentlist(segments)
+    data = numpy.concatenate((segments.start, segments.end))
+    if segments.ns:
+        return sqlite3.Binary(NS_PREFIX + data.astype(numpy.int64).tostring())
+    return sqlite3.Binary(data.astype(numpy.float64).tostring())
+
+
+def _from_blob(blob):
+    """Read a `SegmentArray` from a buffer written by `_to_blob`.
+    """
+    blob = bytes(blob)
+    if len(blob) % 8 == len(NS_PREFIX) and blob.startswith(NS_PREFIX):
+        data = numpy.frombuffer(blob[len(NS_PREFIX):], dtype=numpy.int64)
+        return SegmentArray(*numpy.split(data, 2), ns=True)
+    data = numpy.frombuffer(blob, dtype=numpy.float64)
+    return SegmentArray(*numpy.split(data, 2))
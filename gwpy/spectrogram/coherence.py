@@ -22,7 +22,6 @@ time-frequency coherence spectrogram from a pair of time-series.
 
 from __future__ import division
 
-from multiprocessing import (Process, Queue as ProcessQueue)
 from math import ceil
 
 from numpy import zeros
@@ -32,6 +31,7 @@ from astropy import units
 from .. import version
 from .core import (Spectrogram, SpectrogramList)
 from ..spectrum import psd
+from ..utils.parallel import (SharedArray, map_pool, unshare)
 
 __author__ = "Duncan Macleod <duncan.macleod@ligo.org>"
 __version__ = version.version
@@ -96,7 +96,7 @@ def _from_timeseries(ts1, ts2, stride, fftlength=None, overlap=None,
 
 
 def from_timeseries(ts1, ts2, stride, fftlength=None, overlap=None,
-                    window=None, nproc=1, **kwargs):
+                    window=None, nproc=1, backend='process', **kwargs):
     """Calculate the coherence `Spectrogram` between two `TimeSeries`.
 
     Parameters
@@ -112,8 +112,11 @@ def from_timeseries(ts1, ts2, stride, fftlength=None, overlap=None,
     window : `timeseries.window.Window`, optional, default: `None`
         window function to apply to timeseries prior to FFT.
     nproc : `int`, default: ``1``
-        maximum number of independent frame reading processes, default
-        is set to single-process file reading.
+        number of parallel workers to use when calculating individual
+        blocks of the spectrogram.
+    backend : `str`, optional, default: ``'process'``
+        type of parallel worker to use, either ``'process'`` or
+        ``'thread'``, see :mod:`gwpy.utils.parallel` for details
 
     Returns
     -------
@@ -129,52 +132,55 @@ def from_timeseries(ts1, ts2, stride, fftlength=None, overlap=None,
 
     # get size of spectrogram
     nsteps = int(ts1.size // (stride * ts1.sample_rate.value))
-    nproc = min(nsteps, nproc)
+    nsplit = min(nsteps, nproc)
 
     # single-process return
-    if nsteps == 0 or nproc == 1:
+    if nsteps == 0 or nsplit == 1:
         return _from_timeseries(ts1, ts2, stride, fftlength=fftlength,
                                 overlap=overlap, window=window, **kwargs)
 
-    # wrap spectrogram generator
-    def _specgram(q, ts):
-        try:
-            q.put(_from_timeseries(ts, ts2, stride, fftlength=fftlength,
-                                   overlap=overlap, window=window,
-                                   **kwargs))
-        except Exception as e:
-            q.put(e)
-
-    # otherwise build process list
-    stepperproc = int(ceil(nsteps / nproc))
-    nsamp = [stepperproc * ts.sample_rate.value * stride for ts in (ts1, ts2)]
-
-    queue = ProcessQueue(nproc)
-    processlist = []
-    for i in range(nproc):
-        process = Process(target=_specgram,
-                          args=(queue, ts1[i * nsamp[0]:(i + 1) * nsamp[0]],
-                                ts2[i * nsamp[1]:(i + 1) * nsamp[1]]))
-        process.daemon = True
-        processlist.append(process)
-        process.start()
-        if ((i + 1) * nsamp[0]) >= ts1.size:
-            break
-
-    # get data
-    data = []
-    for process in processlist:
-        result = queue.get()
-        if isinstance(result, Exception):
-            raise result
-        else:
-            data.append(result)
-
-    # and block
-    for process in processlist:
-        process.join()
+    # otherwise distribute blocks of strides over a pool of workers
+    stepperproc = int(ceil(nsteps / nsplit))
+    nsamp = [int(stepperproc * ts.sample_rate.value * stride)
+             for ts in (ts1, ts2)]
+    nfreqs = int(fftlength * sampling // 2 + 1)
+    kwargs.update(fftlength=fftlength, overlap=overlap, window=window)
+    if backend == 'thread':
+        in1, in2 = ts1, ts2
+        outdata = zeros((nsteps, nfreqs))
+    else:
+        in1, in2 = SharedArray(ts1), SharedArray(ts2)
+        outdata = SharedArray(shape=(nsteps, nfreqs))
+    try:
+        tasks = [(in1, in2, outdata, i * stepperproc,
+                  (i * nsamp[0], (i + 1) * nsamp[0]),
+                  (i * nsamp[1], (i + 1) * nsamp[1]), stride, kwargs)
+                 for i in range(int(ceil(nsteps / stepperproc)))]
+        map_pool(_from_timeseries_worker, tasks, nproc=nproc,
+                 backend=backend)
+    finally:
+        if backend != 'thread':
+            in1.close()
+            in2.close()
+            outdata = outdata.release()
 
     # format and return
-    out = SpectrogramList(*data)
-    out.sort(key=lambda spec: spec.epoch.gps)
-    return out.join()
+    out = Spectrogram(outdata, epoch=ts1.epoch, f0=0,
+                      df=1 / fftlength, dt=stride)
+    out.unit = 'coherence'
+    return out
+
+
+def _from_timeseries_worker(task):
+    """Calculate one block of a coherence `Spectrogram` inside a parallel
+    worker.
+
+    The block is written directly into the (shared) output array.
+    """
+    (in1, in2, outdata, row, span1, span2, stride, kwargs) = task
+    ts1 = unshare(in1)[span1[0]:span1[1]]
+    ts2 = unshare(in2)[span2[0]:span2[1]]
+    out = unshare(outdata, mode='r+')
+    specgram = _from_timeseries(ts1, ts2, stride, **kwargs)
+    nsteps = min(specgram.shape[0], out.shape[0] - row)
+    out[row:row + nsteps] = specgram.data[:nsteps]
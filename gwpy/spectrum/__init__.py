@@ -33,4 +33,5 @@ from .io import *
 # setup spectrum generation method registrations
 from .scipy_ import *
 from .lal_ import *
+from .numpy_ import *
 
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2013)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Vectorised `Spectrum` and `Spectrogram` methods using NumPy.
+
+These methods build a strided view of every FFT segment in the input
+`TimeSeries`, and detrend, window and transform all of them with a
+single batched call to :func:`numpy.fft.rfft`. The resulting
+periodograms are then averaged straight into the output array, so
+that a full `Spectrogram` costs one pass over the data, rather than one
+:meth:`~gwpy.timeseries.TimeSeries.psd` call per column.
+
+The following average methods are registered:
+
+    - ``'numpy-welch'``
+    - ``'numpy-bartlett'``
+    - ``'numpy-median'``
+    - ``'numpy-median-mean'``
+"""
+
+from __future__ import division
+
+import numpy
+from numpy import fft as npfft
+from numpy.lib.stride_tricks import as_strided
+from scipy import signal
+
+from .core import Spectrum
+from .registry import (register_method, register_spectrogram_method)
+from .utils import scale_timeseries_units
+from .. import version
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['numpy_psd', 'numpy_spectrogram']
+
+# maximum number of samples (segments x segmentlength) transformed at once
+BATCH_SIZE = 2 ** 24
+
+
+# ---------------------------------------------------------------------------
+# Utilities
+
+def get_window(window, length, dtype=numpy.float64):
+    """Format a window for use with the batched FFT methods.
+
+    Parameters
+    ----------
+    window : `str`, `tuple`, `numpy.ndarray`, optional
+        name of the window (or ``(name, *args)`` tuple) to pass to
+        :func:`scipy.signal.get_window`, or an array of length ``length``,
+        defaults to a Hann window
+    length : `int`
+        number of samples in each FFT
+    dtype : :class:`numpy.dtype`, optional
+        numeric type of the output window
+
+    Returns
+    -------
+    window : `numpy.ndarray`
+        a 1-D array of length ``length``
+    """
+    if window is None:
+        window = 'hann'
+    if isinstance(window, (str, tuple)):
+        window = signal.get_window(window, length)
+    window = numpy.asarray(window, dtype=dtype)
+    if window.ndim != 1:
+        raise ValueError("window must be 1-D")
+    if window.shape[0] != length:
+        raise ValueError("Window is the wrong size.")
+    return window
+
+
+def segment_view(data, segmentlength, noverlap, nstrides=1, stride=None):
+    """Return a strided view of the FFT segments in a data array.
+
+    No data are copied, the output is a read-only view onto the input
+    array.
+
+    Parameters
+    ----------
+    data : `numpy.ndarray`
+        1-D input data array
+    segmentlength : `int`
+        number of samples in each FFT segment
+    noverlap : `int`
+        number of samples of overlap between neighbouring segments
+    nstrides : `int`, optional, default: ``1``
+        number of independent strides into which to split the data
+    stride : `int`, optional
+        number of samples in each stride, defaults to the full length
+        of ``data``
+
+    Returns
+    -------
+    segments : `numpy.ndarray`
+        3-D view of shape ``(nstrides, nsegments, segmentlength)``
+    """
+    if stride is None:
+        stride = data.shape[0]
+    step = segmentlength - noverlap
+    if step <= 0:
+        raise ValueError("noverlap must be less than segmentlength")
+    nsegs = 1 + (stride - segmentlength) // step
+    if nsegs < 1:
+        raise ValueError("Data are too short for a single FFT of %d samples"
+                         % segmentlength)
+    itemsize = data.strides[0]
+    segments = as_strided(data, shape=(nstrides, nsegs, segmentlength),
+                          strides=(stride * itemsize, step * itemsize,
+                                   itemsize))
+    segments.flags.writeable = False
+    return segments
+
+
+def median_bias(n):
+    """Return the bias factor of the median of ``n`` periodogram bins.
+
+    This is the ratio of the median to the mean of an exponential
+    distribution sampled ``n`` times, as used by
+    :lalsuite:`XLALREAL8AverageSpectrumMedian`.
+    """
+    ii_2 = 2 * numpy.arange(1., (n - 1) // 2 + 1)
+    return 1 + numpy.sum(1. / (ii_2 + 1) - 1. / ii_2)
+
+
+def _periodograms(segments, window, scale):
+    """Calculate the one-sided periodogram of each segment.
+
+    Each segment has its mean removed and is windowed in a single
+    broadcast operation, before all are transformed with one call to
+    :func:`numpy.fft.rfft`.
+    """
+    nfft = segments.shape[-1]
+    # detrend and window (the only copy of the input data)
+    tmp = segments - segments.mean(axis=-1)[..., None]
+    tmp *= window
+    # transform and take power
+    fft_ = npfft.rfft(tmp, axis=-1)
+    del tmp
+    power = fft_.real ** 2
+    power += fft_.imag ** 2
+    del fft_
+    power *= scale
+    # double all bins above DC, but not Nyquist for even-length FFTs
+    if nfft % 2:
+        power[..., 1:] *= 2
+    else:
+        power[..., 1:-1] *= 2
+    return power
+
+
+def _average(power, method, out):
+    """Average the periodograms in ``power`` along their second axis.
+
+    The result is written into ``out``.
+    """
+    nsegs = power.shape[1]
+    if method in ['welch', 'bartlett']:
+        numpy.mean(power, axis=1, out=out)
+    elif method == 'median':
+        out[:] = numpy.median(power, axis=1) / median_bias(nsegs)
+    elif method == 'median-mean':
+        if nsegs < 2:
+            raise ValueError("Cannot calculate median-mean spectrum with "
+                             "this small a TimeSeries.")
+        neven = nsegs // 2
+        even = numpy.median(power[:, 0:2 * neven:2], axis=1)
+        odd = numpy.median(power[:, 1:2 * neven:2], axis=1)
+        out[:] = (even + odd) / (2 * median_bias(neven))
+    else:
+        raise NotImplementedError("Sorry, only 'welch', 'bartlett', "
+                                  "'median' and 'median-mean' average "
+                                  "methods are available.")
+    return out
+
+
+def _average_spectra(data, stride, nstrides, segmentlength, noverlap,
+                     window, method, scale, out):
+    """Fill ``out`` with one average spectrum per stride of ``data``.
+
+    Strides are processed in batches of at most `BATCH_SIZE` samples to
+    bound the memory used by the intermediate periodograms.
+    """
+    segments = segment_view(data, segmentlength, noverlap, nstrides=nstrides,
+                            stride=stride)
+    nperbatch = max(1, BATCH_SIZE // (segments.shape[1] * segmentlength))
+    for i in range(0, nstrides, nperbatch):
+        batch = segments[i:i + nperbatch]
+        power = _periodograms(batch, window, scale)
+        _average(power, method, out[i:i + batch.shape[0]])
+    return out
+
+
+def _format_args(timeseries, segmentlength, noverlap, method, window,
+                 scaling):
+    """Parse common arguments for the methods in this module.
+    """
+    method = method.lower()
+    if method == 'bartlett':
+        noverlap = 0
+    elif noverlap is None:
+        noverlap = int(segmentlength // 2)
+    win = get_window(window, segmentlength)
+    fs = timeseries.sample_rate.decompose().value
+    if scaling == 'density':
+        scale = 1 / (fs * (win ** 2).sum())
+    elif scaling == 'spectrum':
+        scale = 1 / win.sum() ** 2
+    else:
+        raise ValueError("Unknown scaling: %r" % scaling)
+    return method, int(noverlap), win, scale, fs
+
+
+# ---------------------------------------------------------------------------
+# NumPy spectrum methods
+
+def numpy_psd(timeseries, segmentlength, noverlap=None, method='welch',
+              window=None, scaling='density'):
+    """Generate a PSD `Spectrum` using a batched NumPy FFT.
+
+    Parameters
+    ----------
+    timeseries : :class:`~gwpy.timeseries.core.TimeSeries`
+        input `TimeSeries` data.
+    segmentlength : `int`
+        number of samples in single average.
+    noverlap : `int`
+        number of samples to overlap between segments, defaults to 50%.
+    method : `str`
+        average method, one of ``'welch'``, ``'bartlett'``, ``'median'``,
+        or ``'median-mean'``
+    window : `tuple`, `str`, `numpy.ndarray`, optional
+        window parameters to apply to timeseries prior to FFT
+    scaling : `str`, optional, default: ``'density'``
+        either ``'density'`` for a PSD, or ``'spectrum'`` for a power
+        spectrum
+
+    Returns
+    -------
+    Spectrum
+        average power `Spectrum`
+    """
+    segmentlength = int(segmentlength)
+    method, noverlap, win, scale, fs = _format_args(
+        timeseries, segmentlength, noverlap, method, window, scaling)
+    nfreqs = segmentlength // 2 + 1
+    out = numpy.empty((1, nfreqs), dtype=numpy.float64)
+    _average_spectra(timeseries.data, timeseries.size, 1, segmentlength,
+                     noverlap, win, method, scale, out)
+    spec = Spectrum(out[0], epoch=timeseries.epoch, f0=0,
+                    df=fs / segmentlength, name=timeseries.name,
+                    channel=timeseries.channel)
+    spec.unit = scale_timeseries_units(timeseries.unit, scaling)
+    return spec
+
+
+def numpy_spectrogram(timeseries, stride, segmentlength, noverlap=None,
+                      method='welch', window=None, scaling='density'):
+    """Generate a PSD `Spectrogram` using a batched NumPy FFT.
+
+    Parameters
+    ----------
+    timeseries : :class:`~gwpy.timeseries.core.TimeSeries`
+        input `TimeSeries` data.
+    stride : `int`
+        number of samples in single PSD (column of spectrogram).
+    segmentlength : `int`
+        number of samples in single FFT.
+    noverlap : `int`
+        number of samples to overlap between segments, defaults to 50%.
+    method : `str`
+        average method, one of ``'welch'``, ``'bartlett'``, ``'median'``,
+        or ``'median-mean'``
+    window : `tuple`, `str`, `numpy.ndarray`, optional
+        window parameters to apply to timeseries prior to FFT
+    scaling : `str`, optional, default: ``'density'``
+        either ``'density'`` for a PSD, or ``'spectrum'`` for a power
+        spectrum
+
+    Returns
+    -------
+    Spectrogram
+        time-frequency average power `Spectrogram`
+    """
+    from ..spectrogram import Spectrogram
+    stride = int(stride)
+    segmentlength = int(segmentlength)
+    method, noverlap, win, scale, fs = _format_args(
+        timeseries, segmentlength, noverlap, method, window, scaling)
+    nstrides = timeseries.size // stride
+    nfreqs = segmentlength // 2 + 1
+    out = Spectrogram(numpy.empty((nstrides, nfreqs), dtype=numpy.float64),
+                      channel=timeseries.channel, epoch=timeseries.epoch,
+                      f0=0, df=fs / segmentlength, dt=stride / fs)
+    out.unit = scale_timeseries_units(timeseries.unit, scaling)
+    if nstrides:
+        _average_spectra(timeseries.data, stride, nstrides, segmentlength,
+                         noverlap, win, method, scale, out.data)
+    return out
+
+
+def numpy_spectrum_factory(method, func=numpy_psd):
+    """Wrap the given function with a specific method argument.
+    """
+    def _spectrum(*args, **kwargs):
+        kwargs['method'] = method
+        return func(*args, **kwargs)
+    return _spectrum
+
+
+for _method in ['welch', 'bartlett', 'median-mean', 'median']:
+    register_method(numpy_spectrum_factory(_method), 'numpy-%s' % _method)
+    register_spectrogram_method(
+        numpy_spectrum_factory(_method, func=numpy_spectrogram),
+        'numpy-%s' % _method)
@@ -34,6 +34,7 @@ __version__ = version.version
 
 spectrum_methods = OrderedDict()
 density_methods = OrderedDict()
+spectrogram_methods = OrderedDict()
 
 
 def register_method(func, name=None, force=False, scaling='density'):
@@ -94,3 +95,37 @@ def get_method(name, scaling='density'):
                              "name %r" % name)
     else:
         raise ValueError("Unknown Spectrum type: %r" % scaling)
+
+
+def register_spectrogram_method(func, name=None, force=False):
+    """Register a method of calculating a full `Spectrogram` in one call.
+
+    Methods registered here are used by :meth:`TimeSeries.spectrogram`
+    in place of the column-by-column loop over the PSD method of the same
+    name, and must accept the arguments
+    ``(timeseries, stride, segmentlength, noverlap=None, **kwargs)``,
+    with all lengths given in samples.
+
+    Parameters
+    ----------
+    func : `callable`
+        function to execute
+    name : `str`, optional
+        name of the method, defaults to ``func.__name__``
+    """
+    if name is None:
+        name = func.__name__
+    if name in spectrogram_methods and not force:
+        raise KeyError("'%s' already registered, use force=True to override."
+                       % name)
+    spectrogram_methods[name] = func
+
+
+def get_spectrogram_method(name):
+    """Return the Spectrogram generator registered with the given name.
+    """
+    try:
+        return spectrogram_methods[name]
+    except KeyError:
+        raise ValueError("No Spectrogram method registered with name %r"
+                         % name)
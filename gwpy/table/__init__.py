@@ -24,7 +24,7 @@ tables used in GW data analysis; this module extends their functionality
 with the unified input/output system (the .read() method).
 
 Additionally, for event tables (burst, inspiral, and ringdown), methods
-to calculate event rate are also attached.
+to calculate event rate, and to cluster events, are also attached.
 
 Users can make the extensions available by either importing the
 :mod:`~glue.ligolw.lsctables` module from gwpy as follows::
@@ -37,6 +37,14 @@ using the lsctables module (even after importing it from glue)::
     >>> from glue.ligolw import lsctables
     >>> import gwpy.table
 
+For large numbers of events, the `EventTable` stores each column as a
+single `numpy.ndarray`, and can be read from all of the same trigger
+formats, and converted to a LIGO_LW table when required::
+
+    >>> from gwpy.table import EventTable
+    >>> events = EventTable.read('triggers.xml', format='ligolw')
+    >>> loud = events.filter('snr > 8')
+
 """
 
 import warnings
@@ -48,16 +56,24 @@ from glue.ligolw.table import Table
 # import all tables
 from . import lsctables
 
+# import columnar event table
+from .events import EventTable
+from .index import TimeIndex
+
 
 # attach unified I/O
 from .io import *
 
 # attach rate methods
-from .rate import (event_rate, binned_event_rates)
+from .rate import (event_rate, binned_event_rates, RateAccumulator)
+
+# attach clustering methods
+from . import cluster
 
 from .. import version
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __credits__ = 'Kipp Cannon <kipp.cannon@ligo.org>'
 __version__ = version.version
-__all__ = ['Column', 'Document', 'Table', 'lsctables']
+__all__ = ['Column', 'Document', 'Table', 'EventTable', 'RateAccumulator',
+           'TimeIndex', 'lsctables']
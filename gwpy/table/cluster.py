@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Cluster events in time, or in time and frequency.
+
+Time clustering sorts the events, then finds runs of consecutive events
+that are close enough together, so that clustering n events costs
+O(n log n), with no loop over events.
+Tile clustering finds the pairs of tiles that overlap in time and in
+frequency with a sort-and-sweep, then labels the connected components
+of overlapping tiles.
+The clustered table keeps only the loudest event of each cluster,
+according to a chosen ranking column.
+"""
+
+import numpy
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .. import version
+from .events import EventTable
+from .index import take
+from .utils import (EVENT_TABLES, get_table_column)
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['cluster', 'cluster_tiles', 'time_clusters', 'tile_clusters']
+
+
+def cluster(self, window, rank='snr', timecolumn='time'):
+    """Cluster the events in this `Table` in time.
+
+    Events separated by no more than ``window`` seconds from the
+    previous event are added to the same cluster, and the loudest event
+    of each cluster is kept.
+
+    Parameters
+    ----------
+    window : `float`
+        maximum time (seconds) between consecutive events in a cluster
+    rank : `str`, optional, default: ``'snr'``
+        name of column by which to rank events in a cluster
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times
+
+    Returns
+    -------
+    table : `Table`
+        a new table, of the same type, with the loudest event of each
+        cluster, in their original order
+    """
+    ids = time_clusters(get_table_column(self, timecolumn), window)
+    return take(self, _loudest(ids, get_table_column(self, rank)))
+
+
+def cluster_tiles(self, rank='snr', start='start', end='stop', flow='flow',
+                  fhigh='fhigh'):
+    """Cluster the events in this `Table` by time-frequency tile overlap.
+
+    Each event is a tile in the time-frequency plane, from ``start`` to
+    ``end`` in time, and from ``flow`` to ``fhigh`` in frequency.
+    Overlapping (or touching) tiles are added to the same cluster, and
+    the loudest event of each cluster is kept.
+
+    Parameters
+    ----------
+    rank : `str`, optional, default: ``'snr'``
+        name of column by which to rank events in a cluster
+    start : `str`, optional, default: ``'start'``
+        name of column of tile start times
+    end : `str`, optional, default: ``'stop'``
+        name of column of tile end times
+    flow : `str`, optional, default: ``'flow'``
+        name of column of tile lower frequencies
+    fhigh : `str`, optional, default: ``'fhigh'``
+        name of column of tile upper frequencies
+
+    Returns
+    -------
+    table : `Table`
+        a new table, of the same type, with the loudest event of each
+        cluster, in their original order
+
+    See Also
+    --------
+    tile_clusters
+        for details of the clustering
+    """
+    ids = tile_clusters(get_table_column(self, start),
+                        get_table_column(self, end),
+                        get_table_column(self, flow),
+                        get_table_column(self, fhigh))
+    return take(self, _loudest(ids, get_table_column(self, rank)))
+
+
+def time_clusters(times, window):
+    """Assign events to clusters in time.
+
+    Parameters
+    ----------
+    times : `numpy.ndarray`
+        the time of each event
+    window : `float`
+        maximum time (seconds) between consecutive events in a cluster
+
+    Returns
+    -------
+    ids : `numpy.ndarray`
+        the index of the cluster of each event, clusters are numbered
+        in time order from zero
+    """
+    times = numpy.asarray(times)
+    order = numpy.argsort(times, kind='mergesort')
+    new = numpy.ones(times.size, dtype=bool)
+    new[1:] = numpy.diff(times[order]) > window
+    ids = numpy.empty(times.size, dtype=numpy.int64)
+    ids[order] = numpy.cumsum(new) - 1
+    return ids
+
+
+def tile_clusters(start, end, flow, fhigh, chunksize=65536):
+    """Assign time-frequency tiles to clusters of overlapping tiles.
+
+    Two tiles are linked if they overlap (or touch) in both time and
+    frequency, and each cluster is a connected component of linked
+    tiles.
+    Candidate pairs are found by sorting the tiles by start time and
+    sweeping forward to the last tile that starts before each tile
+    ends, then kept only if they also overlap in frequency.
+
+    Parameters
+    ----------
+    start, end : `numpy.ndarray`
+        the time extent of each tile
+    flow, fhigh : `numpy.ndarray`
+        the frequency extent of each tile
+    chunksize : `int`, optional, default: ``65536``
+        number of tiles whose candidate pairs are generated at once,
+        this bounds the memory used for dense sets of tiles
+
+    Returns
+    -------
+    ids : `numpy.ndarray`
+        the index of the cluster of each tile, clusters are numbered
+        from zero
+    """
+    start = numpy.asarray(start, dtype=numpy.float64)
+    n = start.size
+    if not n:
+        return numpy.zeros(0, dtype=numpy.int64)
+    order = numpy.argsort(start, kind='mergesort')
+    start = start[order]
+    end = numpy.asarray(end, dtype=numpy.float64)[order]
+    flow = numpy.asarray(flow, dtype=numpy.float64)[order]
+    fhigh = numpy.asarray(fhigh, dtype=numpy.float64)[order]
+    # tiles i < j (in start order) overlap in time iff start[j] <= end[i]
+    stop = numpy.searchsorted(start, end, side='right')
+    rows = []
+    cols = []
+    for a in range(0, n, chunksize):
+        b = min(a + chunksize, n)
+        first = numpy.arange(a, b)
+        count = numpy.clip(stop[a:b] - first - 1, 0, None)
+        total = int(count.sum())
+        if not total:
+            continue
+        i = numpy.repeat(first, count)
+        # offset of each pair within the run of pairs of its tile
+        offset = numpy.arange(total) - numpy.repeat(
+            numpy.cumsum(count) - count, count)
+        j = i + 1 + offset
+        keep = (flow[j] <= fhigh[i]) & (flow[i] <= fhigh[j])
+        rows.append(i[keep])
+        cols.append(j[keep])
+    if rows:
+        rows = numpy.concatenate(rows)
+        cols = numpy.concatenate(cols)
+    else:
+        rows = cols = numpy.zeros(0, dtype=numpy.int64)
+    graph = sparse.coo_matrix(
+        (numpy.ones(rows.size, dtype=bool), (rows, cols)), shape=(n, n))
+    labels = csgraph.connected_components(graph, directed=False)[1]
+    ids = numpy.empty(n, dtype=numpy.int64)
+    ids[order] = labels
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# utilities
+
+def _loudest(ids, rank):
+    """Find the index of the loudest event in each cluster.
+
+    Returns
+    -------
+    indices : `numpy.ndarray`
+        the sorted indices of the loudest event in each cluster
+    """
+    if not ids.size:
+        return ids
+    order = numpy.lexsort((rank, ids))
+    last = numpy.ones(ids.size, dtype=bool)
+    last[:-1] = ids[order][1:] != ids[order][:-1]
+    return numpy.sort(order[last])
+
+
+# attach methods to lsctables
+for table in EVENT_TABLES + (EventTable,):
+    table.cluster = cluster
+    table.cluster_tiles = cluster_tiles
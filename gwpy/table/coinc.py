@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Find time coincidences between tables of events.
+
+Events are coincident if the (offset) times of every pair of events
+differ by no more than the coincidence window. The events of each
+table after the first are sorted once, and the candidates for each
+coincidence are found by binary search about the time of the event in
+the first table, so that finding the coincidences between N tables of n
+events costs O(N n log n + k) for k coincidences, rather than O(n^N).
+
+Time slides, used to estimate the background of accidental
+coincidences, are evaluated for all slides in a single vectorised
+pass, see :func:`slide_coincidences`.
+"""
+
+import numpy
+
+from .. import version
+from .index import (expand_ranges, take)
+from .utils import get_table_column
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['coincidences', 'slide_coincidences', 'coinc_tables']
+
+
+def coincidences(tables, window, offsets=None, timecolumn='time'):
+    """Find the time coincidences between a number of tables.
+
+    Parameters
+    ----------
+    tables : `list`
+        the list of tables (:class:`~glue.ligolw.table.Table` or
+        `EventTable`), e.g. one per interferometer
+    window : `float`
+        the coincidence window (seconds)
+    offsets : `list` of `float`, optional
+        the time offset (seconds) to apply to each table, defaults to
+        zero for all tables
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times
+
+    Returns
+    -------
+    indices : `numpy.ndarray`
+        an array of shape ``(ncoinc, len(tables))`` giving the index of
+        the row of each table in each coincidence
+
+    See Also
+    --------
+    coinc_tables
+        to extract the rows for each coincidence
+    """
+    if offsets is None:
+        offsets = numpy.zeros(len(tables))
+    offsets = numpy.asarray(offsets, dtype=numpy.float64).reshape(1, -1)
+    return slide_coincidences(tables, window, offsets,
+                              timecolumn=timecolumn)[0]
+
+
+def slide_coincidences(tables, window, slides, timecolumn='time'):
+    """Find the time coincidences between tables over many time slides.
+
+    Parameters
+    ----------
+    tables : `list`
+        the list of tables (:class:`~glue.ligolw.table.Table` or
+        `EventTable`), e.g. one per interferometer
+    window : `float`
+        the coincidence window (seconds)
+    slides : `numpy.ndarray`
+        an array of shape ``(nslides, len(tables))`` giving the time
+        offset (seconds) to apply to each table in each slide
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times
+
+    Returns
+    -------
+    indices : `numpy.ndarray`
+        an array of shape ``(ncoinc, len(tables))`` giving the index of
+        the row of each table in each coincidence
+    slide : `numpy.ndarray`
+        the index of the slide for each coincidence
+
+    Examples
+    --------
+    To find coincidences between two detectors for 100 slides of the
+    second detector by multiples of 5 seconds:
+
+    >>> slides = numpy.zeros((100, 2))
+    >>> slides[:, 1] = numpy.arange(100) * 5
+    >>> indices, slide = slide_coincidences([h1, l1], 0.01, slides)
+    """
+    times = [numpy.asarray(get_table_column(table, timecolumn),
+                           dtype=numpy.float64) for table in tables]
+    slides = numpy.asarray(slides, dtype=numpy.float64)
+    if slides.ndim != 2 or slides.shape[1] != len(times):
+        raise ValueError("slides must have shape (nslides, %d)" % len(times))
+    if not times:
+        return numpy.zeros((0, 0), dtype=int), numpy.zeros(0, dtype=int)
+    nslides = slides.shape[0]
+
+    # start with every event of the first table in every slide
+    slide = numpy.repeat(numpy.arange(nslides), times[0].size)
+    members = [numpy.tile(numpy.arange(times[0].size), nslides)]
+
+    # then add the candidates from each other table in turn
+    for k in range(1, len(times)):
+        order = numpy.argsort(times[k], kind='mergesort')
+        sortedk = times[k][order]
+        anchor = (times[0][members[0]] + slides[slide, 0] -
+                  slides[slide, k])
+        which, positions = expand_ranges(
+            numpy.searchsorted(sortedk, anchor - window, side='left'),
+            numpy.searchsorted(sortedk, anchor + window, side='right'))
+        new = order[positions]
+        slide = slide[which]
+        members = [m[which] for m in members]
+        # check coincidence with every other member
+        tk = times[k][new] + slides[slide, k]
+        keep = numpy.ones(new.size, dtype=bool)
+        for j in range(1, k):
+            keep &= numpy.abs(times[j][members[j]] + slides[slide, j] -
+                              tk) <= window
+        members = [m[keep] for m in members] + [new[keep]]
+        slide = slide[keep]
+
+    return numpy.column_stack(members), slide
+
+
+def coinc_tables(tables, indices):
+    """Extract the rows of each table for a set of coincidences.
+
+    Parameters
+    ----------
+    tables : `list`
+        the list of tables passed to :func:`coincidences`
+    indices : `numpy.ndarray`
+        the array of row indices returned by :func:`coincidences`
+
+    Returns
+    -------
+    tables : `list`
+        a new table for each input table, whose ``i``'th rows together
+        form the ``i``'th coincidence
+    """
+    return [take(table, indices[:, i]) for (i, table) in enumerate(tables)]
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Columnar tables of events.
+
+The LIGO_LW :class:`~glue.ligolw.table.Table` stores each event as a
+separate Python object, so that reading, and extracting columns from,
+large sets of triggers is very slow, and uses a lot of memory.
+The `EventTable` stores the same information as one `numpy.ndarray` per
+column, and converts to a LIGO_LW table on demand.
+"""
+
+import operator
+import re
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import numpy
+
+from .. import version
+from ..io import reader
+from . import lsctables
+from .rate import (event_rate, binned_event_rates)
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['EventTable']
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt,
+             '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+_re_condition = re.compile(r'\A\s*(?P<column>[\w]+)\s*'
+                           r'(?P<operator><=|>=|==|!=|<|>)\s*'
+                           r'(?P<value>\S+)\s*\Z')
+
+# name of the column defining 'time' for each type of table
+TIME_COLUMNS = [
+    (re.compile('(sngl_inspiral|multi_inspiral)', re.I), 'end'),
+    (re.compile('(sngl_burst|multi_burst)', re.I), 'peak'),
+    (re.compile('(sngl_ring|multi_ring)', re.I), 'start'),
+]
+
+
+class EventTable(object):
+    """A table of events, with each column stored as a `numpy.ndarray`.
+
+    Parameters
+    ----------
+    data : `dict`, `list`, optional
+        (name, array) pairs for each column, all arrays must have the
+        same length
+    tableclass : `type`, optional
+        the LIGO_LW table class that this `EventTable` represents,
+        default: :class:`~glue.ligolw.lsctables.SnglBurstTable`
+
+    Notes
+    -----
+    Columns can be accessed by name, e.g. ``table['snr']``, or through
+    :meth:`get_column`, which also understands the names of
+    (seconds, nanoseconds) column pairs, e.g. ``'peak'`` for
+    ``peak_time`` and ``peak_time_ns``, and ``'time'`` for the
+    characteristic time of the table type.
+    """
+    def __init__(self, data=None, tableclass=lsctables.SnglBurstTable):
+        self.tableclass = tableclass
+        self.columns = OrderedDict()
+        if isinstance(data, dict):
+            data = data.items()
+        for name, column in data or []:
+            self[name] = column
+
+    # -------------------------------------------
+    # conversions
+
+    @classmethod
+    def from_table(cls, table, columns=None):
+        """Build a new `EventTable` from a LIGO_LW table.
+
+        Parameters
+        ----------
+        table : :class:`~glue.ligolw.table.Table`
+            the input table
+        columns : `list`, optional
+            list of column names to copy, defaults to all columns of
+            the input table
+
+        Returns
+        -------
+        eventtable : `EventTable`
+            a new table containing the same data
+        """
+        if columns is None:
+            columns = table.columnnames
+        tableclass = lsctables.TableByName[
+            lsctables.table.StripTableName(table.tableName)]
+        return cls([(str(name), numpy.asarray(table.getColumnByName(name)))
+                    for name in columns], tableclass=tableclass)
+
+    def to_table(self, columns=None):
+        """Convert this `EventTable` into a LIGO_LW table.
+
+        Parameters
+        ----------
+        columns : `list`, optional
+            list of column names to copy, defaults to all columns
+
+        Returns
+        -------
+        table : :class:`~glue.ligolw.table.Table`
+            a new LIGO_LW table of the type given by
+            :attr:`EventTable.tableclass`
+        """
+        if columns is None:
+            columns = self.colnames
+        out = lsctables.New(self.tableclass, columns=columns)
+        data = [(name, self[name].tolist()) for name in columns if
+                name != 'event_id']
+        for i in range(len(self)):
+            row = self.tableclass.RowType()
+            for name, values in data:
+                setattr(row, name, values[i])
+            if 'event_id' in columns:
+                row.event_id = out.get_next_id()
+            out.append(row)
+        return out
+
+    # -------------------------------------------
+    # properties
+
+    @property
+    def tableName(self):
+        """Name of the LIGO_LW table represented by this `EventTable`.
+        """
+        return self.tableclass.tableName
+
+    @property
+    def colnames(self):
+        """List of the names of the columns in this `EventTable`.
+        """
+        return list(self.columns.keys())
+
+    # -------------------------------------------
+    # column access
+
+    def get_column(self, name):
+        """Return the data for a column of this `EventTable`.
+
+        Parameters
+        ----------
+        name : `str`
+            name of the column, or of a (seconds, nanoseconds) pair of
+            columns (e.g. ``'peak'``), or ``'time'``
+
+        Returns
+        -------
+        column : `numpy.ndarray`
+            the data for the column
+
+        Raises
+        ------
+        KeyError
+            if the column is not found
+        """
+        name = str(name)
+        try:
+            return self.columns[name]
+        except KeyError:
+            if name == 'time':
+                return self.get_time()
+            if '%s_time' % name in self.columns:
+                return self._get_gps(name)
+            raise KeyError("No column named %r in this %s"
+                           % (name, type(self).__name__))
+
+    def _get_gps(self, prefix):
+        """Combine a (seconds, nanoseconds) column pair into GPS times.
+        """
+        seconds = self.columns['%s_time' % prefix].astype(numpy.float64)
+        try:
+            return seconds + self.columns['%s_time_ns' % prefix] * 1e-9
+        except KeyError:
+            return seconds
+
+    def get_time(self):
+        """Return the characteristic GPS time of each event.
+
+        This is the ``end`` time for inspiral tables, the ``peak`` time
+        for burst tables, and the ``start`` time for ringdown tables,
+        unless this table has a column named ``'time'``.
+        """
+        if 'time' in self.columns:
+            return self.columns['time']
+        for regex, prefix in TIME_COLUMNS:
+            if regex.match(self.tableName):
+                return self._get_gps(prefix)
+        raise KeyError("Cannot determine time column for %s"
+                       % self.tableName)
+
+    def get_peak(self):
+        return self._get_gps('peak')
+
+    def get_start(self):
+        return self._get_gps('start')
+
+    def get_end(self):
+        return self._get_gps('end')
+
+    def get_stop(self):
+        return self._get_gps('stop')
+
+    # -------------------------------------------
+    # container methods
+
+    def __len__(self):
+        try:
+            return next(iter(self.columns.values())).shape[0]
+        except StopIteration:
+            return 0
+
+    def __getitem__(self, item):
+        if isinstance(item, (str, unicode)):
+            return self.get_column(item)
+        if isinstance(item, (int, numpy.integer)):
+            return self._get_row(item)
+        return self._take(item)
+
+    def __setitem__(self, name, column):
+        column = numpy.asarray(column)
+        if column.ndim != 1:
+            raise ValueError("Columns must be one-dimensional")
+        if self.columns and name not in self.columns and (
+                column.shape[0] != len(self)):
+            raise ValueError("Cannot add column of length %d to %s of "
+                             "length %d" % (column.shape[0],
+                                            type(self).__name__, len(self)))
+        self.columns[str(name)] = column
+
+    def __delitem__(self, name):
+        del self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._get_row(i)
+
+    def _get_row(self, i):
+        """Return a single row of this table as a LIGO_LW row object.
+        """
+        row = self.tableclass.RowType()
+        for name, column in self.columns.items():
+            setattr(row, name, column[i].tolist())
+        return row
+
+    def _take(self, index):
+        """Return a new `EventTable` with the given rows of this one.
+        """
+        return type(self)([(name, column[index]) for
+                           (name, column) in self.columns.items()],
+                          tableclass=self.tableclass)
+
+    def copy(self):
+        """Return a copy of this `EventTable`.
+        """
+        return type(self)([(name, column.copy()) for
+                           (name, column) in self.columns.items()],
+                          tableclass=self.tableclass)
+
+    def extend(self, other):
+        """Append the rows of another table to this one, in-place.
+
+        Parameters
+        ----------
+        other : `EventTable`, :class:`~glue.ligolw.table.Table`
+            the table to append, with the same columns as this one
+
+        Returns
+        -------
+        self : `EventTable`
+            this table, extended in-place
+        """
+        if not isinstance(other, EventTable):
+            other = type(self).from_table(other)
+        if not self.columns:
+            self.columns = OrderedDict(other.columns.items())
+            return self
+        if set(other.colnames) != set(self.colnames):
+            raise ValueError("Cannot combine tables with different columns")
+        for name in self.colnames:
+            self.columns[name] = numpy.concatenate((self.columns[name],
+                                                    other.columns[name]))
+        return self
+
+    __iadd__ = extend
+
+    def __add__(self, other):
+        return self.copy().extend(other)
+
+    @classmethod
+    def concatenate(cls, tables, tableclass=lsctables.SnglBurstTable):
+        """Combine a number of tables into a single new `EventTable`.
+
+        Each column is allocated once, at its final length.
+        """
+        tables = [t for t in tables if t.columns]
+        if not tables:
+            return cls(tableclass=tableclass)
+        return cls([(name, numpy.concatenate([t.columns[name] for t in
+                                              tables]))
+                    for name in tables[0].colnames],
+                   tableclass=tables[0].tableclass)
+
+    # -------------------------------------------
+    # filtering
+
+    def filter(self, *conditions):
+        """Return the events in this table that match all conditions.
+
+        Parameters
+        ----------
+        *conditions
+            any number of conditions, each one of
+
+            - a `str` of the form ``'<column> <op> <value>'``, e.g.
+              ``'snr > 8'``, where ``<op>`` is one of ``<``, ``<=``,
+              ``>``, ``>=``, ``==``, or ``!=``
+            - a `tuple` of ``(column, op, value)``, where ``op`` is a
+              `str` operator as above, or a `callable`
+            - a `callable` taking this table and returning a boolean
+              array
+
+        Returns
+        -------
+        table : `EventTable`
+            a new table containing only those events matching all of
+            the conditions
+        """
+        return self._take(self.mask(*conditions))
+
+    def mask(self, *conditions):
+        """Return a boolean array saying which events match all conditions.
+
+        See :meth:`filter` for details.
+        """
+        keep = numpy.ones(len(self), dtype=bool)
+        for condition in conditions:
+            if isinstance(condition, (str, unicode)):
+                match = _re_condition.match(condition)
+                if match is None:
+                    raise ValueError("Cannot parse filter condition %r"
+                                     % condition)
+                column, op, value = match.groups()
+                condition = (column, op, float(value))
+            if isinstance(condition, tuple):
+                column, op, value = condition
+                if not callable(op):
+                    op = OPERATORS[op]
+                keep &= op(self.get_column(column), value)
+            else:
+                keep &= numpy.asarray(condition(self), dtype=bool)
+        return keep
+
+    def __repr__(self):
+        return '<%s(%s, %d rows, columns=[%s])>' % (
+            type(self).__name__, self.tableName, len(self),
+            ', '.join(self.colnames))
+
+    # -------------------------------------------
+    # analysis
+
+    event_rate = event_rate
+    binned_event_rates = binned_event_rates
+    plot, hist = lsctables._plot_factory()
+
+    read = classmethod(reader(doc="""
+    Read events into a new `EventTable`.
+
+    Parameters
+    ----------
+    f : `file`, `str`, `~glue.lal.CacheEntry`, `list`, `~glue.lal.Cache`
+        object representing one or more files. One of
+
+        - an open `file`
+        - a `str` pointing to a file path on disk
+        - a formatted `~glue.lal.CacheEntry` representing one file
+        - a `list` of `str` file paths
+        - a formatted `~glue.lal.Cache` representing many files
+
+    format : `str`, optional
+        source format identifier. If not given, the format will be
+        detected if possible. See below for list of acceptable
+        formats.
+    columns : `list`, optional
+        list of column name strings to read, default all.
+    tablename : `str`, optional, default: ``'sngl_burst'``
+        name of the LIGO_LW table to read, only valid for
+        ``format='ligolw'``
+    nproc : `int`, optional, default: ``1``
+        number of parallel processes with which to distribute file I/O,
+        default: serial process.
+
+    Returns
+    -------
+    table : `EventTable`
+        a new `EventTable` containing the events read from file
+
+    Notes
+    -----"""))
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time-sorted index of the events in a table.
+
+Selecting the events in a time window, or in a list of segments, by
+applying a mask (or a `filter` function) to every row costs O(n) for each
+query. The `TimeIndex` sorts the event times once, after which each
+query is a binary search (`numpy.searchsorted`) costing O(log n + k),
+for k matching events.
+"""
+
+import numpy
+
+from glue.ligolw import table as ligolw_table
+
+from .. import version
+from ..segments.array import SegmentArray
+from .events import EventTable
+from .utils import get_table_column
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['TimeIndex', 'take']
+
+
+class TimeIndex(object):
+    """A time-sorted index of the events in a table.
+
+    Parameters
+    ----------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`
+        the table of events to index
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times, see
+        :func:`~gwpy.table.utils.get_table_column`
+
+    Notes
+    -----
+    All queries return the indices of rows of the original table, in
+    time order, use :meth:`take` to build the matching table.
+    The index is not updated if the table is modified.
+
+    Examples
+    --------
+    >>> index = TimeIndex(table)
+    >>> rows = index.around([1000000000, 1000000100], 1)
+    >>> loud = index.take(rows)
+    """
+    def __init__(self, table, timecolumn='time'):
+        self.table = table
+        self.timecolumn = timecolumn
+        times = get_table_column(table, timecolumn)
+        self.order = numpy.argsort(times, kind='mergesort')
+        self.times = times[self.order]
+
+    def __len__(self):
+        return self.times.size
+
+    # -------------------------------------------
+    # queries
+
+    def window(self, start, end):
+        """Find the events in a single time window.
+
+        Parameters
+        ----------
+        start : `float`
+            GPS start time of the window
+        end : `float`
+            GPS end time of the window
+
+        Returns
+        -------
+        indices : `numpy.ndarray`
+            the index of each event with ``start <= time < end``
+        """
+        i, j = numpy.searchsorted(self.times, [float(start), float(end)],
+                                  side='left')
+        return self.order[i:j]
+
+    def around(self, times, before, after=None):
+        """Find the events near any of a number of times.
+
+        Parameters
+        ----------
+        times : `numpy.ndarray`, `list`
+            the GPS times about which to search
+        before : `float`
+            maximum time (seconds) before each time
+        after : `float`, optional
+            maximum time (seconds) after each time, defaults to ``before``
+
+        Returns
+        -------
+        indices : `numpy.ndarray`
+            the index of each event within the window around at least
+            one of the ``times``, each event is only returned once
+        """
+        if after is None:
+            after = before
+        times = numpy.sort(numpy.asarray(times, dtype=numpy.float64))
+        start, end = _merge_closed(times - before, times + after)
+        return self._take_ranges(
+            numpy.searchsorted(self.times, start, side='left'),
+            numpy.searchsorted(self.times, end, side='right'))
+
+    def in_segments(self, segments):
+        """Find the events inside any of a list of segments.
+
+        Parameters
+        ----------
+        segments : `~gwpy.segments.SegmentList`, `SegmentArray`
+            the list of [start, end) segments
+
+        Returns
+        -------
+        indices : `numpy.ndarray`
+            the index of each event inside any of the segments
+        """
+        start, end = SegmentArray.from_segmentlist(
+            segments).coalesce().to_seconds()
+        return self._take_ranges(
+            numpy.searchsorted(self.times, start, side='left'),
+            numpy.searchsorted(self.times, end, side='left'))
+
+    def mask(self, segments):
+        """Return a boolean mask of the events inside a list of segments.
+
+        Parameters
+        ----------
+        segments : `~gwpy.segments.SegmentList`, `SegmentArray`
+            the list of [start, end) segments
+
+        Returns
+        -------
+        mask : `numpy.ndarray`
+            a boolean array, in the order of the original table, that is
+            `True` for events inside any of the segments
+        """
+        mask = numpy.zeros(len(self), dtype=bool)
+        mask[self.in_segments(segments)] = True
+        return mask
+
+    def _take_ranges(self, first, last):
+        """Return the (original) indices for a set of ranges of sorted
+        positions.
+        """
+        return self.order[expand_ranges(first, last)[1]]
+
+    # -------------------------------------------
+    # output
+
+    def take(self, indices):
+        """Build a new table from some of the rows of the indexed table.
+
+        Parameters
+        ----------
+        indices : `numpy.ndarray`
+            the indices of the rows to take, e.g. from a query
+
+        Returns
+        -------
+        table : :class:`~glue.ligolw.table.Table`, `EventTable`
+            a new table of the same type as the indexed table
+        """
+        return take(self.table, indices)
+
+
+def _merge_closed(start, end):
+    """Merge overlapping closed intervals ``[start, end]``.
+
+    Unlike `SegmentArray.coalesce`, zero-length intervals are kept.
+
+    Parameters
+    ----------
+    start, end : `numpy.ndarray`
+        the bounds of each interval, sorted by ``start``
+
+    Returns
+    -------
+    start, end : `numpy.ndarray`
+        the bounds of the merged, disjoint intervals
+    """
+    if not start.size:
+        return start, end
+    runmax = numpy.maximum.accumulate(end)
+    new = numpy.ones(start.size, dtype=bool)
+    new[1:] = start[1:] > runmax[:-1]
+    last = numpy.ones(start.size, dtype=bool)
+    last[:-1] = new[1:]
+    return start[new], runmax[last]
+
+
+def expand_ranges(first, last):
+    """Expand a number of ranges into a single array of positions.
+
+    This is the vectorised equivalent of concatenating
+    ``range(first[i], last[i])`` for each ``i``.
+
+    Parameters
+    ----------
+    first : `numpy.ndarray`
+        the first position of each range
+    last : `numpy.ndarray`
+        the position after the end of each range
+
+    Returns
+    -------
+    which : `numpy.ndarray`
+        the index of the range containing each position
+    positions : `numpy.ndarray`
+        the positions covered by all ranges
+    """
+    lengths = numpy.clip(numpy.asarray(last) - numpy.asarray(first), 0, None)
+    which = numpy.repeat(numpy.arange(lengths.size), lengths)
+    offsets = numpy.repeat(first - numpy.cumsum(lengths) + lengths, lengths)
+    return which, numpy.arange(which.size) + offsets
+
+
+def take(table, indices):
+    """Build a new table from some of the rows of another.
+
+    Parameters
+    ----------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`
+        the input table
+    indices : `numpy.ndarray`
+        the indices of the rows to take
+
+    Returns
+    -------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`
+        a new table of the same type as the input
+    """
+    if isinstance(table, EventTable):
+        return table[numpy.asarray(indices, dtype=int)]
+    try:
+        out = table.copy()
+    except AttributeError:
+        out = ligolw_table.new_from_template(table)
+    out.extend(table[i] for i in numpy.asarray(indices).tolist())
+    return out
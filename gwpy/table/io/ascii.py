@@ -25,15 +25,28 @@ Each specific ASCII table format should define their own line parser
 (that generates each row of the table) and pass it to the factory method.
 """
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from itertools import islice
+
+import numpy
 from numpy import loadtxt
 
 from .. import lsctables
+from ..events import EventTable
 from ... import version
 from ...io.cache import file_list
+from ...utils.parallel import (map_shared, share)
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __version__ = version.version
 
+# number of lines to parse at once
+CHUNK_SIZE = 65536
+
 
 def ascii_table_factory(table, format, trig_func, cols=None, comments='#',
                         delimiter=None):
@@ -104,3 +117,184 @@ def ascii_table_factory(table, format, trig_func, cols=None, comments='#',
                     append(row)
         return out
     return table_from_ascii
+
+
+def ascii_eventtable_factory(table, format, array_func, cols=None, ncol=None,
+                             comments='#', delimiter=None):
+    """Build an `EventTable` reader for the given format
+
+    Parameters
+    ----------
+    table : `type`
+        LIGO_LW table class represented by the format
+    format : `str`
+        name of the format
+    array_func : `callable`
+        method to convert an array of data (from `numpy.loadtxt`) for many
+        events into a `dict` of (column, `numpy.ndarray`) pairs for all
+        columns that can be read; for parallel reading this must be
+        importable from a module
+    cols : `list` of `str`
+        list of columns that can be read by default for this format
+    ncol : `int`, optional
+        minimum number of columns of data in each file, used to shape
+        the data when no events are found
+    """
+    def eventtable_from_ascii(f, columns=cols, filt=None, nproc=1,
+                              chunksize=CHUNK_SIZE):
+        """Build an `EventTable` from events in an ASCII file.
+
+        Each file is parsed in chunks of ``chunksize`` lines, with all
+        columns for each chunk computed at once, and any filters applied
+        before the next chunk is read.
+
+        Parameters
+        ----------
+        f : `file`, `str`, `CacheEntry`, `list`, `Cache`
+            object representing one or more files. One of
+
+            - an open `file`
+            - a `str` pointing to a file path on disk
+            - a formatted :class:`~glue.lal.CacheEntry` representing one file
+            - a `list` of `str` file paths
+            - a formatted :class:`~glue.lal.Cache` representing many files
+
+        columns : `list`, optional
+            list of column name strings to read, default all.
+        filt : `str`, `tuple`, `function`, `list`, optional
+            condition, or `list` of conditions, by which to filter events,
+            see :meth:`EventTable.filter` for details; conditions can use
+            any column of the format, not just those in ``columns``
+        nproc : `int`, optional, default: 1
+            number of parallel processes with which to read files,
+            for ``nproc > 1`` any `function` conditions must be
+            importable from a module (i.e. not a lambda)
+        chunksize : `int`, optional
+            number of lines of each file to parse at once
+
+        Returns
+        -------
+        table : `EventTable`
+            a new `EventTable` filled with yummy data
+        """
+        if columns is None:
+            columns = cols
+        if filt is None:
+            conditions = ()
+        elif isinstance(filt, list):
+            conditions = tuple(filt)
+        else:
+            conditions = (filt,)
+
+        # read each file in parallel
+        backend = nproc > 1 and 'process' or 'thread'
+        tasks = [(fp, array_func, ncol, comments, delimiter, conditions,
+                  columns, chunksize, backend) for fp in file_list(f)]
+        data = map_shared(_read_ascii_file, tasks, nproc=nproc)
+        if not data:
+            data = [select_columns(array_func(numpy.empty((0, ncol or 0))),
+                                   columns)]
+
+        # combine columns
+        out = EventTable(tableclass=table)
+        for name in data[0]:
+            out[name] = numpy.concatenate([d[name] for d in data])
+        if 'event_id' in out:
+            out['event_id'] = numpy.arange(len(out))
+        return out
+    return eventtable_from_ascii
+
+
+def _read_ascii_file(task):
+    """Read the columns of data for the events in a single ASCII file.
+
+    This function is the unit of work for parallel reading, the
+    columns are returned via :func:`~gwpy.utils.parallel.share`.
+    """
+    (f, array_func, ncol, comments, delimiter, conditions, columns,
+     chunksize, backend) = task
+    if isinstance(f, (str, unicode)):
+        f = open(f, 'r')
+    parts = []
+    try:
+        for lines in _iter_chunks(f, chunksize, comments):
+            data = loadtxt(lines, comments=comments, delimiter=delimiter,
+                           ndmin=2)
+            chunk = EventTable(array_func(data).items())
+            if conditions:
+                chunk = chunk[chunk.mask(*conditions)]
+            parts.append(select_columns(chunk.columns, columns))
+    finally:
+        f.close()
+    if not parts:
+        parts.append(select_columns(array_func(numpy.empty((0, ncol or 0))),
+                                    columns))
+    out = OrderedDict((name, numpy.concatenate([p[name] for p in parts]))
+                      for name in parts[0])
+    return share(out, backend=backend)
+
+
+def _iter_chunks(f, chunksize, comments='#'):
+    """Yield lists of up to ``chunksize`` data lines from an open file.
+
+    Blank lines, and lines starting with the ``comments`` character,
+    are skipped.
+    """
+    lines = (line for line in f if line.strip() and
+             not line.lstrip().startswith(comments))
+    while True:
+        chunk = list(islice(lines, chunksize))
+        if not chunk:
+            break
+        yield chunk
+
+
+def split_gps(times):
+    """Split an array of GPS times into seconds and nanoseconds.
+
+    Parameters
+    ----------
+    times : `numpy.ndarray`
+        array of GPS times (seconds)
+
+    Returns
+    -------
+    seconds, nanoseconds : `numpy.ndarray`
+        two integer arrays, one of GPS seconds, and one of nanoseconds
+    """
+    times = numpy.asarray(times, dtype=numpy.float64)
+    seconds = numpy.floor(times)
+    nanoseconds = numpy.round((times - seconds) * 1e9).astype(numpy.int64)
+    seconds = seconds.astype(numpy.int64)
+    # handle rounding up to the next second
+    carry = nanoseconds >= 1000000000
+    seconds[carry] += 1
+    nanoseconds[carry] -= 1000000000
+    return seconds, nanoseconds
+
+
+def select_columns(data, columns):
+    """Select the requested columns from a `dict` of event data.
+
+    Parameters
+    ----------
+    data : `dict`
+        (column, `numpy.ndarray`) pairs for all columns that can be read
+    columns : `list` of `str`
+        the columns to select, ``'time'`` selects the ``peak_time``
+        and ``peak_time_ns`` columns
+
+    Returns
+    -------
+    columns : `OrderedDict`
+        (column, `numpy.ndarray`) pairs for the selected columns, in the
+        requested order
+    """
+    out = OrderedDict()
+    for name in columns:
+        if name == 'time':
+            for name_ in ('peak_time', 'peak_time_ns'):
+                out[name_] = data[name_]
+        elif name in data:
+            out[name] = data[name]
+    return out
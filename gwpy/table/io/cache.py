@@ -23,12 +23,13 @@ from astropy.io import registry
 
 from glue.ligolw.lsctables import TableByName
 
+from ..events import EventTable
 from ...io.cache import (identify_cache, identify_cache_file,
                          read_cache_factory)
 
 
 # register cache reading for all lsctables
-for table in TableByName.itervalues():
+for table in list(TableByName.values()) + [EventTable]:
     registry.register_reader('lcf', table, read_cache_factory(table))
     registry.register_reader('cache', table, read_cache_factory(table))
     registry.register_identifier('lcf', table, identify_cache_file)
@@ -19,12 +19,27 @@
 """Read LIGO_LW documents into glue.ligolw.table.Table objects.
 """
 
+import re
+from gzip import GzipFile
+from xml.sax import make_parser
+from xml.sax.handler import ContentHandler
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import numpy
+
 from astropy.io import registry
 
 from glue.ligolw.table import StripTableName as strip
 from glue.ligolw.lsctables import TableByName
 
+from ..events import (EventTable, TIME_COLUMNS, _re_condition)
+from ...io.cache import file_list
 from ...io.ligolw import (table_from_file, identify_ligolw)
+from ...utils.parallel import (map_shared, share)
 from ... import version
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
@@ -47,3 +62,314 @@ for table in TableByName.itervalues():
     registry.register_reader('ligolw', table, func)
     registry.register_reader(tablename, table, func)
     registry.register_identifier('ligolw', table, identify_ligolw)
+
+
+# ---------------------------------------------------------------------------
+# streaming LIGO_LW reader for EventTable
+
+# numpy type for each LIGO_LW column type
+LIGOLW_TYPES = {
+    'int_2s': numpy.int16, 'int_2u': numpy.uint16,
+    'int_4s': numpy.int32, 'int_4u': numpy.uint32,
+    'int_8s': numpy.int64, 'int_8u': numpy.uint64,
+    'real_4': numpy.float32, 'real_8': numpy.float64,
+    'float': numpy.float32, 'double': numpy.float64,
+    'complex_8': numpy.complex64, 'complex_16': numpy.complex128,
+    'ilwd:char': 'ilwd',
+}
+
+# number of characters of each table stream to parse at once
+CHUNK_SIZE = 2 ** 22
+
+_re_token = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|([^,"\s]*))\s*,')
+
+
+class TableStreamHandler(ContentHandler):
+    """SAX handler that parses one table of a LIGO_LW document into arrays.
+
+    Only the requested columns are converted, and the row ``conditions``
+    are applied to each chunk of the table stream as it is parsed, so
+    that no object is ever created for any row.
+
+    Parameters
+    ----------
+    tableclass : `type`
+        the LIGO_LW table class to read
+    columns : `list`, optional
+        names of the columns to read, default all
+    conditions : `tuple`, optional
+        row conditions, see :meth:`~gwpy.table.EventTable.filter`
+    chunksize : `int`, optional
+        number of characters of the table stream to parse at once
+    """
+    def __init__(self, tableclass, columns=None, conditions=(),
+                 chunksize=CHUNK_SIZE):
+        ContentHandler.__init__(self)
+        self.tableclass = tableclass
+        self.tablename = strip(tableclass.tableName)
+        self.columns = columns
+        self.conditions = conditions
+        self.chunksize = chunksize
+        self.parts = []
+        self._intable = False
+        self._instream = False
+
+    def startElement(self, name, attrs):
+        if name == 'Table':
+            self._intable = strip(attrs['Name']) == self.tablename
+            self._names = []
+            self._types = []
+        elif name == 'Column' and self._intable:
+            self._names.append(str(attrs['Name']).rsplit(':', 1)[-1])
+            self._types.append(str(attrs['Type']))
+        elif name == 'Stream' and self._intable:
+            self._instream = True
+            self._delimiter = attrs.get('Delimiter', ',')
+            self._buffer = []
+            self._size = 0
+            self._leftover = []
+            self._select_columns()
+
+    def endElement(self, name):
+        if name == 'Stream' and self._instream:
+            self._parse(final=True)
+            self._instream = False
+        elif name == 'Table':
+            self._intable = False
+
+    def characters(self, content):
+        if self._instream:
+            self._buffer.append(content)
+            self._size += len(content)
+            if self._size >= self.chunksize:
+                self._parse()
+
+    def _select_columns(self):
+        """Work out which columns need to be converted for each chunk.
+        """
+        if self.columns is None:
+            self._output = list(self._names)
+        else:
+            self._output = []
+            for column in self.columns:
+                self._output.extend(n for n in self._expand(column) if
+                                    n not in self._output)
+        needed = set(self._output)
+        for condition in self.conditions:
+            if callable(condition):
+                needed.update(self._names)
+                break
+            if isinstance(condition, (str, unicode)):
+                match = _re_condition.match(condition)
+                if match is None:
+                    raise ValueError("Cannot parse filter condition %r"
+                                     % condition)
+                condition = match.groups()
+            needed.update(self._expand(condition[0]))
+        self._wanted = [(i, name, self._types[i]) for
+                        (i, name) in enumerate(self._names) if name in needed]
+
+    def _expand(self, column):
+        """Return the names of the table columns that define ``column``.
+        """
+        column = str(column)
+        if column in self._names:
+            return [column]
+        if column == 'time':
+            for regex, prefix in TIME_COLUMNS:
+                if regex.match(self.tablename):
+                    return self._expand(prefix)
+            return []
+        return [n for n in ('%s_time' % column, '%s_time_ns' % column) if
+                n in self._names]
+
+    def _parse(self, final=False):
+        """Parse all complete rows in the buffered stream text.
+        """
+        text = ''.join(self._buffer)
+        if self._delimiter != ',':
+            text = text.replace(self._delimiter, ',')
+        if final and text.strip():
+            text += ','
+        tokens, rest = _tokenize(text)
+        self._buffer = [rest]
+        self._size = len(rest)
+        tokens = self._leftover + tokens
+        ncol = len(self._names)
+        nrow = len(tokens) // ncol
+        self._leftover = tokens[nrow * ncol:]
+        if not nrow and self.parts:
+            return
+        data = OrderedDict()
+        for i, name, type_ in self._wanted:
+            data[name] = _convert(tokens[i:nrow * ncol:ncol], type_)
+        chunk = EventTable(data.items(), tableclass=self.tableclass)
+        if self.conditions:
+            chunk = chunk[chunk.mask(*self.conditions)]
+        self.parts.append(OrderedDict((name, chunk.columns[name]) for
+                                      name in self._output))
+
+    @property
+    def data(self):
+        """The columns parsed so far, as an `OrderedDict` of arrays.
+        """
+        if not self.parts:
+            return OrderedDict()
+        return OrderedDict((name, numpy.concatenate([p[name] for
+                                                     p in self.parts]))
+                           for name in self.parts[0])
+
+
+def _tokenize(text):
+    """Split LIGO_LW stream text into tokens.
+
+    Returns
+    -------
+    tokens : `list` of `str`
+        each complete (comma-terminated) token
+    rest : `str`
+        the remaining text after the last complete token
+    """
+    # fast path: no quoted value contains a delimiter or an escape
+    quoted = text.split('"')
+    if '\\' not in text and not any(',' in q for q in quoted[1::2]):
+        end = text.rfind(',')
+        if len(quoted) % 2 == 0:  # unbalanced quote, stop before it
+            end = text.rfind(',', 0, text.rfind('"'))
+        if end == -1:
+            return [], text
+        return text[:end].split(','), text[end + 1:]
+    tokens = []
+    pos = 0
+    match = _re_token.match(text, pos)
+    while match:
+        tokens.append(match.group(0)[:-1])
+        pos = match.end()
+        match = _re_token.match(text, pos)
+    return tokens, text[pos:]
+
+
+def _convert(tokens, type_):
+    """Convert a list of stream tokens into an array of the given type.
+    """
+    dtype = LIGOLW_TYPES.get(type_, None)
+    if dtype == 'ilwd':
+        return numpy.array([int(t.strip().strip('"').rsplit(':', 1)[-1]) for
+                            t in tokens], dtype=numpy.int64)
+    if dtype is None:
+        return numpy.array([_unquote(t) for t in tokens], dtype=unicode)
+    try:
+        return numpy.array(tokens, dtype=dtype)
+    except ValueError:  # null values
+        null = numpy.dtype(dtype).kind in 'iu' and '0' or 'nan'
+        return numpy.array([t.strip() or null for t in tokens], dtype=dtype)
+
+
+def _unquote(token):
+    token = token.strip()
+    if token.startswith('"') and token.endswith('"'):
+        token = token[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return token
+
+
+def _read_ligolw_file(task):
+    """Read the columns of one table from a single LIGO_LW file.
+
+    This function is the unit of work for parallel reading, the
+    columns are returned via :func:`~gwpy.utils.parallel.share`.
+    """
+    f, tableclass, columns, conditions, chunksize, backend = task
+    handler = TableStreamHandler(tableclass, columns=columns,
+                                 conditions=conditions, chunksize=chunksize)
+    if isinstance(f, (str, unicode)) and f.endswith('.gz'):
+        f = GzipFile(f, 'rb')
+    elif isinstance(f, (str, unicode)):
+        f = open(f, 'rb')
+    try:
+        parser = make_parser()
+        parser.setContentHandler(handler)
+        parser.parse(f)
+    finally:
+        f.close()
+    return share(handler.data, backend=backend)
+
+
+def eventtable_from_ligolw(f, tablename='sngl_burst', columns=None,
+                           filt=None, nproc=1, chunksize=CHUNK_SIZE,
+                           **kwargs):
+    """Read an `EventTable` from a LIGO_LW file.
+
+    Each file is streamed through a SAX parser, only the requested
+    columns of the requested table are converted, and any filter
+    conditions are applied while parsing, so that rejected rows are
+    never stored.
+
+    Parameters
+    ----------
+    f : `file`, `str`, `CacheEntry`, `list`, `Cache`
+        object representing one or more files
+    tablename : `str`, optional, default: ``'sngl_burst'``
+        name of the table to read
+    columns : `list`, optional
+        list of column name strings to read, default all.
+    filt : `str`, `tuple`, `function`, `list`, optional
+        condition, or `list` of conditions, by which to filter events,
+        see :meth:`EventTable.filter` for details; conditions can use
+        any column of the table, not just those in ``columns``
+    nproc : `int`, optional, default: 1
+        number of parallel processes with which to read files,
+        for ``nproc > 1`` any `function` conditions must be
+        importable from a module (i.e. not a lambda)
+    chunksize : `int`, optional
+        number of characters of each table stream to parse at once
+    contenthandler : :class:`~glue.ligolw.ligolw.LIGOLWContentHandler`
+        SAX content handler for parsing LIGO_LW documents, if given the
+        table is read with :func:`~gwpy.io.ligolw.table_from_file`
+        and converted, rather than streamed
+    verbose : `bool`, optional
+        accepted for compatibility with
+        :func:`~gwpy.io.ligolw.table_from_file`, and ignored
+
+    Returns
+    -------
+    table : `EventTable`
+        a new `EventTable` holding the data from the LIGO_LW table
+    """
+    kwargs.pop('verbose', None)
+    contenthandler = kwargs.pop('contenthandler', None)
+    if kwargs:
+        raise TypeError("eventtable_from_ligolw() got unexpected keyword "
+                        "argument(s): %s" % ', '.join(sorted(kwargs)))
+    if filt is None:
+        conditions = ()
+    elif isinstance(filt, list):
+        conditions = tuple(filt)
+    else:
+        conditions = (filt,)
+
+    # custom content handler: read rows with glue, then convert
+    if contenthandler is not None:
+        table = table_from_file(f, tablename, columns=columns,
+                                contenthandler=contenthandler, nproc=nproc)
+        out = EventTable.from_table(table)
+        if conditions:
+            out = out.filter(*conditions)
+        return out
+
+    tableclass = TableByName[strip(tablename)]
+    backend = nproc > 1 and 'process' or 'thread'
+    files = [fp.name if isinstance(fp, (file, GzipFile)) else fp for
+             fp in file_list(f)]
+    tasks = [(fp, tableclass, columns, conditions, chunksize, backend) for
+             fp in files]
+    data = map_shared(_read_ligolw_file, tasks, nproc=nproc)
+    data = [d for d in data if d]
+    out = EventTable(tableclass=tableclass)
+    for name in data and data[0] or []:
+        out[name] = numpy.concatenate([d[name] for d in data])
+    if 'event_id' in out and len(data) > 1:
+        out['event_id'] = numpy.arange(len(out))
+    return out
+
+registry.register_reader('ligolw', EventTable, eventtable_from_ligolw)
+registry.register_identifier('ligolw', EventTable, identify_ligolw)
@@ -22,11 +22,14 @@
 import sys
 from math import sqrt
 
+import numpy
 from numpy import loadtxt
 
 from astropy.io import registry
 
-from .ascii import ascii_table_factory
+from .ascii import (ascii_table_factory, ascii_eventtable_factory,
+                    split_gps)
+from ..events import EventTable
 from ..lsctables import (SnglBurstTable, SnglBurst)
 from ... import version
 from ...io.cache import file_list
@@ -210,6 +213,73 @@ def sngl_burst_from_omegadq(line, columns=OMEGADQ_COLUMNS):
     return t
 
 
+def columns_from_omega(data):
+    """Build columns of event data from an array of Omega ASCII data.
+
+    Parameters
+    ----------
+    data : `numpy.ndarray`
+        2-dimensional array of data, with one row per event
+
+    Returns
+    -------
+    columns : `dict`
+        (column, `numpy.ndarray`) pairs for all columns that can be read
+    """
+    peak, freq, duration, band, nerg = data[:, :5].T
+    out = {'search': numpy.repeat(u'omega', peak.size),
+           'event_id': numpy.arange(peak.size)}
+    out['peak_time'], out['peak_time_ns'] = split_gps(peak)
+    out['start_time'], out['start_time_ns'] = split_gps(peak - duration / 2.)
+    out['stop_time'], out['stop_time_ns'] = split_gps(peak + duration / 2.)
+    out['duration'] = duration
+    out['central_freq'] = freq
+    out['flow'] = freq - band / 2.
+    out['fhigh'] = freq + band / 2.
+    out['bandwidth'] = band
+    out['snr'] = out['confidence'] = numpy.sqrt(2 * nerg)
+    out['amplitude'] = nerg
+    return out
+
+
+def columns_from_omegadq(data):
+    """Build columns of event data from an array of Omega DQ ASCII data.
+
+    Parameters
+    ----------
+    data : `numpy.ndarray`
+        2-dimensional array of data, with one row per event
+
+    Returns
+    -------
+    columns : `dict`
+        (column, `numpy.ndarray`) pairs for all columns that can be read
+    """
+    (start, stop, peak, flow, fhigh, nevents, ms_start, ms_stop, ms_flow,
+     ms_fhigh, clst_size, clst_energy, ms_snr) = data.T
+    out = {'search': numpy.repeat(u'omega', peak.size),
+           'event_id': numpy.arange(peak.size)}
+    out['peak_time'], out['peak_time_ns'] = split_gps(peak)
+    out['start_time'], out['start_time_ns'] = split_gps(start)
+    out['stop_time'], out['stop_time_ns'] = split_gps(stop)
+    out['duration'] = stop - start
+    out['flow'] = flow
+    out['fhigh'] = fhigh
+    out['bandwidth'] = fhigh - flow
+    out['central_freq'] = flow + (fhigh - flow) * .5
+    out['ms_start_time'], out['ms_start_time_ns'] = split_gps(ms_start)
+    out['ms_stop_time'], out['ms_stop_time_ns'] = split_gps(ms_stop)
+    out['ms_duration'] = ms_stop - ms_start
+    out['ms_flow'] = ms_flow
+    out['ms_fhigh'] = ms_fhigh
+    out['ms_bandwidth'] = ms_fhigh - ms_flow
+    out['peak_frequency'] = ms_flow + (ms_fhigh - ms_flow) * .5
+    out['snr'] = out['confidence'] = numpy.sqrt(2 * clst_energy)
+    out['amplitude'] = clst_energy
+    out['ms_snr'] = numpy.sqrt(2 * ms_snr)
+    return out
+
+
 # register OmegaDQ
 registry.register_reader(
     'omegadq', SnglBurstTable,
@@ -222,3 +292,13 @@ registry.register_reader(
     ascii_table_factory(SnglBurstTable, 'omega',
                         sngl_burst_from_omega, OMEGA_COLUMNS,
                         comments='%'))
+
+# register columnar readers
+registry.register_reader(
+    'omegadq', EventTable,
+    ascii_eventtable_factory(SnglBurstTable, 'omegadq', columns_from_omegadq,
+                             OMEGADQ_COLUMNS, ncol=13))
+registry.register_reader(
+    'omega', EventTable,
+    ascii_eventtable_factory(SnglBurstTable, 'omega', columns_from_omega,
+                             OMEGA_COLUMNS, ncol=5, comments='%'))
@@ -24,13 +24,17 @@ import sys
 if sys.version_info[0] < 3:
     range = xrange
 
+import numpy
+
 from astropy.io import registry
 
 from glue.lal import (Cache, CacheEntry)
 
+from .ascii import (split_gps, select_columns)
 from .. import lsctables
+from ..events import EventTable
 from ... import version
-from ...io.cache import open_cache
+from ...io.cache import (open_cache, file_list)
 from ...time import LIGOTimeGPS
 from ...utils import with_import
 
@@ -169,6 +173,111 @@ def table_from_root(f, columns=OMICRON_COLUMNS, filt=None, nproc=1):
     return out
 
 
+@with_import('ROOT')
+def eventtable_from_root(f, columns=OMICRON_COLUMNS, filt=None, nproc=1):
+    """Build an `EventTable` from events in an Omicron ROOT file.
+
+    Parameters
+    ----------
+    f : `file`, `str`, `CacheEntry`, `list`, `Cache`
+        object representing one or more files. One of
+
+        - an open `file`
+        - a `str` pointing to a file path on disk
+        - a formatted :class:`~glue.lal.CacheEntry` representing one file
+        - a `list` of `str` file paths
+        - a formatted :class:`~glue.lal.Cache` representing many files
+
+    columns : `list`, optional
+        list of column name strings to read, default all.
+    filt : `str`, `tuple`, `function`, optional
+        condition by which to filter events, see
+        :meth:`EventTable.filter` for details
+    nproc : `int`, optional, default: 1
+        number of parallel processes with which to distribute file I/O,
+        default: serial process
+    """
+    # allow multiprocessing
+    if nproc != 1:
+        from ...io.cache import read_cache
+        return read_cache(f, EventTable, nproc, None, columns=columns,
+                          filt=filt, format='omicron')
+
+    # read tree chain
+    tree = ROOT.TChain('triggers')
+    for filename in file_list(f):
+        tree.Add(filename)
+
+    # read raw data for all events
+    raw = read_root_branches(tree, ('time', 'tstart', 'tend', 'frequency',
+                                    'fstart', 'fend', 'snr'))
+
+    # convert to columns
+    out = {'search': numpy.repeat(u'omicron', raw['time'].size)}
+    out['peak_time'], out['peak_time_ns'] = split_gps(raw['time'])
+    out['start_time'], out['start_time_ns'] = split_gps(raw['tstart'])
+    out['stop_time'], out['stop_time_ns'] = split_gps(raw['tend'])
+    out['duration'] = raw['tend'] - raw['tstart']
+    out['central_freq'] = out['peak_frequency'] = raw['frequency']
+    out['flow'] = raw['fstart']
+    out['fhigh'] = raw['fend']
+    out['bandwidth'] = raw['fend'] - raw['fstart']
+    out['snr'] = out['confidence'] = raw['snr']
+    out['amplitude'] = raw['snr'] ** 2 / 2.
+    table = EventTable(select_columns(out, columns or OMICRON_COLUMNS).items(),
+                       tableclass=lsctables.SnglBurstTable)
+    if filt is not None:
+        table = table.filter(filt)
+    return table
+
+
+def read_root_branches(tree, branches):
+    """Read all entries of a number of branches of a ROOT `TTree`.
+
+    Each branch is read in bulk with `root_numpy`, if available, or
+    with ``TTree.Draw``, four branches at a time, rather than by
+    looping over entries in Python.
+
+    Parameters
+    ----------
+    tree : `ROOT.TTree`, `ROOT.TChain`
+        the tree to read
+    branches : `list` of `str`
+        the names of the branches to read
+
+    Returns
+    -------
+    data : `dict`
+        (branch, array) pairs for each branch, as `numpy.float64`
+    """
+    try:
+        from root_numpy import tree2array
+    except ImportError:
+        pass
+    else:
+        data = tree2array(tree, branches=list(branches))
+        return dict((branch, data[branch].astype(numpy.float64)) for
+                    branch in branches)
+
+    # read at most four branches per draw, one per Draw buffer
+    nevents = tree.GetEntries()
+    if not nevents:
+        return dict((branch, numpy.empty(0)) for branch in branches)
+    tree.SetEstimate(nevents + 1)
+    data = {}
+    for i in range(0, len(branches), 4):
+        group = branches[i:i+4]
+        n = tree.Draw(':'.join(group), '', 'goff')
+        for j, branch in enumerate(group):
+            buf = getattr(tree, 'GetV%d' % (j + 1))()
+            if hasattr(buf, 'SetSize'):
+                buf.SetSize(n)
+            # copy, the buffers are reused by the next Draw
+            data[branch] = numpy.frombuffer(buf, dtype=numpy.float64,
+                                            count=n).copy()
+    return data
+
+
 def identify_omicron(*args, **kwargs):
     """Determine an input object as an Omicron-format ROOT file.
     """
@@ -190,3 +299,6 @@ def identify_omicron(*args, **kwargs):
 registry.register_reader('omicron', lsctables.SnglBurstTable, table_from_root)
 registry.register_identifier('omicron', lsctables.SnglBurstTable,
                              identify_omicron)
+
+registry.register_reader('omicron', EventTable, eventtable_from_root)
+registry.register_identifier('omicron', EventTable, identify_omicron)
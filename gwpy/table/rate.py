@@ -29,12 +29,15 @@ from .utils import (EVENT_TABLES, get_table_column)
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __version__ = version.version
-__all__ = ['event_rate', 'binned_event_rates']
+__all__ = ['event_rate', 'binned_event_rates', 'RateAccumulator']
 
 OPERATORS = {'<': _operator.lt, '<=': _operator.le, '=': _operator.eq,
              '>=': _operator.ge, '>': _operator.gt, '==': _operator.is_,
              '!=': _operator.is_not}
 
+# operators whose binned rates are cumulative over the bins
+CUMULATIVE = ('<', '<=', '>', '>=')
+
 
 def event_rate(self, stride, start=None, end=None, timecolumn='time'):
     """Calculate the rate `~gwpy.timeseries.TimeSeries` for this `Table`.
@@ -64,13 +67,14 @@ def event_rate(self, stride, start=None, end=None, timecolumn='time'):
         start = times.min()
     if not end:
         end = times.max()
-    nsamp = int(ceil((end - start) / stride))
-    timebins = numpy.arange(nsamp + 1) * stride + start
-    # histogram data and return
-    out = TimeSeries(numpy.histogram(times, bins=timebins)[0] / float(stride),
-                     epoch=start, sample_rate=1/float(stride), unit='Hz',
-                     name='Event rate')
-    return out
+    start = float(start)
+    nsamp = int(ceil((float(end) - start) / stride))
+    # count events in each bin
+    tidx = _time_bins(times, start, stride, nsamp)
+    counts = numpy.bincount(tidx[tidx >= 0], minlength=nsamp)
+    return TimeSeries(counts / float(stride), epoch=start,
+                      sample_rate=1/float(stride), unit='Hz',
+                      name='Event rate')
 
 
 def binned_event_rates(self, stride, column, bins, operator='>=',
@@ -115,9 +119,15 @@ def binned_event_rates(self, stride, column, bins, operator='>=',
     rates : :class:`~gwpy.timeseries.TimeSeriesDict`
         a dict of (bin, `~gwpy.timeseries.TimeSeries`) pairs describing a
         rate of events per second (Hz) for each of the bins.
+
+    Notes
+    -----
+    The time bin of each event is calculated once, and the counts for
+    all bins are accumulated in a single pass over the events.
+    Threshold operators (``'<'``, ``'<='``, ``'>'``, ``'>='``) are
+    evaluated by counting events between consecutive thresholds, then
+    taking a cumulative sum over the thresholds.
     """
-    from gwpy.timeseries import (TimeSeries, TimeSeriesDict)
-    from gwpy.plotter.table import get_column_string
     # get time data
     times = get_table_column(self, timecolumn)
 
@@ -132,32 +142,259 @@ def binned_event_rates(self, stride, column, bins, operator='>=',
         start = times.min()
     if not end:
         end = times.max()
-    nsamp = int(ceil((end - start) / stride))
-    timebins = numpy.arange(nsamp + 1) * stride + start
-    # generate column bins
+    start = float(start)
+    nsamp = int(ceil((float(end) - start) / stride))
+    bins = _format_bins(bins, operator)
+
+    # count events in each bin
+    tidx = _time_bins(times, start, stride, nsamp)
+    coldata = get_table_column(self, column)
+    counts = _binned_counts(tidx, coldata, bins, operator, nsamp)
+    return _format_rates(counts, bins, stride, start, column, operator,
+                         channel)
+
+
+class RateAccumulator(object):
+    """Accumulate event rates from a stream of event tables.
+
+    This object allows the rates to be updated as new events (e.g. new
+    trigger files) arrive, without holding all of the events in memory.
+
+    Parameters
+    ----------
+    stride : `float`
+        size (seconds) of each time bin
+    start : `float`, :class:`~gwpy.time.LIGOTimeGPS`
+        GPS start epoch of rate `~gwpy.timeseries.TimeSeries`
+    end : `float`, :class:`~gwpy.time.LIGOTimeGPS`, optional
+        GPS end time of rate `~gwpy.timeseries.TimeSeries`, events
+        after this time are ignored; if not given the rates are
+        extended to cover each new event
+    column : `str`, optional
+        name of column by which to bin, if given
+        :meth:`binned_event_rates` can be used
+    bins : `list`, optional
+        list of bins for ``column``, see :func:`binned_event_rates`
+    operator : `str`, `callable`, optional
+        operator for ``bins``, see :func:`binned_event_rates`
+    timecolumn : `str`, optional, default: ``time``
+        name of time-column to use when binning events
+
+    Examples
+    --------
+    >>> rates = RateAccumulator(1, 1000000000, column='snr', bins=[5, 8])
+    >>> for f in files:
+    ...     rates.add(SnglBurstTable.read(f))
+    >>> rates.binned_event_rates()
+    """
+    def __init__(self, stride, start, end=None, column=None, bins=None,
+                 operator='>=', timecolumn='time'):
+        self.stride = float(stride)
+        self.start = float(start)
+        self.column = column
+        self.bins = _format_bins(bins, operator)
+        self.operator = operator
+        self.timecolumn = timecolumn
+        self.channel = None
+        self.fixed = end is not None
+        if self.fixed:
+            self.nsamp = int(ceil((float(end) - self.start) / self.stride))
+        else:
+            self.nsamp = 0
+        self._counts = numpy.zeros(self.nsamp, dtype=numpy.int64)
+        if column is not None:
+            self._binned = numpy.zeros((self.nsamp, len(self.bins)),
+                                       dtype=numpy.int64)
+
+    def add(self, table):
+        """Add the events in a new table to these rates.
+
+        Parameters
+        ----------
+        table : :class:`~glue.ligolw.table.Table`, `EventTable`
+            the table of new events
+        """
+        if not len(table):
+            return
+        if self.channel is None:
+            try:
+                self.channel = table[0].channel
+            except (IndexError, AttributeError):
+                pass
+        times = get_table_column(table, self.timecolumn)
+        if not self.fixed:
+            self._grow(int((times.max() - self.start) // self.stride) + 1)
+        tidx = _time_bins(times, self.start, self.stride, self.nsamp)
+        self._counts[:self.nsamp] += numpy.bincount(tidx[tidx >= 0],
+                                                    minlength=self.nsamp)
+        if self.column is not None:
+            self._binned[:self.nsamp] += _binned_counts(
+                tidx, get_table_column(table, self.column), self.bins,
+                self.operator, self.nsamp)
+
+    def _grow(self, nsamp):
+        """Extend the rates to ``nsamp`` bins, doubling the storage
+        when it runs out.
+        """
+        if nsamp <= self.nsamp:
+            return
+        if nsamp > self._counts.shape[0]:
+            size = max(nsamp, 2 * self._counts.shape[0])
+            counts = numpy.zeros(size, dtype=numpy.int64)
+            counts[:self.nsamp] = self._counts[:self.nsamp]
+            self._counts = counts
+            if self.column is not None:
+                binned = numpy.zeros((size, len(self.bins)),
+                                     dtype=numpy.int64)
+                binned[:self.nsamp] = self._binned[:self.nsamp]
+                self._binned = binned
+        self.nsamp = nsamp
+
+    def event_rate(self):
+        """Return the rate of all events added so far.
+
+        Returns
+        -------
+        rate : :class:`~gwpy.timeseries.TimeSeries`
+            a `TimeSeries` of events per second (Hz)
+        """
+        from gwpy.timeseries import TimeSeries
+        return TimeSeries(self._counts[:self.nsamp] / self.stride,
+                          epoch=self.start, sample_rate=1/self.stride,
+                          unit='Hz', name='Event rate')
+
+    def binned_event_rates(self):
+        """Return the binned rates of all events added so far.
+
+        Returns
+        -------
+        rates : :class:`~gwpy.timeseries.TimeSeriesDict`
+            a dict of (bin, `~gwpy.timeseries.TimeSeries`) pairs
+            describing a rate of events per second (Hz) for each of
+            the bins.
+        """
+        if self.column is None:
+            raise ValueError("No column was given for binning events")
+        return _format_rates(self._binned[:self.nsamp], self.bins,
+                             self.stride, self.start, self.column,
+                             self.operator, self.channel)
+
+
+# ---------------------------------------------------------------------------
+# utilities
+
+def _time_bins(times, start, stride, nsamp):
+    """Find the index of the time bin for each event.
+
+    As for `numpy.histogram`, the last bin includes its right edge.
+    Events outside of all bins are given an index of ``-1``.
+    """
+    times = numpy.asarray(times, dtype=numpy.float64)
+    with numpy.errstate(invalid='ignore'):
+        idx = numpy.floor((times - start) / stride)
+        idx[times == start + nsamp * stride] = nsamp - 1
+        idx[~((idx >= 0) & (idx < nsamp))] = -1
+    return idx.astype(numpy.int64)
+
+
+def _format_bins(bins, operator):
+    """Format the list of column bins for binned rates.
+    """
     if not bins:
-        bins = [(-numpy.inf, numpy.inf)]
+        return [(-numpy.inf, numpy.inf)]
     if operator == 'in' and not isinstance(bins[0], tuple):
-        bins2 = []
-        for i, bin_ in enumerate(bins[:-1]):
-            bins2.append((bin_, bins[i+1]))
-        bins = bins2
-    elif isinstance(operator, (unicode, str)):
-        op = OPERATORS[operator]
+        return list(zip(bins[:-1], bins[1:]))
+    return list(bins)
+
+
+def _count2d(tidx, cidx, nsamp, nbins):
+    """Count events in each (time, column) bin with a single `bincount`.
+    """
+    return numpy.bincount(tidx * nbins + cidx,
+                          minlength=nsamp * nbins).reshape(nsamp, nbins)
+
+
+def _binned_counts(tidx, coldata, bins, operator, nsamp):
+    """Count the events in each time bin, for each column bin.
+
+    Parameters
+    ----------
+    tidx : `numpy.ndarray`
+        time-bin index of each event, from `_time_bins`
+    coldata : `numpy.ndarray`
+        column value for each event
+    bins : `list`
+        list of column bins, from `_format_bins`
+    operator : `str`, `callable`
+        operator for each bin, see `binned_event_rates`
+    nsamp : `int`
+        number of time bins
+
+    Returns
+    -------
+    counts : `numpy.ndarray`
+        2-dimensional array of counts, with one column per bin, in the
+        same order as ``bins``
+    """
+    nbins = len(bins)
+    counts = numpy.zeros((nsamp, nbins), dtype=numpy.int64)
+    coldata = numpy.asarray(coldata)
+    keep = tidx >= 0
+    if coldata.dtype.kind == 'f':
+        keep &= ~numpy.isnan(coldata)
+    tidx = tidx[keep]
+    coldata = coldata[keep]
+
+    if isinstance(bins[0], tuple):
+        lower, upper = map(numpy.asarray, zip(*bins))
+        order = numpy.argsort(lower, kind='mergesort')
+        lower = lower[order]
+        upper = upper[order]
+        # non-overlapping bins: find each event's bin with one search
+        if (lower[1:] >= upper[:-1]).all():
+            cidx = numpy.searchsorted(lower, coldata, side='right') - 1
+            inbin = cidx >= 0
+            inbin[inbin] = coldata[inbin] < upper[cidx[inbin]]
+            counts[:, order] = _count2d(tidx[inbin], cidx[inbin], nsamp,
+                                        nbins)
+            return counts
+        masks = [(coldata >= a) & (coldata < b) for (a, b) in bins]
+    elif operator in CUMULATIVE:
+        thresholds = numpy.asarray(bins)
+        order = numpy.argsort(thresholds, kind='mergesort')
+        side = operator in ('>=', '<') and 'right' or 'left'
+        # count events between consecutive thresholds ...
+        cidx = numpy.searchsorted(thresholds[order], coldata, side=side)
+        between = _count2d(tidx, cidx, nsamp, nbins + 1)
+        # ... then sum the counts above (or below) each threshold
+        if operator in ('>=', '>'):
+            counts[:, order] = between[:, ::-1].cumsum(axis=1)[:, -2::-1]
+        else:
+            counts[:, order] = between.cumsum(axis=1)[:, :-1]
+        return counts
     else:
-        op = operator
-    coldata = get_table_column(self, column)
+        if isinstance(operator, (unicode, str)):
+            op = OPERATORS[operator]
+        else:
+            op = operator
+        masks = [op(coldata, bin_) for bin_ in bins]
+
+    for j, mask in enumerate(masks):
+        counts[:, j] = numpy.bincount(tidx[mask], minlength=nsamp)
+    return counts
+
+
+def _format_rates(counts, bins, stride, start, column, operator, channel):
+    """Build a `TimeSeriesDict` of binned rates from an array of counts.
+    """
+    from gwpy.timeseries import (TimeSeries, TimeSeriesDict)
+    from gwpy.plotter.table import get_column_string
     colstr = get_column_string(column)
-    # generate one TimeSeries per bin
     out = TimeSeriesDict()
-    for bin_ in bins:
-        if isinstance(bin_, tuple):
-            bintimes = times[(coldata >= bin_[0]) & (coldata < bin_[1])]
-        else:
-            bintimes = times[op(coldata, bin_)]
+    for j, bin_ in enumerate(bins):
         out[bin_] = TimeSeries(
-            numpy.histogram(bintimes, bins=timebins)[0] / float(stride),
-            epoch=start, sample_rate=1/float(stride), unit='Hz',
+            counts[:, j] / float(stride), epoch=start,
+            sample_rate=1/float(stride), unit='Hz',
             name='%s $%s$ %s' % (colstr, operator, bin_), channel=channel)
     return out
 
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Veto events with data-quality flags.
+
+The event times are sorted once (see :class:`~gwpy.table.TimeIndex`),
+then the events inside the active segments of each flag are found by
+binary search, so that evaluating many flags against many events costs
+O(n log n + f s log n) for n events and f flags of s segments each,
+rather than O(n f s).
+The events vetoed by each flag are recorded as indices, and tables of
+vetoed or surviving events are only built when requested.
+"""
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import numpy
+
+from astropy.table import Table
+
+from .. import version
+from ..segments import (DataQualityFlag, DataQualityDict)
+from ..segments.array import SegmentArray
+from .index import (TimeIndex, take)
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['veto', 'veto_statistics', 'VetoResult']
+
+
+def veto(table, flags, timecolumn='time'):
+    """Apply a number of data-quality flags as vetoes to a table of events.
+
+    Parameters
+    ----------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`
+        the table of events
+    flags : `DataQualityDict`, `DataQualityFlag`
+        the flags to apply, events inside the `active` segments of a
+        flag are vetoed by that flag
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times
+
+    Returns
+    -------
+    result : `VetoResult`
+        the indices of the events vetoed by each flag, and the veto
+        statistics, tables of vetoed or surviving events are only built
+        on request
+
+    Examples
+    --------
+    >>> result = veto(events, flags)
+    >>> print(result.statistics)
+    >>> clean = result.surviving()
+    """
+    flags = _format_flags(flags)
+    index = TimeIndex(table, timecolumn=timecolumn)
+    vetoed = OrderedDict()
+    for name, flag in flags.items():
+        vetoed[name] = numpy.sort(index.in_segments(flag.active))
+    return VetoResult(table, vetoed, veto_statistics(index, flags))
+
+
+class VetoResult(object):
+    """The result of applying a number of vetoes to a table of events.
+
+    Parameters
+    ----------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`
+        the table of events
+    indices : `OrderedDict`
+        (flag name, `numpy.ndarray`) pairs of the sorted indices of the
+        events vetoed by each flag
+    statistics : :class:`~astropy.table.Table`
+        the veto statistics for each flag, see :func:`veto_statistics`
+    """
+    def __init__(self, table, indices, statistics):
+        self.table = table
+        self.indices = indices
+        self.statistics = statistics
+
+    @property
+    def flags(self):
+        """List of the names of the flags applied.
+        """
+        return list(self.indices.keys())
+
+    def mask(self, flag=None):
+        """Return a boolean mask of the events vetoed.
+
+        Parameters
+        ----------
+        flag : `str`, optional
+            the name of the flag, default: all flags
+
+        Returns
+        -------
+        mask : `numpy.ndarray`
+            a boolean array, in the order of the table, that is `True`
+            for events vetoed by the given flag, or by any flag
+        """
+        mask = numpy.zeros(len(self.table), dtype=bool)
+        if flag is None:
+            for indices in self.indices.values():
+                mask[indices] = True
+        else:
+            mask[self.indices[flag]] = True
+        return mask
+
+    def vetoed(self, flag=None):
+        """Build a table of the events vetoed.
+
+        Parameters
+        ----------
+        flag : `str`, optional
+            the name of the flag, default: all flags
+
+        Returns
+        -------
+        table : :class:`~glue.ligolw.table.Table`, `EventTable`
+            a new table, of the same type as the input, with the events
+            vetoed by the given flag, or by any flag
+        """
+        if flag is not None:
+            return take(self.table, self.indices[flag])
+        return take(self.table, numpy.nonzero(self.mask())[0])
+
+    def surviving(self, flag=None):
+        """Build a table of the events not vetoed.
+
+        Parameters
+        ----------
+        flag : `str`, optional
+            the name of the flag, default: all flags
+
+        Returns
+        -------
+        table : :class:`~glue.ligolw.table.Table`, `EventTable`
+            a new table, of the same type as the input, with the events
+            not vetoed by the given flag, or by any flag
+        """
+        return take(self.table, numpy.nonzero(~self.mask(flag))[0])
+
+
+def veto_statistics(table, flags, timecolumn='time'):
+    """Calculate the veto statistics for a number of data-quality flags.
+
+    Parameters
+    ----------
+    table : :class:`~glue.ligolw.table.Table`, `EventTable`, `TimeIndex`
+        the table of events, or an existing index of that table
+    flags : `DataQualityDict`, `DataQualityFlag`
+        the flags to apply as vetoes
+    timecolumn : `str`, optional, default: ``'time'``
+        name of the column of event times
+
+    Returns
+    -------
+    statistics : :class:`~astropy.table.Table`
+        a table with one row per flag, and the following columns
+
+        - ``flag`` : the name of the flag
+        - ``vetoed`` : the number of events vetoed by the flag
+        - ``efficiency`` : the percentage of events vetoed
+        - ``deadtime`` : the percentage of the `known` time of the flag
+          that is `active`
+        - ``use_percentage`` : the percentage of `active` segments that
+          veto at least one event
+        - ``efficiency_over_deadtime`` : the ratio of `efficiency` to
+          `deadtime`
+    """
+    flags = _format_flags(flags)
+    if isinstance(table, TimeIndex):
+        index = table
+    else:
+        index = TimeIndex(table, timecolumn=timecolumn)
+    nevents = len(index)
+    rows = []
+    for name, flag in flags.items():
+        active = SegmentArray.from_segmentlist(flag.active).coalesce()
+        known = SegmentArray.from_segmentlist(flag.known).coalesce()
+        # number of events in each active segment
+        start, end = active.to_seconds()
+        counts = (numpy.searchsorted(index.times, end, side='left') -
+                  numpy.searchsorted(index.times, start, side='left'))
+        nvetoed = int(counts.sum())
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            efficiency = 100. * nvetoed / nevents if nevents else numpy.nan
+            deadtime = (100. * float(abs(active & known)) / float(abs(known))
+                        if len(known) else numpy.nan)
+            use = (100. * (counts > 0).sum() / len(active) if len(active)
+                   else numpy.nan)
+            ratio = numpy.float64(efficiency) / deadtime
+        rows.append((name, nvetoed, efficiency, deadtime, use, ratio))
+    names = ('flag', 'vetoed', 'efficiency', 'deadtime', 'use_percentage',
+             'efficiency_over_deadtime')
+    dtypes = (str, int, float, float, float, float)
+    columns = list(zip(*rows)) or [()] * len(names)
+    return Table([numpy.array(col, dtype=dtype) for
+                  (col, dtype) in zip(columns, dtypes)], names=names)
+
+
+def _format_flags(flags):
+    """Format the input flags as a `DataQualityDict`.
+    """
+    if isinstance(flags, DataQualityFlag):
+        out = DataQualityDict()
+        out[flags.name] = flags
+        return out
+    return flags
@@ -25,7 +25,9 @@ import tempfile
 import StringIO
 
 from .. import version
-from ..segments import (Segment, SegmentList, DataQualityFlag, DataQualityDict)
+from ..segments import (Segment, SegmentList, SegmentArray,
+                        DataQualityFlag, DataQualityDict)
+from ..time import LIGOTimeGPS
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
 __version__ = version.version
@@ -77,6 +79,72 @@ class SegmentListTests(unittest.TestCase):
                         'differs from %s' % (tmpfile, SEGWIZ))
         os.remove(tmpfile)
 
+    def test_hdf5_compact(self):
+        tmpfile = self.tmpfile % 'hdf'
+        try:
+            ACTIVE.write(tmpfile, 'active', layout='ns')
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        try:
+            active = SegmentList.read(tmpfile, 'active', gpstype=float)
+            self.assertEqual(active, ACTIVE)
+            cropped = SegmentList.read(tmpfile, 'active', gpstype=float,
+                                       start=1.5, end=5.5)
+            self.assertEqual(cropped, SegmentList([Segment(1.5, 2),
+                                                   Segment(3, 4),
+                                                   Segment(5, 5.5)]))
+        finally:
+            os.remove(tmpfile)
+
+    def test_segmentarray(self):
+        active = SegmentArray.from_segmentlist(ACTIVE)
+        self.assertEqual(active.to_segmentlist(), ACTIVE)
+        known = SegmentArray.from_segmentlist(KNOWN)
+        self.assertEqual((known & active).to_segmentlist(), KNOWNACTIVE)
+        self.assertEqual((known | active).to_segmentlist(),
+                         (KNOWN | ACTIVE).coalesce())
+        self.assertEqual((known - active).to_segmentlist(), KNOWN - ACTIVE)
+        self.assertEqual((~active).to_segmentlist(), ~ACTIVE)
+        self.assertEqual(list(active.protract(.5)), [Segment(.5, 7.5)])
+        self.assertEqual(list(active.contract(.5)), [Segment(5.5, 6.5)])
+        # segments contracted away don't cut holes in their neighbours
+        self.assertEqual(list(SegmentArray([0, 4], [10, 5]).contract(1)),
+                         [Segment(1, 9)])
+        self.assertEqual(list(SegmentArray([.1], [.4]).round()),
+                         [Segment(0, 1)])
+
+    def test_segmentarray_gps(self):
+        # nanosecond GPS bounds must survive a round trip exactly
+        gps = SegmentList([
+            Segment(LIGOTimeGPS(1000000000, 1), LIGOTimeGPS(1000000001, 3)),
+            Segment(LIGOTimeGPS(1000000005, 999999999),
+                    LIGOTimeGPS(1000000007, 0)),
+        ])
+        array = SegmentArray.from_segmentlist(gps)
+        self.assertTrue(array.ns)
+        self.assertEqual(array.to_segmentlist(), gps)
+        self.assertEqual((array | SegmentArray()).to_segmentlist(), gps)
+        self.assertEqual((~~array).to_segmentlist(), gps)
+        self.assertEqual(abs(array), LIGOTimeGPS(2, 3))
+        cropped = array & SegmentArray([1000000001], [1000000006])
+        self.assertEqual(
+            cropped.to_segmentlist(),
+            SegmentList([
+                Segment(LIGOTimeGPS(1000000001), LIGOTimeGPS(1000000001, 3)),
+                Segment(LIGOTimeGPS(1000000005, 999999999),
+                        LIGOTimeGPS(1000000006))]))
+        self.assertEqual(list(array.round()),
+                         [Segment(1000000000, 1000000002),
+                          Segment(1000000005, 1000000007)])
+
+    def test_segmentarray_blob(self):
+        from ..segments.querycache import (_to_blob, _from_blob)
+        gps = SegmentList([Segment(LIGOTimeGPS(1000000000, 1),
+                                   LIGOTimeGPS(1000000001, 3))])
+        for segments in (ACTIVE, gps):
+            self.assertEqual(_from_blob(_to_blob(segments)).to_segmentlist(),
+                             segments)
+
 
 class DataQualityFlagTests(unittest.TestCase):
     """Unit tests for the `DataQualityFlag` class
@@ -94,6 +162,120 @@ class DataQualityFlagTests(unittest.TestCase):
         self.assertTrue(flag.regular,
                         'flag.regular test failed (should be True)')
 
+    def test_segment_ops(self):
+        flag = DataQualityFlag(FLAG1, active=ACTIVE, known=KNOWN)
+        flag2 = DataQualityFlag(FLAG2, active=ACTIVE2, known=KNOWN2)
+        # results are held as arrays until the segments are accessed
+        union = flag | flag2
+        self.assertIsInstance(union._known, SegmentArray)
+        self.assertEqual(union.livetime, abs(ACTIVE | ACTIVE2))
+        self.assertEqual(union.known, (KNOWN | KNOWN2).coalesce())
+        self.assertIsInstance(union.known, SegmentList)
+        self.assertEqual((~flag).known, ~KNOWN)
+        self.assertEqual((flag & flag2).known, SegmentList())
+        self.assertEqual((flag - flag2).active, ACTIVE)
+        # and can still be modified in place
+        union.active.append(Segment(200, 201))
+        self.assertEqual(union.active[-1], Segment(200, 201))
+        self.assertEqual(union.copy().active, union.active)
+
+    def test_query_cache(self):
+        from ..segments.querycache import SegmentQueryCache
+        cache = SegmentQueryCache(':memory:', latency=100)
+        queries = []
+
+        def fetch(segments):
+            # local stand-in for the segment database
+            queries.append(segments)
+            return DataQualityFlag(FLAG1, known=segments,
+                                   active=ACTIVE2 & segments)
+
+        flag = cache.query(FLAG1, [Segment(100, 110)], fetch, now=1000)
+        self.assertEqual(flag.active, SegmentList([Segment(100, 101)]))
+        flag = cache.query(FLAG1, [Segment(105, 150)], fetch, now=1000)
+        self.assertEqual(queries[-1], SegmentList([Segment(110, 150)]))
+        self.assertEqual(flag.known, SegmentList([Segment(105, 150)]))
+        self.assertEqual(flag.active, SegmentList([Segment(110, 120)]))
+        cache.query(FLAG1, [Segment(100, 150)], fetch, now=1000)
+        self.assertEqual(len(queries), 2)
+        cache.query(FLAG1, [Segment(100, 150)], fetch, now=200)
+        self.assertEqual(len(queries), 2)
+        cache.query(FLAG1, [Segment(140, 160)], fetch, now=200)
+        cache.query(FLAG1, [Segment(140, 160)], fetch, now=200)
+        self.assertEqual(queries[-1], SegmentList([Segment(150, 160)]))
+        self.assertEqual(len(queries), 4)
+
+    def test_query_segments(self):
+        import json
+        import threading
+        import BaseHTTPServer
+        import SocketServer
+        from urlparse import (urlparse, parse_qs)
+        from ..segments.query import (query_segments, get_session)
+        from ..segments.querycache import SegmentQueryCache
+        requests = []
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            # local stand-in for the DQSegDB, failing the first request
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                requests.append(self.path)
+                if len(requests) == 1:
+                    body = ''
+                    self.send_response(503)
+                else:
+                    query = parse_qs(urlparse(self.path).query)
+                    start, end = int(query['s'][0]), int(query['e'][0])
+                    body = json.dumps({'known': [[start, end]],
+                                       'active': [[start, start + 1]],
+                                       'metadata': {}})
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(SocketServer.ThreadingMixIn,
+                     BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        server = Server(('localhost', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        url = 'http://localhost:%d' % server.server_port
+        try:
+            results = query_segments(
+                [FLAG1, FLAG2], [Segment(0, 10), Segment(10, 20)],
+                url=url, nproc=2, backoff=0)
+            self.assertEqual(len(requests), 3)
+            for flag in (FLAG1, FLAG2):
+                self.assertEqual(list(results[flag]['known']),
+                                 [Segment(0, 20)])
+                self.assertEqual(list(results[flag]['active']),
+                                 [Segment(0, 1)])
+            # cached queries only send requests for the missing intervals,
+            # concurrently, and reuse the same session
+            cache = SegmentQueryCache(':memory:')
+            DataQualityDict.query_dqsegdb([FLAG1, FLAG2], 0, 20, url=url,
+                                          cache=cache, nproc=2, backoff=0)
+            self.assertEqual(len(requests), 5)
+            flags = DataQualityDict.query_dqsegdb(
+                [FLAG1, FLAG2], 10, 30, url=url, cache=cache, nproc=2,
+                backoff=0)
+            self.assertEqual(len(requests), 7)
+            self.assertTrue(all('s=20&e=30' in r for r in requests[-2:]))
+            for flag in (FLAG1, FLAG2):
+                self.assertEqual(flags[flag].known, [Segment(10, 30)])
+                self.assertEqual(flags[flag].active, [Segment(20, 21)])
+            self.assertIs(get_session(url, backoff=0),
+                          get_session(url, backoff=0))
+        finally:
+            server.shutdown()
+
     def test_read_segwizard(self):
         flag = DataQualityFlag.read(SEGWIZ, FLAG1, coalesce=False)
         self.assertTrue(flag.active == ACTIVE,
@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2014)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Unit test for table module
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from gwpy import version
+from gwpy.segments import (Segment, SegmentList, DataQualityFlag,
+                           DataQualityDict)
+from gwpy.table import (EventTable, RateAccumulator, TimeIndex)
+from gwpy.table.io.ascii import _iter_chunks
+from gwpy.table.io.ligolw import _tokenize
+from gwpy.table.cluster import (time_clusters, tile_clusters)
+from gwpy.table.coinc import (coincidences, slide_coincidences,
+                              coinc_tables)
+from gwpy.table.veto import (veto, veto_statistics)
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+SEED = 1
+
+LIGOLW = """<?xml version='1.0' encoding='utf-8'?>
+<LIGO_LW>
+<Table Name="sngl_burst:table">
+<Column Name="sngl_burst:ifo" Type="lstring"/>
+<Column Name="sngl_burst:peak_time" Type="int_4s"/>
+<Column Name="sngl_burst:peak_time_ns" Type="int_4s"/>
+<Column Name="sngl_burst:snr" Type="real_4"/>
+<Column Name="sngl_burst:channel" Type="lstring"/>
+<Column Name="sngl_burst:event_id" Type="ilwd:char"/>
+<Stream Name="sngl_burst:table" Type="Local" Delimiter=",">
+%s
+</Stream>
+</Table>
+</LIGO_LW>
+"""
+
+
+def random_events(n=100, seed=SEED):
+    """Build a `SnglBurstTable`-like `EventTable` of random events.
+    """
+    rng = numpy.random.RandomState(seed)
+    times = numpy.sort(rng.uniform(0, 100, n))
+    return EventTable([
+        ('peak_time', times.astype(numpy.int32)),
+        ('peak_time_ns', ((times % 1) * 1e9).astype(numpy.int32)),
+        ('central_freq', rng.uniform(10, 1000, n)),
+        ('snr', rng.uniform(5, 20, n)),
+    ])
+
+
+class EventTableTests(unittest.TestCase):
+    """`TestCase` for the `EventTable`
+    """
+    def setUp(self):
+        self.table = random_events()
+
+    def test_columns(self):
+        table = self.table
+        self.assertEqual(len(table), 100)
+        self.assertListEqual(table.colnames, ['peak_time', 'peak_time_ns',
+                                              'central_freq', 'snr'])
+        times = table['peak_time'] + table['peak_time_ns'] * 1e-9
+        self.assertTrue(numpy.allclose(table.get_column('peak'), times))
+        self.assertTrue(numpy.allclose(table.get_time(), times))
+        self.assertRaises(KeyError, table.get_column, 'blah')
+        self.assertRaises(ValueError, table.__setitem__, 'x', [1, 2])
+
+    def test_filter(self):
+        table = self.table
+        snr = table['snr']
+        mask = table.mask('snr > 10', ('central_freq', '<=', 500))
+        self.assertTrue(numpy.array_equal(
+            mask, (snr > 10) & (table['central_freq'] <= 500)))
+        filtered = table.filter('snr > 10', ('central_freq', '<=', 500))
+        self.assertEqual(len(filtered), mask.sum())
+        self.assertTrue(numpy.array_equal(filtered['snr'], snr[mask]))
+        # callable condition
+        loud = table.filter(lambda t: t['snr'] >= 15)
+        self.assertTrue((loud['snr'] >= 15).all())
+        self.assertRaises(ValueError, table.filter, 'snr is large')
+
+    def test_table_conversion(self):
+        table = self.table
+        ligolw = table.to_table()
+        self.assertEqual(len(ligolw), len(table))
+        self.assertEqual(ligolw.tableName, table.tableName)
+        new = EventTable.from_table(ligolw)
+        self.assertSetEqual(set(new.colnames), set(table.colnames))
+        for name in table.colnames:
+            self.assertTrue(numpy.allclose(new[name], table[name]))
+        self.assertTrue(numpy.allclose(new.get_time(), table.get_time()))
+
+    def test_extend(self):
+        table = self.table
+        other = random_events(n=10, seed=2)
+        combined = table + other
+        self.assertEqual(len(combined), 110)
+        self.assertEqual(len(table), 100)
+        self.assertTrue(numpy.array_equal(combined['snr'][100:],
+                                          other['snr']))
+        table.extend(other)
+        self.assertTrue(numpy.array_equal(table['snr'], combined['snr']))
+        self.assertRaises(ValueError, table.extend,
+                          EventTable([('snr', numpy.ones(2))]))
+
+    def test_concatenate(self):
+        parts = [self.table[:30], self.table[30:31], EventTable(),
+                 self.table[31:]]
+        combined = EventTable.concatenate(parts)
+        for name in self.table.colnames:
+            self.assertTrue(numpy.array_equal(combined[name],
+                                              self.table[name]))
+        self.assertEqual(len(EventTable.concatenate([])), 0)
+
+
+class AsciiTests(unittest.TestCase):
+    """`TestCase` for the chunked ASCII `EventTable` readers
+    """
+    def setUp(self):
+        rng = numpy.random.RandomState(SEED)
+        # peak, frequency, duration, bandwidth, normalised energy
+        self.data = numpy.column_stack((
+            numpy.sort(rng.uniform(1e9, 1e9 + 100, 20)),
+            rng.uniform(10, 1000, 20), rng.uniform(0.1, 1, 20),
+            rng.uniform(1, 10, 20), rng.uniform(10, 100, 20)))
+        fd, self.tmpfile = tempfile.mkstemp(prefix='gwpy_test_',
+                                            suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write('% peak frequency duration bandwidth energy\n')
+            for i, row in enumerate(self.data):
+                if i == 7:
+                    f.write('\n% a comment in the middle\n')
+                f.write(' '.join('%.9f' % x for x in row) + '\n')
+
+    def tearDown(self):
+        if os.path.isfile(self.tmpfile):
+            os.remove(self.tmpfile)
+
+    def test_iter_chunks(self):
+        lines = ['# header\n', '1\n', '\n', '2\n', '  # indented\n',
+                 '3\n', '4\n']
+        chunks = list(_iter_chunks(iter(lines), 2))
+        self.assertListEqual(chunks, [['1\n', '2\n'], ['3\n', '4\n']])
+        chunks = list(_iter_chunks(iter(lines), 3))
+        self.assertListEqual(chunks, [['1\n', '2\n', '3\n'], ['4\n']])
+        self.assertListEqual(list(_iter_chunks(iter(lines[:1]), 3)), [])
+
+    def test_read_chunks(self):
+        snr = numpy.sqrt(2 * self.data[:, 4])
+        # chunk boundaries either side of the comment, and one chunk
+        for chunksize in (1, 3, 7, 20, 100):
+            table = EventTable.read(self.tmpfile, format='omega',
+                                    chunksize=chunksize)
+            self.assertEqual(len(table), 20)
+            self.assertTrue(numpy.allclose(table['snr'], snr))
+            self.assertTrue(numpy.allclose(table['central_freq'],
+                                           self.data[:, 1]))
+            self.assertTrue(numpy.allclose(table.get_column('peak'),
+                                           self.data[:, 0], rtol=0,
+                                           atol=1e-6))
+
+    def test_read_filter(self):
+        snr = numpy.sqrt(2 * self.data[:, 4])
+        cut = 10
+        # filter on a column that isn't read
+        table = EventTable.read(self.tmpfile, format='omega', chunksize=3,
+                                columns=['time', 'central_freq'],
+                                filt='snr > %d' % cut)
+        keep = snr > cut
+        self.assertListEqual(table.colnames,
+                             ['peak_time', 'peak_time_ns', 'central_freq'])
+        self.assertEqual(len(table), keep.sum())
+        self.assertTrue(numpy.allclose(table['central_freq'],
+                                       self.data[keep, 1]))
+        # multiple conditions
+        table = EventTable.read(self.tmpfile, format='omega', chunksize=4,
+                                filt=['snr > %d' % cut,
+                                      ('central_freq', '<', 500)])
+        keep &= self.data[:, 1] < 500
+        self.assertTrue(numpy.allclose(table['snr'], snr[keep]))
+
+
+class LigolwTests(unittest.TestCase):
+    """`TestCase` for the streaming LIGO_LW `EventTable` reader
+    """
+    def setUp(self):
+        rng = numpy.random.RandomState(SEED)
+        self.snr = numpy.round(rng.uniform(5, 20, 30), 2)
+        self.channels = ['A', 'B,C', 'D \\"E\\"'] * 10
+        rows = ['"H1",%d,%d,%s,"%s","sngl_burst:event_id:%d"'
+                % (1000 + i, i * 1000, snr, channel, i) for
+                i, (snr, channel) in enumerate(zip(self.snr, self.channels))]
+        fd, self.tmpfile = tempfile.mkstemp(prefix='gwpy_test_',
+                                            suffix='.xml')
+        with os.fdopen(fd, 'w') as f:
+            f.write(LIGOLW % ',\n'.join(rows))
+
+    def tearDown(self):
+        if os.path.isfile(self.tmpfile):
+            os.remove(self.tmpfile)
+
+    def test_tokenize(self):
+        self.assertTupleEqual(_tokenize('1,2.5,"a",3'),
+                              (['1', '2.5', '"a"'], '3'))
+        # quoted delimiters and escaped quotes
+        tokens, rest = _tokenize('"a,b",1,"c\\"d",2')
+        self.assertListEqual(tokens, ['"a,b"', '1', '"c\\"d"'])
+        self.assertEqual(rest, '2')
+        # a chunk boundary inside a quoted token
+        tokens, rest = _tokenize('1,"a,')
+        self.assertListEqual(tokens, ['1'])
+        self.assertEqual(rest, '"a,')
+
+    def test_read_chunks(self):
+        # chunk boundaries inside rows and inside quoted tokens
+        for chunksize in (1, 17, 100, 2 ** 22):
+            table = EventTable.read(self.tmpfile, format='ligolw',
+                                    tablename='sngl_burst',
+                                    chunksize=chunksize)
+            self.assertEqual(len(table), 30)
+            self.assertTrue(numpy.allclose(table['snr'], self.snr))
+            self.assertListEqual(table['channel'].tolist(),
+                                 [c.replace('\\', '') for
+                                  c in self.channels])
+            self.assertListEqual(table['event_id'].tolist(), range(30))
+            self.assertTrue(numpy.allclose(
+                table.get_time(), 1000 + numpy.arange(30) * 1.000001))
+
+    def test_read_filter(self):
+        # filter on a column that isn't read
+        table = EventTable.read(self.tmpfile, format='ligolw',
+                                tablename='sngl_burst', columns=['time'],
+                                filt='snr > 10', chunksize=50)
+        keep = self.snr > 10
+        self.assertListEqual(table.colnames, ['peak_time', 'peak_time_ns'])
+        self.assertListEqual(table['peak_time'].tolist(),
+                             (1000 + numpy.nonzero(keep)[0]).tolist())
+        # unknown keyword arguments are rejected
+        self.assertRaises(TypeError, EventTable.read, self.tmpfile,
+                          format='ligolw', blah=1)
+
+
+class RateTests(unittest.TestCase):
+    """`TestCase` for event rates
+    """
+    def setUp(self):
+        rng = numpy.random.RandomState(SEED)
+        self.times = rng.uniform(0, 100, 1000)
+        self.snr = rng.uniform(5, 20, 1000)
+        self.table = EventTable([('time', self.times), ('snr', self.snr)])
+        self.edges = numpy.arange(0, 101, 10)
+
+    def histogram(self, mask):
+        return numpy.histogram(self.times[mask], bins=self.edges)[0] / 10.
+
+    def test_event_rate(self):
+        rate = self.table.event_rate(10, start=0, end=100)
+        self.assertTrue(numpy.array_equal(
+            rate.data, self.histogram(slice(None))))
+
+    def test_binned_event_rates(self):
+        thresholds = [15, 5, 10]
+        for op, func in [('>=', numpy.greater_equal), ('>', numpy.greater),
+                         ('<', numpy.less), ('<=', numpy.less_equal)]:
+            rates = self.table.binned_event_rates(10, 'snr', thresholds,
+                                                  operator=op, start=0,
+                                                  end=100)
+            for thresh in thresholds:
+                self.assertTrue(numpy.array_equal(
+                    rates[thresh].data,
+                    self.histogram(func(self.snr, thresh))))
+        rates = self.table.binned_event_rates(10, 'snr', [5, 10, 20],
+                                              operator='in', start=0,
+                                              end=100)
+        for a, b in [(5, 10), (10, 20)]:
+            self.assertTrue(numpy.array_equal(
+                rates[(a, b)].data,
+                self.histogram((self.snr >= a) & (self.snr < b))))
+
+    def test_rate_accumulator(self):
+        for end in (100, None):
+            rates = RateAccumulator(10, 0, end=end, column='snr',
+                                    bins=[8, 12])
+            order = numpy.argsort(self.times)
+            for chunk in numpy.array_split(order, 7):
+                rates.add(self.table[chunk])
+            self.assertTrue(numpy.array_equal(
+                rates.event_rate().data, self.histogram(slice(None))))
+            binned = rates.binned_event_rates()
+            for thresh in (8, 12):
+                self.assertTrue(numpy.array_equal(
+                    binned[thresh].data, self.histogram(self.snr >= thresh)))
+
+
+class TimeIndexTests(unittest.TestCase):
+    """`TestCase` for the `TimeIndex`
+    """
+    def setUp(self):
+        rng = numpy.random.RandomState(SEED)
+        self.times = numpy.round(rng.uniform(0, 100, 500), 1)
+        self.table = EventTable([('time', self.times)])
+        self.index = TimeIndex(self.table)
+
+    def assertIndices(self, indices, mask):
+        self.assertListEqual(sorted(indices.tolist()),
+                             numpy.nonzero(mask)[0].tolist())
+
+    def test_window(self):
+        times = self.times
+        self.assertIndices(self.index.window(10, 20.5),
+                           (times >= 10) & (times < 20.5))
+        self.assertEqual(self.index.window(200, 300).size, 0)
+        # windows are returned in time order
+        self.assertTrue((numpy.diff(times[self.index.window(0, 100)]) >=
+                         0).all())
+
+    def test_around(self):
+        times = self.times
+        centres = [50, 10, 10.5, 80]
+        rows = self.index.around(centres, 1, 2)
+        mask = numpy.zeros(times.size, dtype=bool)
+        for t in centres:
+            mask |= (times >= t - 1) & (times <= t + 2)
+        self.assertIndices(rows, mask)
+        # zero-length windows find events exactly at each time
+        centres = numpy.unique(times)[[3, 4, 10]]
+        self.assertIndices(self.index.around(centres, 0),
+                           numpy.in1d(times, centres))
+        self.assertEqual(self.index.around([], 1).size, 0)
+
+    def test_in_segments(self):
+        times = self.times
+        segments = SegmentList([Segment(30, 40), Segment(5, 10.5),
+                                Segment(35, 45)])
+        self.assertIndices(self.index.in_segments(segments),
+                           ((times >= 5) & (times < 10.5)) |
+                           ((times >= 30) & (times < 45)))
+        mask = self.index.mask(segments)
+        self.assertIndices(numpy.nonzero(mask)[0],
+                           ((times >= 5) & (times < 10.5)) |
+                           ((times >= 30) & (times < 45)))
+        taken = self.index.take(self.index.in_segments(segments))
+        self.assertEqual(len(taken), mask.sum())
+
+
+class VetoTests(unittest.TestCase):
+    """`TestCase` for vetoing events with data-quality flags
+    """
+    def setUp(self):
+        self.table = EventTable([('time', numpy.arange(100) + .5),
+                                 ('snr', numpy.arange(100.))])
+        self.flags = DataQualityDict()
+        self.flags['A'] = DataQualityFlag(
+            'A', known=[(0, 100)], active=[(10, 20), (15, 30), (90, 95)])
+        self.flags['B'] = DataQualityFlag(
+            'B', known=[(0, 50)], active=[(40, 41), (41.6, 41.9)])
+
+    def test_veto_statistics(self):
+        stats = veto_statistics(self.table, self.flags)
+        self.assertListEqual(list(stats['flag']), ['A', 'B'])
+        self.assertListEqual(list(stats['vetoed']), [25, 1])
+        self.assertTrue(numpy.allclose(stats['efficiency'], [25, 1]))
+        self.assertTrue(numpy.allclose(stats['deadtime'], [25, 2.6]))
+        self.assertTrue(numpy.allclose(stats['use_percentage'], [100, 50]))
+        self.assertTrue(numpy.allclose(stats['efficiency_over_deadtime'],
+                                       [1, 1 / 2.6]))
+        # a single flag
+        stats = veto_statistics(self.table, self.flags['B'])
+        self.assertEqual(len(stats), 1)
+
+    def test_veto(self):
+        result = veto(self.table, self.flags)
+        self.assertListEqual(result.flags, ['A', 'B'])
+        self.assertListEqual(result.indices['A'].tolist(),
+                             range(10, 30) + range(90, 95))
+        self.assertListEqual(result.indices['B'].tolist(), [40])
+        self.assertEqual(len(result.statistics), 2)
+        self.assertListEqual(result.vetoed('B')['snr'].tolist(), [40])
+        self.assertEqual(len(result.surviving('A')), 75)
+        # combined over all flags
+        self.assertEqual(result.mask().sum(), 26)
+        survivors = result.surviving()
+        self.assertEqual(len(survivors), 74)
+        self.assertNotIn(40, survivors['snr'].tolist())
+        self.assertEqual(len(result.vetoed()), 26)
+
+
+class CoincidenceTests(unittest.TestCase):
+    """`TestCase` for time coincidences between tables
+    """
+    window = 0.5
+
+    def setUp(self):
+        rng = numpy.random.RandomState(SEED)
+        self.tables = [EventTable([('time', rng.uniform(0, 20, n))]) for
+                       n in (50, 60, 40)]
+
+    def brute_force(self, offsets):
+        times = [t['time'] + o for (t, o) in zip(self.tables, offsets)]
+        out = set()
+        for i, a in enumerate(times[0]):
+            for j, b in enumerate(times[1]):
+                if abs(a - b) > self.window:
+                    continue
+                for k, c in enumerate(times[2]):
+                    if (abs(a - c) <= self.window and
+                            abs(b - c) <= self.window):
+                        out.add((i, j, k))
+        return out
+
+    def test_coincidences(self):
+        indices = coincidences(self.tables, self.window)
+        self.assertEqual(indices.shape[1], 3)
+        self.assertSetEqual(set(map(tuple, indices.tolist())),
+                            self.brute_force((0, 0, 0)))
+        rows = coinc_tables(self.tables, indices)
+        self.assertListEqual(map(len, rows), [indices.shape[0]] * 3)
+        offsets = (0, 1.5, -3)
+        indices = coincidences(self.tables, self.window, offsets=offsets)
+        self.assertSetEqual(set(map(tuple, indices.tolist())),
+                            self.brute_force(offsets))
+
+    def test_slide_coincidences(self):
+        slides = numpy.zeros((5, 3))
+        slides[:, 1] = numpy.arange(5) * 2
+        slides[:, 2] = -numpy.arange(5) * 3
+        indices, slide = slide_coincidences(self.tables, self.window, slides)
+        self.assertEqual(indices.shape[0], slide.size)
+        for i, offsets in enumerate(slides):
+            self.assertSetEqual(
+                set(map(tuple, indices[slide == i].tolist())),
+                self.brute_force(offsets))
+        self.assertRaises(ValueError, slide_coincidences, self.tables,
+                          self.window, numpy.zeros((5, 2)))
+
+
+class ClusterTests(unittest.TestCase):
+    """`TestCase` for event clustering
+    """
+    def test_time_clusters(self):
+        ids = time_clusters([10, 0, 0.5, 5, 1.2], 1)
+        self.assertListEqual(ids.tolist(), [2, 0, 0, 1, 0])
+
+    def test_cluster(self):
+        table = EventTable([('time', numpy.array([0, 0.5, 5, 1.2, 10.])),
+                            ('snr', numpy.array([5, 9, 6, 7, 8.]))])
+        clustered = table.cluster(1, timecolumn='time')
+        self.assertListEqual(clustered['snr'].tolist(), [9, 6, 8])
+
+    def test_tile_clusters(self):
+        # A and B form an 'L', C sits in its corner overlapping neither
+        ids = tile_clusters([0, 0, 5], [1, 10, 10], [0, 0, 5], [10, 1, 10])
+        self.assertEqual(ids[0], ids[1])
+        self.assertNotEqual(ids[2], ids[0])
+        # chained overlaps join, disjoint runs don't
+        ids = tile_clusters([0, 0.5, 3, 2.5], [1, 2, 4, 3], [0] * 4, [1] * 4)
+        self.assertListEqual(ids.tolist(), [0, 0, 1, 1])
+        self.assertEqual(tile_clusters([], [], [], []).size, 0)
+
+    def test_cluster_tiles(self):
+        table = EventTable([('start_time', numpy.array([0, 0, 5])),
+                            ('stop_time', numpy.array([1, 10, 10])),
+                            ('flow', numpy.array([0, 0, 5.])),
+                            ('fhigh', numpy.array([10, 1, 10.])),
+                            ('snr', numpy.array([6, 7, 8.]))])
+        clustered = table.cluster_tiles()
+        self.assertListEqual(clustered['snr'].tolist(), [7, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,6 +24,7 @@ import os.path
 import unittest
 import tempfile
 
+import numpy
 from numpy import random
 
 from astropy import units
@@ -31,7 +32,8 @@ from astropy import units
 from gwpy.time import Time
 
 from gwpy import version
-from gwpy.timeseries import TimeSeries
+from gwpy.segments import Segment
+from gwpy.timeseries import (TimeSeries, TimeSeriesList)
 
 SEED = 1
 GPS_EPOCH = Time(0, format='gps', scale='utc')
@@ -64,6 +66,136 @@ class TimeSeriesTests(unittest.TestCase):
         self.assertTrue(self.ts.sample_rate == ONE_HZ)
         self.assertTrue(self.ts.dt == ONE_SECOND)
 
+    def test_spectrogram_numpy(self):
+        ts = TimeSeries(self.data.repeat(10), sample_rate=32, epoch=0)
+        sg = ts.spectrogram(4, fftlength=1, method='numpy-welch')
+        self.assertTupleEqual(sg.shape, (7, 17))
+        self.assertTrue(sg.dt == 4 * ONE_SECOND)
+        psd = ts[128:256].psd(fftlength=1, method='numpy-welch')
+        self.assertTrue(numpy.allclose(sg.data[1], psd.data))
+
+    def test_average_fft(self):
+        ts = TimeSeries(self.data, sample_rate=10, epoch=0)
+        orig = ts.data.copy()
+        fft = ts.average_fft(fftlength=2, overlap=1, window='hann')
+        self.assertTrue((ts.data == orig).all())
+        self.assertTupleEqual(fft.shape, (11,))
+        out = ts.average_fft(fftlength=2, overlap=1, window='hann', out=fft)
+        self.assertIs(out, fft)
+        self.assertRaises(TypeError, ts.average_fft, fftlength=2,
+                          out=numpy.zeros(11))
+        ts32 = ts.astype(numpy.float32)
+        self.assertEqual(ts32.average_fft(fftlength=2).dtype,
+                         numpy.complex64)
+
+    def test_list_join(self):
+        a = TimeSeries(self.data[:50], sample_rate=1, epoch=0)
+        b = TimeSeries(self.data[50:], sample_rate=1, epoch=60)
+        tsl = TimeSeriesList(b, a)
+        self.assertRaises(ValueError, tsl.join)
+        joined = tsl.join(gap='pad', pad=-1)
+        self.assertEqual(joined.span, Segment(0, 110))
+        self.assertTrue((joined.data[50:60] == -1).all())
+        self.assertTrue(numpy.array_equal(joined.data[60:],
+                                          self.data[50:]))
+        c = TimeSeries(self.data[:10], sample_rate=1, epoch=50)
+        coalesced = TimeSeriesList(b, c, a).coalesce()
+        self.assertEqual(len(coalesced), 1)
+        self.assertEqual(coalesced[0].span, Segment(0, 110))
+
+    def test_list_coalesce_gap(self):
+        a = TimeSeries(self.data[:50], sample_rate=1, epoch=0)
+        b = TimeSeries(self.data[50:60], sample_rate=1, epoch=50)
+        c = TimeSeries(self.data[60:], sample_rate=1, epoch=70)
+        coalesced = TimeSeriesList(c, b, a).coalesce()
+        self.assertEqual(len(coalesced), 2)
+        self.assertEqual(coalesced[0].span, Segment(0, 60))
+        self.assertEqual(coalesced[1].span, Segment(70, 110))
+        self.assertTrue(numpy.array_equal(coalesced[1].data,
+                                          self.data[60:]))
+
+    def test_append_grow(self):
+        ts = TimeSeries(self.data[:10], sample_rate=1, epoch=0)
+        for i in range(10, 100, 10):
+            ts = ts.append(TimeSeries(self.data[i:i+10], sample_rate=1,
+                                      epoch=i), resize='grow')
+        self.assertEqual(ts.span, Segment(0, 100))
+        self.assertTrue(numpy.array_equal(ts.data, self.data))
+        self.assertGreaterEqual(ts._buffer.shape[0], 100)
+
+    def test_append_after_grow(self):
+        from gwpy.timeseries import TimeSeriesDict
+        ts = TimeSeries(self.data[:10], sample_rate=1, epoch=0)
+        ts = ts.append(TimeSeries(self.data[10:20], sample_rate=1,
+                                  epoch=10), resize='grow')
+        # a default append must cope with the view into the grow buffer
+        ts = ts.append(TimeSeries(self.data[20:30], sample_rate=1,
+                                  epoch=20))
+        self.assertEqual(ts.span, Segment(0, 30))
+        self.assertTrue(numpy.array_equal(ts.data, self.data[:30]))
+        tsd = TimeSeriesDict()
+        tsd['a'] = TimeSeries(self.data[:10], sample_rate=1, epoch=0)
+        tsd.append({'a': TimeSeries(self.data[10:20], sample_rate=1,
+                                    epoch=10)}, resize='grow')
+        tsd.append({'a': TimeSeries(self.data[20:30], sample_rate=1,
+                                    epoch=20)})
+        self.assertTrue(numpy.array_equal(tsd['a'].data, self.data[:30]))
+
+    def test_ring_buffer(self):
+        from gwpy.timeseries import TimeSeriesRingBuffer
+        buffer_ = TimeSeriesRingBuffer(30, 1)
+        for i in range(0, 100, 20):
+            buffer_.update(TimeSeries(self.data[i:i+20], sample_rate=1,
+                                      epoch=i))
+        self.assertEqual(buffer_.span, Segment(70, 100))
+        self.assertTrue(numpy.array_equal(buffer_.timeseries.data,
+                                          self.data[70:]))
+        window = buffer_.window(80, 90)
+        self.assertEqual(window.span, Segment(80, 90))
+        self.assertTrue(numpy.array_equal(window.data, self.data[80:90]))
+        self.assertRaises(ValueError, buffer_.update,
+                          TimeSeries(self.data, sample_rate=1, epoch=200))
+
+    def test_statevector_bits(self):
+        from gwpy.timeseries import StateVector
+        sv = StateVector([0, 1, 2, 3, 4, 5], bits=['a', 'b', 'c'],
+                         sample_rate=1, epoch=0)
+        self.assertTupleEqual(sv.boolean.shape, (6, 3))
+        bitseries = sv.get_bit_series(bits=['b', 0])
+        self.assertListEqual(bitseries.keys(), ['b', 'a'])
+        self.assertListEqual(list(bitseries['b'].data),
+                             [False, False, True, True, False, False])
+        self.assertRaises(ValueError, sv.get_bit_series, bits=['d'])
+
+    def test_statevector_resample(self):
+        from gwpy.timeseries import (StateVector, StateVectorDict)
+        sv = StateVector([3, 1, 3, 3, 0, 2, 2, 2], bits=['a', 'b'],
+                         sample_rate=4, epoch=0)
+        self.assertListEqual(list(sv.resample(1).data), [1, 0])
+        self.assertListEqual(list(sv.resample(1, method='or').data), [3, 2])
+        self.assertListEqual(list(sv.resample(1, method='majority').data),
+                             [3, 2])
+        up = sv.resample(8)
+        self.assertEqual(up.size, 16)
+        self.assertTrue(up.sample_rate == units.Quantity(8, 'Hz'))
+        svd = StateVectorDict([('x', sv), ('y', sv.copy())]).resample(2)
+        self.assertListEqual(list(svd['y'].data), [1, 3, 0, 2])
+
+    def test_statevector_to_dqflags(self):
+        from gwpy.timeseries import (StateVector, StateTimeSeries)
+        sts = StateTimeSeries([1, 1, 0, 1, 0, 1, 1, 1], sample_rate=1,
+                              epoch=0)
+        flag = sts.to_dqflag(minlen=2)
+        self.assertListEqual(flag.active,
+                             [Segment(0, 2), Segment(5, 8)])
+        self.assertListEqual(flag.known, [Segment(0, 8)])
+        sv = StateVector([3, 1, 2, 2], bits=['a', 'b'], sample_rate=1,
+                         epoch=0)
+        flags = sv.to_dqflags()
+        self.assertListEqual(flags['a'].active, [Segment(0, 2)])
+        self.assertListEqual(flags['b'].active,
+                             [Segment(0, 1), Segment(2, 4)])
+
     def frame_read(self, format=None):
         ts = TimeSeries.read(self.framefile, 'L1:LDAS-STRAIN', format=format)
         self.assertTrue(ts.epoch == Time(968654552, format='gps',
@@ -83,6 +215,99 @@ class TimeSeriesTests(unittest.TestCase):
         except ImportError as e:
             raise unittest.SkipTest(str(e))
 
+    def test_iter_read(self):
+        try:
+            full = TimeSeries.read(self.framefile, 'L1:LDAS-STRAIN')
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        blocks = TimeSeries.iter_read(self.framefile, 'L1:LDAS-STRAIN',
+                                      968654552, 968654553, chunk=.5,
+                                      overlap=.25)
+        for i, block in enumerate(blocks):
+            self.assertEqual(block.epoch.gps, 968654552 + i * .25)
+            self.assertTrue(numpy.array_equal(
+                block.data, full.data[i * 4096:i * 4096 + 8192]))
+        self.assertEqual(i, 2)
+
+    def test_frame_index(self):
+        from gwpy.timeseries.io.gwf.index import (FrameIndex, check_channels)
+        index = FrameIndex(':memory:')
+        try:
+            record = index.get(self.framefile)
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        self.assertIn('L1:LDAS-STRAIN', record['channels'])
+        self.assertEqual(record['epochs'][0], 968654552)
+        self.assertDictEqual(index.get(self.framefile, create=False), record)
+        check_channels(self.framefile, ['L1:LDAS-STRAIN'], index=index)
+        self.assertRaises(ValueError, check_channels, self.framefile,
+                          ['X1:NOT-A-CHANNEL'], index=index)
+        # every indexed file is checked, not just the first
+        self.assertRaises(ValueError, check_channels,
+                          ['/not-a-file.gwf', self.framefile],
+                          ['X1:NOT-A-CHANNEL'], index=index)
+
+    def test_frame_read_span(self):
+        try:
+            from gwpy.timeseries.io.gwf.framecpp import _get_read_span
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        records = {}
+        span = _get_read_span([self.framefile], records=records)
+        self.assertEqual(span[0], 968654552)
+        # the table of contents is kept for the read
+        self.assertIn(self.framefile, records)
+
+    def test_trim_to_filled(self):
+        from gwpy.timeseries.io.gwf.framecpp import _trim_to_filled
+        ts = TimeSeries(self.data, sample_rate=1, epoch=0)
+        trimmed = _trim_to_filled(ts, [(10, 90)], 'X1:TEST', (0, 100))
+        self.assertFalse(trimmed.flags.owndata)
+        self.assertEqual(trimmed.span, Segment(10, 90))
+        # mostly-empty buffers are not kept alive by a view
+        trimmed = _trim_to_filled(ts, [(20, 30), (10, 20)], 'X1:TEST',
+                                  (0, 100))
+        self.assertTrue(trimmed.flags.owndata)
+        self.assertEqual(trimmed.span, Segment(10, 30))
+        self.assertTrue(numpy.array_equal(trimmed.data, self.data[10:30]))
+        self.assertRaises(ValueError, _trim_to_filled, ts,
+                          [(0, 10), (20, 30)], 'X1:TEST', (0, 100))
+
+    def test_frame_index_opt_in(self):
+        from gwpy.timeseries.io.gwf.index import (get_frame_index,
+                                                  _NullIndex)
+        env = os.environ.pop('GWPY_FRAME_INDEX', None)
+        try:
+            self.assertIsInstance(get_frame_index(), _NullIndex)
+            # an index that can't be created stores nothing
+            self.assertIsInstance(
+                get_frame_index('/dev/null/frame-index.sqlite'), _NullIndex)
+        finally:
+            if env is not None:
+                os.environ['GWPY_FRAME_INDEX'] = env
+
+    def test_indexed_cache(self):
+        from gwpy.io.cache import IndexedCache
+        from gwpy.segments import (Segment, SegmentList)
+        cache = IndexedCache(['X-TEST-%d-4.gwf' % s for s in (8, 0, 4, 16)],
+                             [8, 0, 4, 16], [12, 4, 8, 20])
+        self.assertListEqual(list(cache.start), [0, 4, 8, 16])
+        self.assertListEqual(list(cache.sieve(Segment(5, 9)).start), [4, 8])
+        self.assertListEqual(cache.segments(),
+                             SegmentList([Segment(0, 12), Segment(16, 20)]))
+        self.assertListEqual(cache.gaps(), SegmentList([Segment(12, 16)]))
+        self.assertEqual(cache[1].segment, Segment(4, 8))
+
+    def test_read_cache_missing_file(self):
+        from gwpy.io.cache import IndexedCache
+        missing = os.path.join(tempfile.gettempdir(),
+                               'X-GWPY_TEST_MISSING-968654553-1.gwf')
+        cache = IndexedCache([self.framefile, missing],
+                             [968654552, 968654553], [968654553, 968654554])
+        # a missing file leaves a gap in the data
+        self.assertRaises(ValueError, TimeSeries.read, cache,
+                          'L1:LDAS-STRAIN', format='cache')
+
     def test_ascii_write(self, delete=True):
         self.ts = TimeSeries(self.data, sample_rate=1, name='TEST CASE',
                              epoch=0, channel='TEST CASE')
@@ -126,5 +351,115 @@ class TimeSeriesTests(unittest.TestCase):
                     os.remove(hdfout)
 
 
+class NDSTests(unittest.TestCase):
+    """`TestCase` for fetching data from NDS, using a fake connection
+    """
+    class FakeChannel(object):
+        """Stand-in for an `nds2.channel`
+        """
+        DATA_TYPE_INT16 = 1
+        DATA_TYPE_INT32 = 2
+        DATA_TYPE_INT64 = 4
+        DATA_TYPE_FLOAT32 = 8
+        DATA_TYPE_FLOAT64 = 16
+        DATA_TYPE_COMPLEX32 = 32
+        channel_type = 'raw'
+        data_type = DATA_TYPE_FLOAT64
+        signal_units = ''
+
+        def __init__(self, name, sample_rate):
+            self.name = name
+            self.sample_rate = sample_rate
+
+        @staticmethod
+        def channel_type_to_string(ctype):
+            return ctype
+
+    class FakeBuffer(object):
+        """Stand-in for an `nds2.buffer`
+        """
+        def __init__(self, channel, gps, data):
+            self.channel = channel
+            self.gps_seconds = int(gps)
+            self.gps_nanoseconds = 0
+            self.data = data
+            self.length = data.size
+
+    class FakeConnection(object):
+        """Stand-in for an `nds2.connection`, serving data in fixed
+        length buffers whose values are the sample indices from GPS 0
+        """
+        def __init__(self, sample_rate, stride):
+            self.sample_rate = sample_rate
+            self.stride = stride
+            self.requests = []
+
+        def get_host(self):
+            return 'localhost'
+
+        def iterate(self, start, end, names):
+            self.requests.append((start, end))
+            for gps in range(start, end, self.stride):
+                nsamp = int(min(self.stride, end - gps) * self.sample_rate)
+                first = int(gps * self.sample_rate)
+                data = numpy.arange(first, first + nsamp, dtype=numpy.float64)
+                yield [NDSTests.FakeBuffer(
+                    NDSTests.FakeChannel(name, self.sample_rate), gps, data)
+                       for name in names]
+
+    def setUp(self):
+        try:
+            import nds2
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+
+    def test_fetch_gaps(self):
+        from gwpy.detector import ChannelList
+        from gwpy.segments import SegmentList
+        from gwpy.timeseries import TimeSeriesDict
+        connection = self.FakeConnection(4, 4)
+        available = SegmentList([Segment(0, 8), Segment(12, 20)])
+        query = ChannelList.__dict__['query_nds2_availability']
+        ChannelList.query_nds2_availability = classmethod(
+            lambda cls, channels, start, end, host=None:
+            dict((c, {'X-R': available}) for c in channels))
+        try:
+            data = TimeSeriesDict.fetch(['X1:TEST'], 0, 20, verify=False,
+                                        connection=connection, pad=-1)
+        finally:
+            ChannelList.query_nds2_availability = query
+        self.assertListEqual(connection.requests, [(0, 8), (12, 20)])
+        ts = data['X1:TEST']
+        self.assertEqual(ts.span, Segment(0, 20))
+        expected = numpy.arange(80, dtype=numpy.float64)
+        expected[32:48] = -1
+        self.assertTrue(numpy.array_equal(ts.data, expected))
+
+    def test_fetch_short(self):
+        from gwpy.timeseries import TimeSeriesDict
+        connection = self.FakeConnection(4, 4)
+        # drop the last buffer, leaving the end of the span unfilled
+        iterate = connection.iterate
+        connection.iterate = lambda start, end, names: list(
+            iterate(start, end, names))[:-1]
+        self.assertRaises(ValueError, TimeSeriesDict.fetch, ['X1:TEST'],
+                          0, 20, verify=False, connection=connection)
+
+    def test_fetch_minute_trend(self):
+        import warnings
+        from gwpy.timeseries import TimeSeriesDict
+        connection = self.FakeConnection(1/60., 120)
+        channel = 'X1:TEST.mean,m-trend'
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            data = TimeSeriesDict.fetch([channel], 30, 150, verify=False,
+                                        connection=connection)
+        # times are expanded out to whole minutes
+        self.assertListEqual(connection.requests, [(0, 180)])
+        ts = data[channel]
+        self.assertEqual(ts.span, Segment(0, 180))
+        self.assertTrue(numpy.array_equal(ts.data, [0, 1, 2]))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -26,6 +26,7 @@ __version__ = version.version
 
 from .core import *
 from .statevector import *
+from .ringbuffer import *
 from .io import *
 
 from ..spectrum.registry import get_method as get_spectrum_method
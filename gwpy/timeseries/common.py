@@ -70,11 +70,31 @@ def append(self, other, gap='raise', inplace=True, pad=0.0, resize=True):
         otherwise copy data and return new `TimeSeries`
     pad : `float`, optional, default: ``0.0``
         value with which to pad discontiguous `TimeSeries`
+    resize : `bool`, `str`, optional, default: `True`
+        how to make room for the new data, one of
+
+            - `True` - resize the array to fit exactly
+            - `False` - drop the same amount of data off the start
+            - ``'grow'`` - allocate spare capacity, doubling the size
+              of the underlying memory whenever it fills, so that many
+              successive appends copy each sample only O(1) times
 
     Returns
     -------
     series : `TimeSeries`
         time-series containing joined data sets
+
+    Notes
+    -----
+    With ``resize='grow'`` the output is a view of a larger buffer, and
+    is a new object, so the returned series must be used for the next
+    append, e.g.::
+
+        >>> for ts in blocks:
+        ...     data = data.append(ts, resize='grow')
+
+    Only the most recent output can be grown in-place, appending to an
+    earlier output, or to a slice of one, copies the data.
     """
     # check metadata
     self.is_compatible(other)
@@ -83,6 +103,10 @@ def append(self, other, gap='raise', inplace=True, pad=0.0, resize=True):
         new = self
     else:
         new = self.copy()
+    # series with an explicit times array are always resized exactly
+    if resize == 'grow' and (getattr(new, '_index', None) is not None or
+                             getattr(new, '_xindex', None) is not None):
+        resize = True
     # fill gap
     if new.is_contiguous(other) != 1:
         if gap == 'pad':
@@ -96,7 +120,7 @@ def append(self, other, gap='raise', inplace=True, pad=0.0, resize=True):
             gapshape = list(new.shape)
             gapshape[0] = int(ngap)
             padding = numpy.ones(gapshape, dtype=self.dtype)
-            new.append(padding, inplace=True, resize=resize)
+            new = new.append(padding, inplace=True, resize=resize)
         elif gap == 'ignore':
             pass
         elif new.span[0] < other.span[0] < new.span[1]:
@@ -114,10 +138,16 @@ def append(self, other, gap='raise', inplace=True, pad=0.0, resize=True):
         return new
 
     # resize first
-    if resize:
+    if resize == 'grow':
+        N = other.shape[0]
+        new = _grow(new, N)
+    elif resize:
         N = other.shape[0]
         s = list(new.shape)
         s[0] = new.shape[0] + other.shape[0]
+        # views (e.g. from resize='grow') can't be resized in place
+        if not new.flags.owndata:
+            new = new.copy()
         try:
             new.resize(s, refcheck=False)
         except ValueError as e:
@@ -164,6 +194,31 @@ def append(self, other, gap='raise', inplace=True, pad=0.0, resize=True):
     return new
 
 
+def _grow(series, nnew):
+    """Return a view of ``series`` extended by ``nnew`` (empty) samples.
+
+    The data are held in a buffer with spare capacity, that is
+    reallocated at double the size when full. The buffer belongs to
+    the most recent view only, so that earlier views are never
+    overwritten.
+    """
+    size = series.shape[0] + nnew
+    buffer_ = getattr(series, '_buffer', None)
+    if buffer_ is None or size > buffer_.shape[0]:
+        capacity = max(size, 2 * series.shape[0])
+        buffer_ = numpy.empty((capacity,) + series.shape[1:],
+                              dtype=series.dtype)
+        buffer_[:series.shape[0]] = series.data
+    new = buffer_[:size].view(type(series))
+    new.metadata = series.metadata.copy()
+    new._buffer = buffer_
+    try:
+        del series._buffer
+    except AttributeError:
+        pass
+    return new
+
+
 def prepend(self, other, gap='raise', inplace=True, pad=0.0):
     """Connect another `TimeSeries` onto the start of the current one.
 
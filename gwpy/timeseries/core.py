@@ -25,9 +25,9 @@ import os
 import sys
 import warnings
 import re
-from math import (ceil, log)
+from math import (ceil, floor, log)
+from copy import deepcopy
 from dateutil import parser as dateparser
-from multiprocessing import (Process, Queue as ProcessQueue)
 
 import numpy
 from numpy import fft as npfft
@@ -60,6 +60,7 @@ from ..io import reader
 from ..segments import (Segment, SegmentList)
 from ..time import (Time, to_gps)
 from ..utils import (gprint, update_docstrings, with_import)
+from ..utils.parallel import (SharedArray, map_pool, unshare)
 from . import common
 
 __author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
@@ -254,6 +255,48 @@ class TimeSeries(Series):
         Notes
         -----"""))
 
+    @classmethod
+    def iter_read(cls, source, channel, start=None, end=None, chunk=None,
+                  overlap=0, prefetch=True, **kwargs):
+        """Iterate over contiguous blocks of data for a channel.
+
+        Parameters
+        ----------
+        source : `str`, `~glue.lal.Cache`
+            a single file path `str`, or a `~glue.lal.Cache` containing
+            a contiguous list of files.
+        channel : `str`, `~gwpy.detector.core.Channel`
+            the name of the channel to read, or a `Channel` object.
+        start : `~gwpy.time.Time`, `float`, optional
+            GPS start time of required data, defaults to start of cache
+        end : `~gwpy.time.Time`, `float`, optional
+            GPS end time of required data, defaults to end of cache
+        chunk : `float`
+            duration (seconds) of each block
+        overlap : `float`, optional, default: ``0``
+            duration (seconds) of overlap between consecutive blocks
+        prefetch : `bool`, optional, default: `True`
+            read the next block on a background thread while the
+            current block is being processed
+        **kwargs
+            other keyword arguments to pass to :meth:`TimeSeries.read`
+
+        Yields
+        ------
+        block : `TimeSeries`
+            the next block of data, each block reuses the same memory,
+            so is only valid until the next block is requested
+
+        See Also
+        --------
+        gwpy.timeseries.io.cache.iter_read
+            for details of the implementation
+        """
+        from .io.cache import iter_read
+        return iter_read(cls, source, channel, start=start, end=end,
+                         chunk=chunk, overlap=overlap, prefetch=prefetch,
+                         **kwargs)
+
     @classmethod
     @with_import('nds2')
     def fetch(cls, channel, start, end, host=None, port=None, verbose=False,
@@ -332,7 +375,7 @@ class TimeSeries(Series):
         new.frequencies = npfft.rfftfreq(self.size, d=self.dx.value)
         return new
 
-    def average_fft(self, fftlength=None, overlap=0, window=None):
+    def average_fft(self, fftlength=None, overlap=0, window=None, out=None):
         """Compute the averaged one-dimensional DFT of this `TimeSeries`.
 
         This method computes a number of FFTs of duration ``fftlength``
@@ -340,6 +383,10 @@ class TimeSeries(Series):
         average. This method is analogous to the Welch average method
         for power spectra.
 
+        All segments are detrended, windowed and transformed in batches
+        from a strided view of the data, so this `TimeSeries` is never
+        modified.
+
         Parameters
         ----------
         fftlength : `float`
@@ -351,19 +398,32 @@ class TimeSeries(Series):
         window : `str`, :class:`numpy.ndarray`
             name of the window function to use, or an array of length
             ``fftlength * TimeSeries.sample_rate`` to use as the window.
+        out : `~gwpy.spectrum.Spectrum`, `numpy.ndarray`, optional
+            complex-valued array in which to store the result, must have
+            one element per frequency bin; this can be used to avoid
+            allocating a new output on repeated calls
 
         Returns
         -------
         out : complex-valued :class:`~gwpy.spectrum.Spectrum`
             the transformed output, with populated frequencies array
-            metadata
+            metadata; if ``out`` was given, the same object is returned
 
         See Also
         --------
         :mod:`scipy.fftpack` for the definition of the DFT and conventions
         used.
+
+        Notes
+        -----
+        Single-precision input gives single-precision (``complex64``)
+        output, and the detrended, windowed copy of each batch of data
+        is kept at the input precision. The transforms themselves are
+        computed by :func:`numpy.fft.rfft`, which always works in double
+        precision.
         """
-        from gwpy.spectrogram import Spectrogram
+        from ..spectrum import Spectrum
+        from ..spectrum.numpy_ import (BATCH_SIZE, get_window, segment_view)
         # format lengths
         if fftlength is None:
             fftlength = self.duration
@@ -372,49 +432,59 @@ class TimeSeries(Series):
         nfft = int((fftlength * self.sample_rate).decompose().value)
         noverlap = int((overlap * self.sample_rate).decompose().value)
 
-        navg = divmod(self.size-noverlap, (nfft-noverlap))[0]
+        # format data types, matching the input precision
+        if self.dtype == numpy.float32:
+            dtype = numpy.dtype(numpy.float32)
+            ctype = numpy.dtype(numpy.complex64)
+        else:
+            dtype = numpy.dtype(numpy.float64)
+            ctype = numpy.dtype(numpy.complex128)
 
         # format window
         if window is None:
             window = 'boxcar'
-        if isinstance(window, str) or type(window) is tuple:
-            win = signal.get_window(window, nfft)
-        else:
-            win = numpy.asarray(window)
-            if len(win.shape) != 1:
-                raise ValueError('window must be 1-D')
-            elif win.shape[0] != nfft:
-                raise ValueError('Window is the wrong size.')
+        win = get_window(window, nfft, dtype=dtype)
         scaling = 1. / numpy.absolute(win).mean()
 
-        if nfft % 2:
-            nfreqs = (nfft + 1) // 2
-        else:
-            nfreqs = nfft // 2 + 1
-        ffts = Spectrogram(numpy.zeros((navg, nfreqs), dtype=numpy.complex),
-                           channel=self.channel, epoch=self.epoch, f0=0,
-                           df=1 / fftlength, dt=1, copy=True)
-        # stride through TimeSeries, recording FFTs as columns of Spectrogram
-        idx = 0
-        for i in range(navg):
-            # find step TimeSeries
-            idx_end = idx + nfft
-            if idx_end > self.size:
-                continue
-            stepseries = self[idx:idx_end]
-            # detrend
-            stepseries -= stepseries.data.mean()
-            # window
-            stepseries *= win
-            # calculated FFT, weight, and stack
-            fft_ = stepseries.fft(nfft=nfft) * scaling
-            ffts.data[i,:] = fft_.data
-            idx += (nfft - noverlap)
-        mean = ffts.mean(0)
-        mean.name = self.name
-        mean.epoch = self.epoch
-        mean.channel = self.channel
-        return mean
+        # format output
+        nfreqs = nfft // 2 + 1
+        if out is None:
+            out = Spectrum(numpy.zeros(nfreqs, dtype=ctype))
+        elif out.shape != (nfreqs,):
+            raise ValueError("Output array has the wrong shape: %s, "
+                             "expected (%d,)" % (out.shape, nfreqs))
+        elif not numpy.iscomplexobj(out):
+            raise TypeError("Output array has the wrong dtype: %s, "
+                            "expected complex (e.g. %s)" % (out.dtype, ctype))
+        outdata = out.view(numpy.ndarray)
+        outdata[:] = 0
+
+        # get read-only view of all segments
+        segments = segment_view(self.data, nfft, noverlap)[0]
+        navg = segments.shape[0]
+
+        # detrend, window, and transform in batches, summing into output
+        nperbatch = max(1, BATCH_SIZE // nfft)
+        for i in range(0, navg, nperbatch):
+            batch = segments[i:i+nperbatch]
+            tmp = numpy.asarray(batch, dtype=dtype)
+            tmp = tmp - tmp.mean(axis=-1)[:, None]
+            tmp *= win
+            outdata += npfft.rfft(tmp, n=nfft, axis=-1).sum(axis=0)
+            del tmp
+
+        # normalise as in TimeSeries.fft, and take the mean
+        outdata *= scaling / (nfft * navg)
+        outdata[1:] *= 2.0
+
+        if isinstance(out, Spectrum):
+            out.name = self.name
+            out.epoch = self.epoch
+            out.channel = self.channel
+            out.unit = self.unit
+            out.f0 = 0
+            out.df = 1 / fftlength
+        return out
 
     def psd(self, fftlength=None, overlap=None, method='welch', **kwargs):
         """Calculate the PSD `Spectrum` for this `TimeSeries`.
@@ -494,7 +564,8 @@ class TimeSeries(Series):
         return asd_
 
     def spectrogram(self, stride, fftlength=None, overlap=None,
-                    method='welch', window=None, nproc=1, **kwargs):
+                    method='welch', window=None, nproc=1, backend='process',
+                    **kwargs):
         """Calculate the average power spectrogram of this `TimeSeries`
         using the specified average spectrum method.
 
@@ -509,15 +580,21 @@ class TimeSeries(Series):
         overlap : `int`, optiona, default: fftlength
             number of seconds between FFTs.
         method : `str`, optional, default: 'welch'
-            average spectrum method.
+            average spectrum method. Methods registered with
+            :func:`~gwpy.spectrum.registry.register_spectrogram_method`,
+            e.g. ``'numpy-welch'``, calculate all columns in a single
+            batched FFT.
         window : `timeseries.window.Window`, optional, default: `None`
             window function to apply to timeseries prior to FFT.
         plan : :lalsuite:`REAL8FFTPlan`, optional
             LAL FFT plan to use when generating average spectrum,
             substitute type 'REAL8' as appropriate.
         nproc : `int`, default: ``1``
-            maximum number of independent frame reading processes, default
-            is set to single-process file reading.
+            number of parallel workers to use when calculating
+            individual blocks of the spectrogram.
+        backend : `str`, optional, default: ``'process'``
+            type of parallel worker to use, either ``'process'`` or
+            ``'thread'``, see :mod:`gwpy.utils.parallel` for details
 
         Returns
         -------
@@ -526,21 +603,34 @@ class TimeSeries(Series):
             input time-series.
         """
         from ..spectrum.utils import (safe_import, scale_timeseries_units)
-        from ..spectrum.registry import get_method
-        from ..spectrogram import (Spectrogram, SpectrogramList)
+        from ..spectrum.registry import (get_method, get_spectrogram_method)
+        from ..spectrogram import Spectrogram
 
         # format FFT parameters
         if fftlength is None:
             fftlength = stride
 
+        # record arguments for parallel workers
+        userkwargs = kwargs.copy()
+        userkwargs.update(fftlength=fftlength, overlap=overlap, method=method,
+                          window=window)
+
         # get size of spectrogram
         nsamp = int((stride * self.sample_rate).decompose().value)
         nfft = int((fftlength * self.sample_rate).decompose().value)
         nsteps = int(self.size // nsamp)
-        nproc = min(nsteps, nproc)
+        nsplit = min(nsteps, nproc)
 
         # generate window and plan if needed
         method_func = get_method(method)
+        try:
+            specgram_func = get_spectrogram_method(method)
+        except ValueError:
+            specgram_func = None
+        if overlap is None:
+            noverlap = None
+        else:
+            noverlap = int((overlap * self.sample_rate).decompose().value)
         if method_func.__module__.endswith('lal_'):
             safe_import('lal', method)
             from ..spectrum.lal_ import (generate_lal_fft_plan,
@@ -556,6 +646,11 @@ class TimeSeries(Series):
         def _from_timeseries(ts):
             """Generate a `Spectrogram` from a `TimeSeries`.
             """
+            # use batched method if available
+            if specgram_func is not None:
+                return specgram_func(ts, nsamp, nfft, noverlap=noverlap,
+                                     **kwargs)
+
             # calculate specgram parameters
             dt = stride
             df = 1 / fftlength
@@ -587,47 +682,38 @@ class TimeSeries(Series):
             return out
 
         # single-process return
-        if nsteps == 0 or nproc == 1:
+        if nsteps == 0 or nsplit == 1:
             return _from_timeseries(self)
 
-        # wrap spectrogram generator
-        def _specgram(q, ts):
-            try:
-                q.put(_from_timeseries(ts))
-            except Exception as e:
-                q.put(e)
-
-        # otherwise build process list
-        stepperproc = int(ceil(nsteps / nproc))
+        # otherwise distribute blocks of strides over a pool of workers
+        stepperproc = int(ceil(nsteps / nsplit))
         nsampperproc = stepperproc * nsamp
-        queue = ProcessQueue(nproc)
-        processlist = []
-        for i in range(nproc):
-            process = Process(target=_specgram,
-                              args=(queue, self[i * nsampperproc:
-                                                (i + 1) * nsampperproc]))
-            process.daemon = True
-            processlist.append(process)
-            process.start()
-            if ((i + 1) * nsampperproc) >= self.size:
-                break
-
-        # get data
-        data = []
-        for process in processlist:
-            result = queue.get()
-            if isinstance(result, Exception):
-                raise result
-            else:
-                data.append(result)
-        # and block
-        for process in processlist:
-            process.join()
+        nfreqs = int(nfft // 2 + 1)
+        tasks = []
+        if backend == 'thread':
+            indata = self
+            outdata = numpy.zeros((nsteps, nfreqs))
+        else:
+            indata = SharedArray(self)
+            outdata = SharedArray(shape=(nsteps, nfreqs))
+        try:
+            for i in range(0, nsteps, stepperproc):
+                idx = i * nsamp
+                tasks.append((indata, outdata, i, idx,
+                              min(idx + nsampperproc, nsteps * nsamp),
+                              stride, userkwargs))
+            map_pool(_spectrogram_worker, tasks, nproc=nproc, backend=backend)
+        finally:
+            if backend != 'thread':
+                indata.close()
+                outdata = outdata.release()
 
         # format and return
-        out = SpectrogramList(*data)
-        out.sort(key=lambda spec: spec.epoch.gps)
-        return out.join()
+        out = Spectrogram(outdata, channel=self.channel, epoch=self.epoch,
+                          f0=0, df=1 / fftlength, dt=stride)
+        out.unit = scale_timeseries_units(self.unit,
+                                          kwargs.get('scaling', 'density'))
+        return out
 
     def fftgram(self, stride):
         """Calculate the Fourier-gram of this `TimeSeries`.
@@ -1059,7 +1145,8 @@ class TimeSeries(Series):
                                overlap=overlap, window=window, **kwargs)
 
     def coherence_spectrogram(self, other, stride, fftlength=None,
-                              overlap=None, window=None, nproc=1):
+                              overlap=None, window=None, nproc=1,
+                              backend='process'):
         """Calculate the coherence spectrogram between this `TimeSeries`
         and other.
 
@@ -1075,8 +1162,11 @@ class TimeSeries(Series):
         window : `timeseries.window.Window`, optional, default: `None`
             window function to apply to timeseries prior to FFT
         nproc : `int`, default: ``1``
-            number of parallel processes to use when calculating
+            number of parallel workers to use when calculating
             individual coherence spectra.
+        backend : `str`, optional, default: ``'process'``
+            type of parallel worker to use, either ``'process'`` or
+            ``'thread'``, see :mod:`gwpy.utils.parallel` for details
 
         Returns
         -------
@@ -1087,7 +1177,7 @@ class TimeSeries(Series):
         from ..spectrogram.coherence import from_timeseries
         return from_timeseries(self, other, stride, fftlength=fftlength,
                                overlap=overlap, window=window,
-                               nproc=nproc)
+                               nproc=nproc, backend=backend)
 
     def rms(self, stride=1):
         """Calculate the root-mean-square value of this `TimeSeries`
@@ -1258,6 +1348,18 @@ class TimeSeries(Series):
         return result
 
 
+def _spectrogram_worker(task):
+    """Calculate one block of a `Spectrogram` inside a parallel worker.
+
+    The block is written directly into the (shared) output array.
+    """
+    (indata, outdata, row, idx, idx_end, stride, kwargs) = task
+    ts = unshare(indata)[idx:idx_end]
+    out = unshare(outdata, mode='r+')
+    specgram = ts.spectrogram(stride, nproc=1, **kwargs)
+    out[row:row + specgram.shape[0]] = specgram.data
+
+
 class ArrayTimeSeries(TimeSeries, Array2D):
     xunit = TimeSeries.xunit
 
@@ -1330,49 +1432,133 @@ class TimeSeriesList(list):
     def coalesce(self):
         """Sort the elements of this `TimeSeriesList` by epoch and merge
         contiguous `TimeSeries` elements into single objects.
+
+        Each run of contiguous elements is joined into a single new
+        array with one copy of the data, see :meth:`join`.
         """
         self.sort(key=lambda ts: ts.x0.value)
-        i = j = 0
-        N = len(self)
-        while j < N:
-            this = self[j]
-            j += 1
-            if j < N and this.is_contiguous(self[j]) == 1:
-                while j < N and this.is_contiguous(self[j]):
-                    try:
-                        this = self[i] = this.append(self[j])
-                    except ValueError as e:
-                        if 'cannot resize this array' in str(e):
-                            this = this.copy()
-                            this = self[i] = this.append(self[j])
-                        else:
-                            raise
-                    j += 1
+        groups = []
+        for ts in self:
+            if groups and groups[-1][-1].is_contiguous(ts) == 1:
+                groups[-1].append(ts)
             else:
-                self[i] = this
-            i += 1
-        del self[i:]
+                groups.append(self.__class__(ts))
+        self[:] = [group[0] if len(group) == 1 else group.join() for
+                   group in groups]
         return self
 
     def join(self, pad=0.0, gap='raise'):
         """Concatenate all of the `TimeSeries` in this list into a
         a single object
 
+        The output is allocated once, at its final size, and each
+        element (and any padding) is copied straight into it.
+
+        Parameters
+        ----------
+        pad : `float`, optional, default: ``0.0``
+            value with which to fill gaps between elements
+        gap : `str`, optional, default: ``'raise'``
+            action to perform if there's a gap between elements, one of
+
+            - ``'raise'`` - raise an `Exception`
+            - ``'ignore'`` - remove gap and join data
+            - ``'pad'`` - pad gap with ``pad``
+
         Returns
         -------
         `TimeSeries`
              a single `TimeSeries covering the full span of all entries
              in this list
+
+        Raises
+        ------
+        ValueError
+            if any elements overlap, or if there are gaps between
+            elements and ``gap='raise'``
         """
         if len(self) == 0:
             return self.EntryClass([])
         self.sort(key=lambda t: t.epoch.gps)
-        out = self[0].copy()
-        for ts in self[1:]:
-            out.append(ts, gap=gap, pad=pad)
+        first = self[0]
+        dx = first.dx.value
+        # find the position of each element (and gap) in the output
+        offsets = []
+        size = 0
+        for i, ts in enumerate(self):
+            if i:
+                first.is_compatible(ts)
+                prev = self[i-1]
+                if prev.is_contiguous(ts) != 1 and gap != 'ignore':
+                    ngap = int(floor((ts.span[0] - prev.span[1]) / dx + 0.5))
+                    if ngap < 1 and prev.span[0] < ts.span[0] < prev.span[1]:
+                        raise ValueError(
+                            "Cannot append overlapping {0}s:\n"
+                            "    {0} 1 span: {1}\n"
+                            "    {0} 2 span: {2}".format(
+                                type(first).__name__, prev.span, ts.span))
+                    elif gap == 'pad' and ngap >= 1:
+                        size += ngap
+                    elif gap == 'pad':
+                        raise ValueError(
+                            "Cannot append {0} that starts before this "
+                            "one:\n"
+                            "    {0} 1 span: {1}\n"
+                            "    {0} 2 span: {2}".format(
+                                type(first).__name__, prev.span, ts.span))
+                    else:
+                        raise ValueError(
+                            "Cannot append discontiguous {0}\n"
+                            "    {0} 1 span: {1}\n"
+                            "    {0} 2 span: {2}".format(
+                                type(first).__name__, prev.span, ts.span))
+            offsets.append(size)
+            size += ts.shape[0]
+        # allocate output and copy in data
+        out = numpy.empty((size,) + first.shape[1:],
+                          dtype=first.dtype).view(type(first))
+        out.metadata = deepcopy(first.metadata)
+        end = 0
+        for offset, ts in zip(offsets, self):
+            if offset > end:
+                out.data[end:offset] = pad
+            end = offset + ts.shape[0]
+            out.data[offset:end] = ts.data
         return out
 
 
+def _nds2_output(cls, buffer_, span, pad=None):
+    """Allocate a new series to hold all of the data for one channel
+    from NDS.
+
+    The output covers the full GPS ``span`` at the sample rate of the
+    given `nds2.buffer`, and is filled with ``pad``, if given, otherwise
+    it is left uninitialised, and every sample must be written by
+    `_nds2_write`.
+    """
+    first = cls.from_nds2_buffer(buffer_)
+    nsamp = int(round(float(abs(span)) * first.sample_rate.value))
+    new = numpy.empty(nsamp, dtype=first.dtype).view(cls)
+    if pad is not None:
+        new.data[:] = pad
+    new.metadata = deepcopy(first.metadata)
+    new.epoch = span[0]
+    return new
+
+
+def _nds2_write(series, buffer_):
+    """Write the data from an `nds2.buffer` into its slot in a series
+    allocated by `_nds2_output`, returning the number of samples written.
+    """
+    rate = series.sample_rate.value
+    offset = ((buffer_.gps_seconds - series.x0.value) +
+              buffer_.gps_nanoseconds * 1e-9) * rate
+    idx = int(round(offset))
+    data = buffer_.data[:max(series.shape[0] - idx, 0)]
+    series.data[idx:idx + data.shape[0]] = data
+    return data.shape[0]
+
+
 class TimeSeriesDict(OrderedDict):
     """Ordered key-value mapping of named `TimeSeries` containing data
     for many channels over the same time interval.
@@ -1423,6 +1609,48 @@ class TimeSeriesDict(OrderedDict):
         Notes
         -----"""))
 
+    @classmethod
+    def iter_read(cls, source, channels, start=None, end=None, chunk=None,
+                  overlap=0, prefetch=True, **kwargs):
+        """Iterate over contiguous blocks of data for many channels.
+
+        Parameters
+        ----------
+        source : `str`, `~glue.lal.Cache`
+            a single file path `str`, or a `~glue.lal.Cache` containing
+            a contiguous list of files.
+        channels : `~gwpy.detector.channel.ChannelList`, `list`
+            a list of channels to read from the source.
+        start : `~gwpy.time.Time`, `float`, optional
+            GPS start time of required data, defaults to start of cache
+        end : `~gwpy.time.Time`, `float`, optional
+            GPS end time of required data, defaults to end of cache
+        chunk : `float`
+            duration (seconds) of each block
+        overlap : `float`, optional, default: ``0``
+            duration (seconds) of overlap between consecutive blocks
+        prefetch : `bool`, optional, default: `True`
+            read the next block on a background thread while the
+            current block is being processed
+        **kwargs
+            other keyword arguments to pass to :meth:`TimeSeriesDict.read`
+
+        Yields
+        ------
+        block : `TimeSeriesDict`
+            the next block of data, each block reuses the same memory,
+            so is only valid until the next block is requested
+
+        See Also
+        --------
+        gwpy.timeseries.io.cache.iter_read
+            for details of the implementation
+        """
+        from .io.cache import iter_read
+        return iter_read(cls, source, channels, start=start, end=end,
+                         chunk=chunk, overlap=overlap, prefetch=prefetch,
+                         **kwargs)
+
     def __iadd__(self, other):
         return self.append(other)
 
@@ -1433,9 +1661,30 @@ class TimeSeriesDict(OrderedDict):
         return new
 
     def append(self, other, copy=True, **kwargs):
+        """Append the data in another dict to the matching entries of
+        this one.
+
+        Parameters
+        ----------
+        other : `TimeSeriesDict`, `dict`
+            dict of (key, `TimeSeries`) pairs to append, entries with
+            new keys are added to this dict
+        copy : `bool`, optional, default: `True`
+            add copies of the entries with new keys, otherwise add the
+            entries themselves
+        **kwargs
+            other keyword arguments are passed to
+            :meth:`TimeSeries.append`, e.g. ``resize='grow'`` to
+            allocate spare capacity when appending many times
+
+        Returns
+        -------
+        self : `TimeSeriesDict`
+            this dict, with each entry replaced by the joined data
+        """
         for key, ts in other.iteritems():
             if key in self:
-                self[key].append(ts, **kwargs)
+                self[key] = self[key].append(ts, **kwargs)
             elif copy:
                 self[key] = ts.copy()
             else:
@@ -1519,12 +1768,21 @@ class TimeSeriesDict(OrderedDict):
             open NDS connection to use.
         type : `int`, `str`,
             NDS2 channel type integer or string name.
+        pad : `float`, optional
+            value with which to fill gaps in the available data, by
+            default gaps are not allowed
 
         Returns
         -------
         data : :class:`~gwpy.timeseries.core.TimeSeriesDict`
             a new `TimeSeriesDict` of (`str`, `TimeSeries`) pairs fetched
             from NDS.
+
+        Raises
+        ------
+        ValueError
+            if ``pad`` is not given, and the server doesn't return data
+            for the full span of the request
         """
         from ..io import nds as ndsio
         # parse times
@@ -1647,7 +1905,11 @@ class TimeSeriesDict(OrderedDict):
             gprint('Found %d viable segments of data with %.2f%% coverage'
                    % (len(qsegs), abs(qsegs) / abs(allsegs) * 100))
 
+        # allocate each output once, over the full span of the request,
+        # and write each buffer of data straight into it
         out = cls()
+        filled = dict((c, 0) for c in channels)
+        span = Segment(istart, iend)
         for (istart, iend) in qsegs:
             istart = int(istart)
             iend = int(iend)
@@ -1661,8 +1923,10 @@ class TimeSeriesDict(OrderedDict):
             i = 0
             for buffers in data:
                 for buffer_, c in zip(buffers, channels):
-                    out.append({c: cls.EntryClass.from_nds2_buffer(buffer_)},
-                               pad=pad)
+                    if c not in out:
+                        out[c] = _nds2_output(cls.EntryClass, buffer_, span,
+                                              pad)
+                    filled[c] += _nds2_write(out[c], buffer_)
                 if not nsteps:
                     if have_minute_trends:
                         dur = buffer_.length * 60
@@ -1674,18 +1938,22 @@ class TimeSeriesDict(OrderedDict):
                     gprint('Downloading data... %d%%' % (100 * i // nsteps), end='\r')
                     if i == nsteps:
                         gprint('')
-            # pad to end of request if required
-            if iend < float(end):
-                dt = float(end) - float(iend)
-                for channel in out:
-                    nsamp = dt * out[channel].sample_rate.value
-                    out[channel].append(
-                        numpy.ones(nsamp, dtype=out[channel].dtype) * pad)
-            # match request exactly
-            for channel in out:
-                if istart > start or iend < end:
-                    out[channel] = out[channel].crop(start, end)
 
+        # without padding, nothing can be left unwritten
+        if pad is None:
+            for channel in out:
+                if filled[channel] < out[channel].shape[0]:
+                    raise ValueError("NDS server returned %d of %d samples "
+                                     "for channel '%s' in [%s, %s), use "
+                                     "pad to fill missing data"
+                                     % (filled[channel],
+                                        out[channel].shape[0],
+                                        str(channel), span[0], span[1]))
+
+        # match request exactly
+        for channel in out:
+            if span[0] < start or span[1] > end:
+                out[channel] = out[channel].crop(start, end)
 
         if verbose:
             gprint('Success.')
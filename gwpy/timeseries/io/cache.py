@@ -25,20 +25,22 @@ import os
 import warnings
 from decimal import _Infinity as infinity
 from math import ceil
-from multiprocessing import (Process, Queue as ProcessQueue)
 
 from astropy.io import registry
 
 from glue.lal import Cache
 
-from ...segments import (Segment, SegmentList)
-from ...io.cache import cache_segments
+from ...segments import Segment
+from ...io.cache import IndexedCache
+from ...time import to_gps
+from ...utils.parallel import (get_pool, map_shared, share)
+from .gwf.index import check_channels
 from .. import (TimeSeries, TimeSeriesList, TimeSeriesDict,
                 StateVector, StateVectorDict)
 
 
 def read_cache(cache, channel, start=None, end=None, resample=None,
-               gap='raise', nproc=1, **kwargs):
+               gap='raise', nproc=1, backend='process', **kwargs):
     """Read a `TimeSeries` from a cache of data files using
     multiprocessing.
 
@@ -63,6 +65,19 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
     nproc : `int`, default: ``1``
         maximum number of independent frame reading processes, default
         is set to single-process file reading.
+    gap : `str`, optional, default: ``'raise'``
+        action to perform if there are gaps in the cache, including
+        those left by files missing from disk, one of
+
+        - ``'raise'`` - raise a `ValueError`
+        - ``'warn'`` - print a warning, and read the data anyway
+        - ``'ignore'`` - read the data anyway
+        - ``'pad'`` - read each contiguous block of data, and pad the
+          gaps between them with zeros
+
+    backend : `str`, optional, default: ``'process'``
+        type of parallel worker to use, either ``'process'`` or
+        ``'thread'``, see :mod:`gwpy.utils.parallel` for details
 
     Notes
     -----
@@ -75,20 +90,21 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
         a new `TimeSeries` containing the data read from disk
     """
     cls = kwargs.pop('target', TimeSeries)
-    # open cache from file if given
+    # index cache by GPS time, opening from file if given
     if isinstance(cache, (unicode, str, file)):
-        cache = open_cache(cache)
+        cache = IndexedCache.read(cache)
+    else:
+        cache = IndexedCache.from_cache(cache)
 
     # fudge empty cache
     if len(cache) == 0:
         return cls([], channel=channel, epoch=start)
 
     # use cache to get start end times
-    cache.sort(key=lambda ce: ce.segment[0])
     if start is None:
-        start = cache[0].segment[0]
+        start = cache.span[0]
     if end is None:
-        end = cache[-1].segment[1]
+        end = cache.span[1]
 
     # get span
     span = Segment(start, end)
@@ -96,22 +112,25 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
         cache = cache.sieve(segment=span.protract(8))
     else:
         cache = cache.sieve(segment=span)
-    cspan = Segment(cache[0].segment[0], cache[-1].segment[1])
-
-    # check for gaps
-    segs = cache_segments(cache, on_missing='ignore')
-    if len(segs) != 1:
-        gaps = SegmentList([cspan]) - segs
-        if gap.lower() == 'ignore':
+    cspan = cache.span
+
+    # check for gaps, including those left by files missing from disk
+    cache = cache.checkfilesexist(on_missing='ignore')[0]
+    gaps = cache.gaps(cspan)
+    gap = gap.lower()
+    if gaps:
+        if gap in ['ignore', 'pad']:
             pass
         else:
             msg = ("The cache given to %s.read has gaps in it in the "
                    "following segments:\n    %s"
                    % (cls.__name__, '\n    '.join(map(str, gaps))))
-            if gap.lower() == 'warn':
+            if gap == 'warn':
                 warnings.warn(msg)
             else:
                 raise ValueError(msg)
+    if len(cache) == 0:
+        return cls([], channel=channel, epoch=start)
 
     # if reading one channel, try to use lalframe, its faster
     if (isinstance(channel, str) or
@@ -127,52 +146,49 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
     else:
         format_ = os.path.splitext(cache[0].path)[1][1:]
 
+    # validate channels against the frame index before opening any files
+    if format_ in ['gwf', 'lalframe'] and not kwargs.get('type', None):
+        if isinstance(channel, (list, tuple)):
+            check_channels(cache, channel)
+        else:
+            check_channels(cache, [channel])
+
     # force one frame per process minimum
-    nproc = min(nproc, len(cache))
+    nsplit = min(nproc, len(cache))
+    padgaps = bool(gaps) and gap == 'pad'
 
     # single-process
-    if nproc <= 1:
-        return cls.read(cache, channel, format=format_, start=start, end=end,
-                        resample=resample, **kwargs)
-
-    # define how to read each frame
-    def _read(q, pstart, pend):
+    if nsplit <= 1 and not padgaps:
+        return cls.read(cache.to_cache(), channel, format=format_,
+                        start=start, end=end, resample=resample, **kwargs)
+
+    # separate cache into parts, when padding, no part spans a gap
+    fperproc = int(ceil(len(cache) / max(nsplit, 1)))
+    if padgaps:
+        blocks = [cache.sieve(segment=seg) for seg in cache.segments()]
+    else:
+        blocks = [cache]
+    subsegments = [(block.span[0], block[i:i+fperproc].span) for
+                   block in blocks for i in range(0, len(block), fperproc)]
+
+    # build one task per segment, each with only the files it needs
+    pad = cls not in (StateVector, StateVectorDict) and resample
+    tasks = []
+    for bstart, (pstart, pend) in subsegments:
         # don't go beyond the requested limits
         pstart = float(max(start, pstart))
         pend = float(min(end, pend))
         # if resampling TimeSeries, pad by 8 seconds inside cache limits
-        if cls not in (StateVector, StateVectorDict) and resample:
-            cstart = float(max(cspan[0], pstart - 8))
-            subcache = cache.sieve(segment=Segment(cstart, pend))
-            out = cls.read(subcache, channel, format=format_, start=cstart,
-                           end=pend, resample=None, **kwargs)
-            out = out.resample(resample)
-            q.put(out.crop(pstart, pend))
+        if pad:
+            cstart = float(max(bstart, pstart - 8))
         else:
-            subcache = cache.sieve(segment=Segment(pstart, pend))
-            q.put(cls.read(subcache, channel, format=format_, start=pstart,
-                           end=pend, resample=resample, **kwargs))
-
-    # separate cache into parts
-    fperproc = int(ceil(len(cache) / nproc))
-    subcaches = [Cache(cache[i:i+fperproc]) for
-                 i in range(0, len(cache), fperproc)]
-    subsegments = SegmentList([Segment(c[0].segment[0], c[-1].segment[1])
-                               for c in subcaches])
-
-    # start all processes
-    queue = ProcessQueue(nproc)
-    proclist = []
-    for subseg in subsegments:
-        process = Process(target=_read, args=(queue, subseg[0], subseg[1]))
-        process.daemon = True
-        proclist.append(process)
-        process.start()
-
-    # get data and block
-    data = [queue.get() for p in proclist]
-    for process in proclist:
-        process.join()
+            cstart = pstart
+        subcache = cache.sieve(segment=Segment(cstart, pend)).to_cache()
+        tasks.append((cls, subcache, channel, format_, cstart, pstart, pend,
+                      resample, pad, backend, kwargs))
+
+    # read data in a pool of workers
+    data = map_shared(_read_worker, tasks, nproc=nproc, backend=backend)
 
     # format and return
     if issubclass(cls, dict):
@@ -183,7 +199,10 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
         out = cls()
         while len(data):
             tsd = data.pop(0)
-            out.append(tsd)
+            if padgaps:
+                out.append(tsd, gap='pad')
+            else:
+                out.append(tsd)
             del tsd
         return out
     else:
@@ -193,6 +212,168 @@ def read_cache(cache, channel, start=None, end=None, resample=None,
         return ts
 
 
+def _read_worker(task):
+    """Read one segment of data from a cache inside a parallel worker.
+
+    Array data are returned through shared memory.
+    """
+    (cls, cache, channel, format_, cstart, pstart, pend, resample, pad,
+     backend, kwargs) = task
+    if pad:
+        out = cls.read(cache, channel, format=format_, start=cstart,
+                       end=pend, resample=None, **kwargs)
+        out = out.resample(resample).crop(pstart, pend)
+    else:
+        out = cls.read(cache, channel, format=format_, start=pstart,
+                       end=pend, resample=resample, **kwargs)
+    return share(out, backend=backend)
+
+
+def iter_read(cls, source, channels, start=None, end=None, chunk=None,
+              overlap=0, prefetch=True, **kwargs):
+    """Iterate over contiguous blocks of data read from a source.
+
+    Parameters
+    ----------
+    cls : `type`
+        the class to read, either a `TimeSeries` or `TimeSeriesDict`
+        (or a sub-class of either)
+    source : `str`, :class:`glue.lal.Cache`, `~gwpy.io.cache.IndexedCache`
+        source of data, any input accepted by ``cls.read``
+    channels : `str`, `~gwpy.detector.Channel`, `list`
+        the channel (for a `TimeSeries`), or list of channels (for a
+        `TimeSeriesDict`) to read
+    start : `~gwpy.time.Time`, `float`, optional
+        GPS start time of required data, defaults to the start of the
+        cache
+    end : `~gwpy.time.Time`, `float`, optional
+        GPS end time of required data, defaults to the end of the cache
+    chunk : `float`
+        duration (seconds) of each block
+    overlap : `float`, optional, default: ``0``
+        duration (seconds) of overlap between consecutive blocks
+    prefetch : `bool`, optional, default: `True`
+        read the next block on a background thread while the current
+        block is being processed
+    **kwargs
+        other keyword arguments to pass to ``cls.read``
+
+    Yields
+    ------
+    block : ``cls``
+        the next block of data, of duration ``chunk`` (the last block
+        may be shorter)
+
+    Notes
+    -----
+    Each block is read into the same output buffer, with the overlap
+    copied from the end of the previous block, so only the new
+    ``chunk - overlap`` seconds are read from disk for each block.
+    This means that each block is only valid until the next one is
+    requested, use ``block.copy()`` to keep it.
+    """
+    if chunk is None:
+        raise ValueError("chunk duration must be given")
+    step = chunk - overlap
+    if overlap < 0 or step <= 0:
+        raise ValueError("overlap must be non-negative, and less than the "
+                         "chunk duration")
+
+    # index cache for fast per-block sieving
+    if isinstance(source, (unicode, str)) and source.endswith(
+            ('.lcf', '.cache')):
+        source = IndexedCache.read(source)
+    elif isinstance(source, (Cache, IndexedCache)):
+        source = IndexedCache.from_cache(source)
+    if start is None or end is None:
+        if not isinstance(source, IndexedCache):
+            raise ValueError("start and end must be given when not reading "
+                             "from a cache")
+        if start is None:
+            start = source.span[0]
+        if end is None:
+            end = source.span[1]
+    start = float(to_gps(start))
+    end = float(to_gps(end))
+
+    # find the epoch of each block, and the new data to read for each
+    nblocks = max(int(ceil((end - start - chunk) / step)), 0) + 1
+    epochs = [start + i * step for i in range(nblocks)]
+    segments = [Segment(epoch if i == 0 else epoch + overlap,
+                        min(epoch + chunk, end)) for
+                (i, epoch) in enumerate(epochs)]
+
+    def _submit(seg):
+        args = (cls, source, channels, seg[0], seg[1], kwargs)
+        if prefetch:
+            return get_pool(1, backend='thread').apply_async(
+                _read_block, args)
+        return args
+
+    pending = _submit(segments[0])
+    buffer_ = None
+    for i, epoch in enumerate(epochs):
+        if prefetch:
+            new = pending.get()
+        else:
+            new = _read_block(*pending)
+        if i + 1 < len(segments):
+            pending = _submit(segments[i + 1])
+        if issubclass(cls, dict):
+            if buffer_ is None:
+                buffer_ = new
+                yield buffer_
+                continue
+            block = cls()
+            for key in buffer_:
+                block[key] = _update_buffer(buffer_[key], new[key], epoch,
+                                            overlap)
+            yield block
+        elif buffer_ is None:
+            buffer_ = new
+            yield buffer_
+        else:
+            yield _update_buffer(buffer_, new, epoch, overlap)
+
+
+def _read_block(cls, source, channels, start, end, kwargs):
+    """Read a single block of data for `iter_read`.
+    """
+    if isinstance(source, IndexedCache):
+        source = source.sieve(segment=Segment(start, end)).to_cache()
+    return cls.read(source, channels, start=start, end=end, **kwargs)
+
+
+def _update_buffer(buffer_, new, epoch, overlap):
+    """Shift the overlap to the start of a buffer, and append new data.
+
+    Parameters
+    ----------
+    buffer_ : `TimeSeries`
+        the buffer holding the previous block
+    new : `TimeSeries`
+        newly-read data following the previous block
+    epoch : `float`
+        GPS start time of the new block
+    overlap : `float`
+        duration (seconds) of overlap with the previous block
+
+    Returns
+    -------
+    block : `TimeSeries`
+        a view of the updated buffer, shortened if ``new`` doesn't fill it
+    """
+    nov = int(round(overlap * buffer_.sample_rate.value))
+    if nov:
+        buffer_.data[:nov] = buffer_.data[-nov:]
+    nnew = min(new.size, buffer_.size - nov)
+    buffer_.data[nov:nov + nnew] = new.data[:nnew]
+    buffer_.epoch = epoch
+    if nov + nnew < buffer_.size:
+        return buffer_[:nov + nnew]
+    return buffer_
+
+
 def read_state_cache(*args, **kwargs):
     kwargs.setdefault('target', StateVector)
     return read_cache(*args, **kwargs)
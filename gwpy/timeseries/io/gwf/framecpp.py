@@ -20,6 +20,12 @@
 
 Direct access to the frameCPP library is the easiest way to read multiple
 channels from a single frame file in one go.
+
+The table of contents of each file is used to skip files (and frames)
+outside of the requested interval, and to validate the channel list. If
+the :class:`~gwpy.timeseries.io.gwf.index.FrameIndex` is enabled, it is
+recorded there, so that it is not parsed again the next time the file
+is read.
 """
 
 from __future__ import division
@@ -31,7 +37,11 @@ from astropy.io import registry
 from glue.lal import (Cache, CacheEntry)
 
 from .identify import register_identifier
+from .index import (get_frame_index, check_channels, record_span,
+                    toc_record)
 from .... import version
+from ....segments import Segment
+from ....time import to_gps
 from ....utils import (gprint, with_import)
 from ... import (TimeSeries, TimeSeriesDict, StateVector, StateVectorDict)
 
@@ -115,7 +125,18 @@ def read_timeseriesdict(source, channels, start=None, end=None, type=None,
     elif not isinstance(resample, dict):
         raise ValueError("Cannot parse resample request, please review "
                          "documentation for that argument")
-    # read each individually and append
+    # validate channels against the frame index before opening any files
+    if not type:
+        check_channels(filelist, channels)
+    # get the full span of the request, so that each channel can be
+    # allocated once at its final length, keeping any table of contents
+    # parsed on the way, so that no file is parsed twice
+    index = get_frame_index()
+    records = {}
+    span = _get_read_span(filelist, start, end, index=index,
+                          records=records)
+
+    # read each file directly into the output arrays
     N = len(filelist)
     if verbose:
         if not isinstance(verbose, (unicode, str)):
@@ -123,12 +144,22 @@ def read_timeseriesdict(source, channels, start=None, end=None, type=None,
         gprint("%sReading %d channels from frames... 0/%d (0.00%%)\r"
                % (verbose, len(channels), N), end='')
     out = TimeSeriesDict()
-    for i,fp in enumerate(filelist):
-        # read frame
-        new = _read_frame(fp, channels, type=type, dtype=dtype, verbose=verbose,
-                          _SeriesClass=_SeriesClass)
-        # store
-        out.append(new)
+    filled = dict((channel, []) for channel in channels)
+    for i, fp in enumerate(filelist):
+        # skip files outside of the requested span, using the cache
+        # segment, or the indexed table of contents, if available
+        if isinstance(fp, CacheEntry):
+            record = None
+            fspan = fp.segment
+        else:
+            record = records.get(fp)
+            if record is None:
+                record = index.get(fp, create=False)
+            fspan = None if record is None else record_span(record)
+        if fspan is None or fspan.intersects(span):
+            _read_frame(fp, channels, span, out, filled, type=type,
+                        dtype=dtype, _SeriesClass=_SeriesClass, index=index,
+                        record=record)
         if verbose is not False:
             gprint("%sReading %d channels from frames... %d/%d (%.1f%%)\r"
                    % (verbose, len(channels), i+1, N, (i+1)/N * 100), end='')
@@ -136,41 +167,126 @@ def read_timeseriesdict(source, channels, start=None, end=None, type=None,
         gprint("%sReading %d channels from frames... %d/%d (100.0%%)"
                % (verbose, len(channels), N, N))
     # finalise
-    for channel, ts in out.iteritems():
+    for channel in channels:
+        # trim unfilled data at either end
+        out[channel] = _trim_to_filled(out.get(channel), filled[channel],
+                                       channel, span)
         # resample data
         if resample is not None and channel in resample:
             out[channel] = out[channel].resample(resample[channel])
-        # crop data
-        if start is not None or end is not None:
-            out[channel] = out[channel].crop(start=start, end=end)
     return out
 
 
-def _read_frame(framefile, channels, type=None, dtype=None, verbose=False,
-                _SeriesClass=TimeSeries):
+def _get_read_span(filelist, start=None, end=None, index=None,
+                   records=None):
+    """Determine the GPS [start, end) `Segment` to read from a list of
+    frame files.
+
+    If either ``start`` or ``end`` is not given, it is taken from the
+    first or last file in the list, respectively.
+    """
+    if start is None:
+        start = _get_file_span(filelist[0], index=index, records=records)[0]
+    if end is None:
+        end = _get_file_span(filelist[-1], index=index, records=records)[1]
+    return Segment(float(to_gps(start)), float(to_gps(end)))
+
+
+def _get_file_span(framefile, index=None, records=None):
+    """Return the GPS [start, end) `Segment` covered by a frame file.
+
+    The table of contents record for a file path is stored in
+    ``records``, if given, for reuse when the file is read.
+    """
+    if isinstance(framefile, CacheEntry):
+        return framefile.segment
+    if records is None:
+        records = {}
+    try:
+        record = records[framefile]
+    except KeyError:
+        if index is None:
+            index = get_frame_index()
+        record = records[framefile] = index.get(framefile)
+    return record_span(record)
+
+
+def _trim_to_filled(ts, filled, channel, span):
+    """Crop a pre-allocated `TimeSeries` to the samples that were read.
+
+    The output is a view of ``ts``, unless less than half of it was
+    filled, in which case the filled samples are copied.
+
+    Raises
+    ------
+    ValueError
+        if no data were read for this channel, or if the data read
+        contain gaps
+    """
+    if ts is None or not filled:
+        raise ValueError("No data found for channel '%s' in [%s, %s)"
+                         % (str(channel), span[0], span[1]))
+    filled.sort()
+    idx0, idx1 = filled[0]
+    for (a, b) in filled[1:]:
+        if a > idx1:
+            raise ValueError("Cannot read discontiguous data for channel "
+                             "'%s', missing data in [%s, %s)"
+                             % (str(channel), ts.x0.value + idx1 * ts.dx.value,
+                                ts.x0.value + a * ts.dx.value))
+        idx1 = max(idx1, b)
+    if idx0 == 0 and idx1 == ts.size:
+        return ts
+    # a view would keep the whole pre-allocated buffer alive, so copy
+    # if most of it is unused
+    if 2 * (idx1 - idx0) < ts.size:
+        return ts[idx0:idx1].copy()
+    return ts[idx0:idx1]
+
+
+def _read_frame(framefile, channels, span, out, filled, type=None,
+                dtype=None, _SeriesClass=TimeSeries, index=None,
+                record=None):
     """Internal function to read data from a single frame.
 
     All users should be using the wrapper `read_timeseriesdict`.
 
+    Only those frames in the file that overlap the requested ``span``
+    are read, and each data vector is copied directly into its slot
+    in the output array for each channel. Output arrays are allocated
+    on the first read, with the length of ``span``.
+
     Parameters
     ----------
     framefile : `str`, :class:`~glue.lal.CacheEntry`
         path to GWF-format frame file on disk.
     channels : `list`
         list of channels to read.
+    span : `~gwpy.segments.Segment`
+        GPS [start, end) span of the output arrays
+    out : :class:`~gwpy.timeseries.core.TimeSeriesDict`
+        dict of (channel, `TimeSeries`) pairs into which to read data,
+        missing entries are allocated as needed
+    filled : `dict`
+        dict of (channel, `list`) pairs, each list is appended with the
+        ``(start, end)`` index pair of every block of data read
     type : `str`, optional
         channel data type to read, one of: ``'adc'``, ``'proc'``.
     dtype : `numpy.dtype`, `str`, `type`, `dict`
-    verbose : `bool`, optional
-        print verbose output, optional, default: `False`
     _SeriesClass : `type`, optional
         class object to use as the data holder for a single channel,
         default is :class:`~gwpy.timeseries.core.TimeSeries`
+    index : `~gwpy.timeseries.io.gwf.index.FrameIndex`, optional
+        the table of contents index to consult, and to update with
+        anything learned from this file
+    record : `dict`, optional
+        the table of contents record for this file, if already known,
+        otherwise it is taken from the ``index``, or read from the file
 
     Returns
     -------
     dict : :class:`~gwpy.timeseries.core.TimeSeriesDict`
-        dict of (channel, `TimeSeries`) data pairs
+        the input ``out`` dict
     """
     if isinstance(channels, (unicode, str)):
         channels = channels.split(',')
@@ -184,89 +300,109 @@ def _read_frame(framefile, channels, type=None, dtype=None, verbose=False,
             dtype = numpy.dtype(dtype)
         dtype = dict((channel, dtype) for channel in channels)
 
+    if index is None:
+        index = get_frame_index()
+
+    # find frames overlapping the request, using the indexed table of
+    # contents if available, so that unneeded files are never opened
+    if record is None:
+        record = index.get(framefile, create=False)
+    if record is not None and not _overlapping_frames(record, span):
+        return out
+
     # open file
     if isinstance(framefile, CacheEntry):
         fp = framefile.path
     else:
         fp = framefile
     stream = frameCPP.IFrameFStream(fp)
-
-    # interpolate frame epochs from CacheEntry
-    # FIXME: update when new frameCPP is released
-    nframe = 0 # int(stream.GetNumberOfFrames())
-    if isinstance(framefile, CacheEntry) and nframe == 1:
-        epochs = [framefile.segment[0]]
+    if record is None:
+        record = toc_record(stream.GetTOC())
+        update = True
     else:
-        epochs = None
-
-    # load table of contents if needed
-    if epochs is None or not type:
-        toc = stream.GetTOC()
-    # get list of frame epochs
-    if epochs is None:
-        epochs = toc.GTimeS
+        update = False
+    epochs = record['epochs']
+    frames = _overlapping_frames(record, span)
+    if not frames:
+        if update:
+            index.add(framefile, record)
+        return out
+
     # work out channel types
     if type:
         ctype = dict((str(channel), type) for channel in channels)
     else:
-        try:
-            adcs = toc.GetADC().keys()
-        except AttributeError:
-            adcs = toc.GetADC()
-        try:
-            procs = toc.GetProc().keys()
-        except AttributeError:
-            procs = toc.GetProc()
         ctype = {}
         for channel in channels:
             name = str(channel)
-            if name in adcs:
-                ctype[name] = 'adc'
-            elif name in procs:
-                ctype[name] = 'proc'
-            else:
+            try:
+                ctype[name] = record['channels'][name]['type']
+            except KeyError:
                 raise ValueError("Channel %s not found in frame table of "
                                  "contents" % name)
 
-    # set output
-    out = TimeSeriesDict()
+    # read data
     for channel in channels:
         name = str(channel)
         read_ = getattr(stream, 'ReadFr%sData' % ctype[name].title())
-        ts = None
-        i = 0
         dtype_ = dtype.get(channel, None)
-        while True:
-            try:
-                data = read_(i, name)
-            except IndexError:
-                break
-            offset = data.GetTimeOffset()
-            thisepoch = epochs[i] + offset
+        for i in frames:
+            data = read_(i, name)
+            thisepoch = epochs[i] + data.GetTimeOffset()
             for vect in data.data:
                 arr = vect.GetDataArray()
                 dx = vect.GetDim(0).dx
+                # allocate output at its final length
+                ts = out.get(channel)
                 if ts is None:
-                    unit = vect.GetUnitY()
-                    ts = _SeriesClass(arr, epoch=thisepoch, dx=dx, name=name,
-                                      channel=channel, unit=unit, dtype=dtype_,
-                                      copy=True)
+                    nsamp = int(round(abs(span) / dx))
+                    ts = out[channel] = _SeriesClass(
+                        numpy.empty(nsamp, dtype=dtype_ or arr.dtype),
+                        epoch=span[0], dx=dx, name=name, channel=channel,
+                        unit=vect.GetUnitY())
                     if not ts.channel.dtype:
                         ts.channel.dtype = arr.dtype
-                elif dtype_:
-                    ts.append(arr.astype(dtype_))
-                else:
-                    ts.append(arr)
-            i += 1
-        if ts is None:
-            raise ValueError("Channel '%s' not found in frame '%s'"
-                             % (str(channel), fp))
-        else:
-            out[channel] = ts
-
+                # record sample rate and type in the index
+                crecord = record['channels'].setdefault(
+                    name, {'type': ctype[name]})
+                if crecord.get('sample_rate') is None:
+                    crecord['sample_rate'] = 1 / dx
+                    crecord['dtype'] = str(arr.dtype)
+                    update = True
+                # copy the overlapping part of this vector into its slot
+                idx0 = int(round((thisepoch - span[0]) / dx))
+                a = max(idx0, 0)
+                b = min(idx0 + arr.size, ts.size)
+                if b > a:
+                    ts.data[a:b] = arr[a - idx0:b - idx0]
+                    filled[channel].append((a, b))
+                thisepoch += arr.size * dx
+
+    if update:
+        index.add(framefile, record)
     return out
 
 
+def _overlapping_frames(record, span):
+    """Return the indices of those frames in a file that overlap a span.
+
+    Parameters
+    ----------
+    record : `dict`
+        the table of contents index record for the file
+    span : `~gwpy.segments.Segment`
+        GPS [start, end) span of interest
+
+    Returns
+    -------
+    frames : `list` of `int`
+        the index of each overlapping frame in the file
+    """
+    return [i for (i, (e, d)) in
+            enumerate(zip(record['epochs'], record['durations'])) if
+            e < span[1] and e + d > span[0]]
+
+
 @with_import(frameCPP)
 def read_timeseries(source, channel, **kwargs):
     """Read a `TimeSeries` of data from a gravitational-wave frame file
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2013)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent on-disk index of frame-file tables of contents.
+
+Parsing the table of contents (TOC) of a GWF file is needed every time
+a file is opened to find the frame epochs and the type of each channel.
+This module records that information in an SQLite database, keyed by
+file path, so that it only has to be parsed once for each file.
+
+Each record is a `dict` with the following keys:
+
+- ``'epochs'`` : `list` of GPS start times, one per frame in the file
+- ``'durations'`` : `list` of durations, one per frame in the file
+- ``'channels'`` : `dict` of (name, `dict`) pairs, giving the
+  ``'type'`` (``'adc'``, ``'proc'``, or ``'sim'``) of each channel, and
+  its ``'sample_rate'`` and ``'dtype'`` once they have been read
+
+Records are invalidated whenever the size or modification time of the
+file changes.
+
+The index is opt-in. Set the ``GWPY_FRAME_INDEX`` environment variable to
+the path of the database to use (or to ``1`` to use
+``~/.gwpy/frame-index.sqlite``). If the database cannot be created, or
+written, the index silently stores nothing, and each table of contents
+is parsed from the file as before.
+"""
+
+import json
+import os
+import sqlite3
+
+from glue.lal import (Cache, CacheEntry)
+
+from .... import version
+from ....io.cache import IndexedCache
+from ....segments import Segment
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['FrameIndex', 'get_frame_index', 'check_channels']
+
+DEFAULT_INDEX = os.path.join(os.path.expanduser('~'), '.gwpy',
+                             'frame-index.sqlite')
+
+_INDEX = {}
+
+
+class FrameIndex(object):
+    """An on-disk index of frame-file tables of contents.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        path of the SQLite database, use ``':memory:'`` for an index
+        that only lasts as long as this object
+    """
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        """Open connection to the index database.
+
+        A new connection is opened in each process that uses this index.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            if self.path != ':memory:':
+                dir_ = os.path.dirname(self.path)
+                if dir_ and not os.path.isdir(dir_):
+                    os.makedirs(dir_)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS toc (path TEXT PRIMARY KEY, "
+                "size INTEGER, mtime REAL, record TEXT)")
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, framefile, create=True):
+        """Return the indexed table of contents for a frame file.
+
+        Parameters
+        ----------
+        framefile : `str`, :class:`~glue.lal.CacheEntry`
+            path of frame file
+        create : `bool`, optional, default: `True`
+            read the table of contents from the file and add it to the
+            index if not already present, otherwise return `None`
+
+        Returns
+        -------
+        record : `dict`
+            the table of contents record for this file, see the module
+            documentation for details
+        """
+        path = _get_path(framefile)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        try:
+            row = self.connection.execute(
+                "SELECT size, mtime, record FROM toc WHERE path=?",
+                (path,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is not None and (row[0], row[1]) == (stat.st_size,
+                                                    stat.st_mtime):
+            return json.loads(row[2])
+        if not create:
+            return None
+        record = read_toc(path)
+        self.add(path, record)
+        return record
+
+    def add(self, framefile, record):
+        """Add (or replace) the record for a frame file in this index.
+
+        If the index cannot be written, e.g. it is on a read-only file
+        system, the record is silently dropped.
+        """
+        path = _get_path(framefile)
+        stat = os.stat(path)
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO toc VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime, json.dumps(record)))
+        except sqlite3.Error:
+            pass
+
+    def remove(self, framefile):
+        """Remove the record for a frame file from this index.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM toc WHERE path=?",
+                                    (_get_path(framefile),))
+
+    def clear(self):
+        """Remove all records from this index.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM toc")
+
+
+class _NullIndex(FrameIndex):
+    """A `FrameIndex` that never stores anything.
+    """
+    def __init__(self):
+        super(_NullIndex, self).__init__(path=None)
+
+    def get(self, framefile, create=True):
+        if create:
+            return read_toc(_get_path(framefile))
+        return None
+
+    def add(self, framefile, record):
+        pass
+
+    def remove(self, framefile):
+        pass
+
+    def clear(self):
+        pass
+
+
+def get_frame_index(path=None):
+    """Return the `FrameIndex` at the given path.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        path of the index database, defaults to the value of the
+        ``GWPY_FRAME_INDEX`` environment variable, if set; a value of
+        ``'1'`` means ``~/.gwpy/frame-index.sqlite``
+
+    Returns
+    -------
+    index : `FrameIndex`
+        the index, a single instance is returned for each path; if the
+        index is disabled (the default), or cannot be created, an index
+        that stores nothing is returned
+    """
+    if path is None:
+        path = os.environ.get('GWPY_FRAME_INDEX', '')
+    if path == '1':
+        path = DEFAULT_INDEX
+    try:
+        return _INDEX[path]
+    except KeyError:
+        if not path:
+            index = _NullIndex()
+        else:
+            index = FrameIndex(path)
+            try:
+                index.connection
+            except (OSError, sqlite3.Error):
+                index = _NullIndex()
+        _INDEX[path] = index
+        return index
+
+
+# ---------------------------------------------------------------------------
+# TOC parsing
+
+def read_toc(framefile):
+    """Read the table of contents of a frame file into an index record.
+
+    This uses frameCPP if available, otherwise LALFrame.
+    """
+    try:
+        from LDAStools import frameCPP
+    except ImportError:
+        try:
+            import frameCPP
+        except ImportError:
+            return _read_toc_lalframe(framefile)
+    return toc_record(frameCPP.IFrameFStream(framefile).GetTOC())
+
+
+def toc_record(toc):
+    """Build an index record from a frameCPP table of contents.
+
+    Parameters
+    ----------
+    toc : `frameCPP.FrTOC`
+        the table of contents of an open frame file
+
+    Returns
+    -------
+    record : `dict`
+        the index record for the file
+    """
+    epochs = [s + n * 1e-9 for (s, n) in zip(toc.GTimeS, toc.GTimeN)]
+    durations = [float(dt) for dt in toc.dt]
+    channels = {}
+    for type_ in ['adc', 'proc', 'sim']:
+        try:
+            names = getattr(toc, 'Get%s' % type_.title())()
+        except AttributeError:
+            continue
+        try:
+            names = names.keys()
+        except AttributeError:
+            pass
+        for name in names:
+            channels[str(name)] = {'type': type_, 'sample_rate': None,
+                                   'dtype': None}
+    return {'epochs': epochs, 'durations': durations, 'channels': channels}
+
+
+def _read_toc_lalframe(framefile):
+    """Build an index record using the LALFrame table of contents API.
+    """
+    import lalframe
+    frfile = lalframe.FrameUFrFileOpen(framefile, 'r')
+    toc = lalframe.FrameUFrTOCRead(frfile)
+    epochs = []
+    durations = []
+    for pos in range(lalframe.FrameUFrTOCQueryNFrame(toc)):
+        frac, sec = lalframe.FrameUFrTOCQueryGTimeModf(toc, pos)
+        epochs.append(sec + frac)
+        durations.append(lalframe.FrameUFrTOCQueryDt(toc, pos))
+    channels = {}
+    for type_ in ['adc', 'proc', 'sim']:
+        query = getattr(lalframe, 'FrameUFrTOCQuery%sName' % type_.title())
+        size = getattr(lalframe, 'FrameUFrTOCQuery%sN' % type_.title())(toc)
+        for i in range(size):
+            channels[str(query(toc, i))] = {'type': type_,
+                                            'sample_rate': None,
+                                            'dtype': None}
+    return {'epochs': epochs, 'durations': durations, 'channels': channels}
+
+
+# ---------------------------------------------------------------------------
+# utilities
+
+def _get_path(framefile):
+    """Return the absolute path of a frame file.
+    """
+    if isinstance(framefile, CacheEntry):
+        framefile = framefile.path
+    elif isinstance(framefile, file):
+        framefile = framefile.name
+    return os.path.abspath(framefile)
+
+
+def record_span(record):
+    """Return the GPS [start, end) `Segment` covered by an index record.
+    """
+    return Segment(min(record['epochs']),
+                   max(e + d for (e, d) in zip(record['epochs'],
+                                               record['durations'])))
+
+
+def check_channels(source, channels, index=None):
+    """Check that all channels are in the indexed table of contents.
+
+    Only the index is consulted, so no frame files are opened; every
+    file in ``source`` that is in the index is checked, files not yet
+    in the index are not.
+
+    Parameters
+    ----------
+    source : `str`, :class:`~glue.lal.CacheEntry`, :class:`~glue.lal.Cache`
+        frame file, or list of frame files
+    channels : `list`
+        list of channel names to check
+    index : `FrameIndex`, optional
+        index to query, defaults to :func:`get_frame_index`
+
+    Raises
+    ------
+    ValueError
+        if any of the channels are not listed in the table of contents
+        of any indexed file in ``source``
+    """
+    if isinstance(source, IndexedCache):
+        source = source.pfnlist()
+    elif isinstance(source, (unicode, str)):
+        source = source.split(',')
+    elif isinstance(source, (CacheEntry, file)):
+        source = [source]
+    elif not isinstance(source, (Cache, list, tuple)):
+        return
+    if index is None:
+        index = get_frame_index()
+    if isinstance(index, _NullIndex):
+        return
+    channels = [str(c) for c in channels]
+    for framefile in source:
+        record = index.get(framefile, create=False)
+        if record is None:
+            continue
+        missing = [c for c in channels if c not in record['channels']]
+        if missing:
+            raise ValueError("Channel%s not found in frame table of "
+                             "contents for %s: %s"
+                             % (len(missing) > 1 and 's' or '',
+                                _get_path(framefile), ', '.join(missing)))
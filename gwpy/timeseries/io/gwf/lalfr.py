@@ -17,6 +17,10 @@
 # along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
 
 """Read gravitational-wave frame (GWF) files using the LALFrame API.
+
+Requested channels are validated against the persistent
+:class:`~gwpy.timeseries.io.gwf.index.FrameIndex` before any files are
+opened.
 """
 
 from __future__ import division
@@ -28,6 +32,7 @@ from astropy.io import registry
 from glue.lal import CacheEntry
 
 from .identify import register_identifier
+from .index import check_channels
 from ....detector import Channel
 from ....time import Time
 from ... import (TimeSeries, StateVector, TimeSeriesDict, StateVectorDict)
@@ -70,6 +75,8 @@ def read_timeseries(framefile, channel, start=None, end=None, dtype=None,
         a new `TimeSeries` containing the data read from disk
     """
     lal = import_method_dependency('lal.lal')
+    # validate channel against the frame index before opening any files
+    check_channels(framefile, [channel])
     # parse input arguments
     if isinstance(framefile, CacheEntry):
         framefile = framefile.path
@@ -128,6 +135,7 @@ def read_timeseriesdict(framefile, channels, **kwargs):
     dict : :class:`~gwpy.timeseries.core.TimeSeriesDict`
         dict of (channel, `TimeSeries`) data pairs
     """
+    check_channels(framefile, channels)
     out = TimeSeriesDict()
     resample = kwargs.pop('resample', None)
     if isinstance(resample, int) or resample is None:
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2013)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Fixed-duration rolling buffers of time-series data.
+
+:meth:`TimeSeries.update <gwpy.timeseries.core.TimeSeries.update>`
+shifts the entire array for every update, which dominates the cost of
+maintaining long rolling windows of data. The `TimeSeriesRingBuffer`
+writes new data into a circular buffer instead, so that adding ``N``
+samples costs ``O(N)``, regardless of the length of the buffer.
+"""
+
+from __future__ import division
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import numpy
+
+from astropy import units
+
+from .. import version
+from ..segments import Segment
+from ..time import (Time, to_gps)
+from .core import (TimeSeries, TimeSeriesDict)
+
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['TimeSeriesRingBuffer', 'TimeSeriesRingBufferDict']
+
+
+class TimeSeriesRingBuffer(object):
+    """A fixed-duration rolling buffer of `TimeSeries` data.
+
+    New data are written into a circular array, overwriting the oldest
+    samples once the buffer is full. Windows onto the buffered data are
+    returned as `TimeSeries` views of the buffer when the window is
+    contiguous in memory, and are only copied when the window wraps
+    around the end of the array.
+
+    Parameters
+    ----------
+    duration : `float`
+        length (seconds) of data to hold
+    sample_rate : `float`, `~astropy.units.Quantity`
+        rate of samples per second (Hertz)
+    epoch : `~gwpy.time.Time`, `float`, optional
+        GPS start time of the first data to be added, if not given
+        this is taken from the first `TimeSeries` given to
+        :meth:`update`
+    dtype : :class:`numpy.dtype`, optional, default: `numpy.float64`
+        numeric data type of the buffer
+    channel : `~gwpy.detector.Channel`, `str`, optional
+        source data channel
+    unit : `~astropy.units.Unit`, optional
+        physical unit of the data
+    name : `str`, optional
+        descriptive title for the data
+
+    Notes
+    -----
+    Windows returned by :meth:`window` (and :attr:`timeseries`) may be
+    views of the buffer, so will be overwritten by subsequent calls to
+    :meth:`update`; use ``window.copy()`` to keep them.
+    """
+    def __init__(self, duration, sample_rate, epoch=None,
+                 dtype=numpy.float64, channel=None, unit=None, name=None):
+        if isinstance(sample_rate, units.Quantity):
+            sample_rate = sample_rate.to('Hertz').value
+        self.capacity = int(round(duration * sample_rate))
+        if self.capacity < 1:
+            raise ValueError("Cannot create a %s holding fewer than one "
+                             "sample" % type(self).__name__)
+        self._data = numpy.empty(self.capacity, dtype=dtype)
+        # template holding the metadata for output windows
+        self._template = TimeSeries(numpy.empty(0, dtype=dtype),
+                                    sample_rate=sample_rate, channel=channel,
+                                    unit=unit, name=name, epoch=0)
+        if epoch is None:
+            self._t0 = None
+        else:
+            self._t0 = float(to_gps(epoch))
+        self._nwritten = 0  # number of samples written since t0
+        self._head = 0  # position in _data of next sample to write
+
+    @classmethod
+    def from_timeseries(cls, timeseries, duration=None):
+        """Create a new `TimeSeriesRingBuffer` seeded with data.
+
+        Parameters
+        ----------
+        timeseries : `TimeSeries`
+            the input data
+        duration : `float`, optional
+            length (seconds) of the new buffer, defaults to the
+            duration of the input
+
+        Returns
+        -------
+        buffer : `TimeSeriesRingBuffer`
+            a new buffer, containing (at most ``duration`` seconds of)
+            the input data
+        """
+        if duration is None:
+            duration = float(timeseries.duration.value)
+        new = cls(duration, timeseries.sample_rate,
+                  epoch=timeseries.span[0], dtype=timeseries.dtype,
+                  channel=timeseries.channel, unit=timeseries.unit,
+                  name=timeseries.name)
+        new.update(timeseries)
+        return new
+
+    # -------------------------------------------
+    # properties
+
+    @property
+    def sample_rate(self):
+        """Data rate for this buffer in samples per second (Hertz).
+        """
+        return self._template.sample_rate
+
+    @property
+    def dt(self):
+        """Time between samples for this buffer.
+        """
+        return self._template.dt
+
+    @property
+    def channel(self):
+        """Source data `Channel` for this buffer.
+        """
+        return self._template.channel
+
+    @property
+    def name(self):
+        """Name for this buffer.
+        """
+        return self._template.name
+
+    @property
+    def unit(self):
+        """Unit of the data in this buffer.
+        """
+        return self._template.unit
+
+    @property
+    def dtype(self):
+        """Numeric data type of this buffer.
+        """
+        return self._data.dtype
+
+    @property
+    def size(self):
+        """Number of valid samples held in this buffer.
+        """
+        return min(self._nwritten, self.capacity)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def span(self):
+        """GPS [start, end) `Segment` of the data held in this buffer.
+        """
+        if self._t0 is None:
+            raise AttributeError("No epoch has been set for this %s"
+                                 % type(self).__name__)
+        dt = self.dt.value
+        end = self._t0 + self._nwritten * dt
+        return Segment(end - self.size * dt, end)
+
+    @property
+    def epoch(self):
+        """GPS start time of the oldest sample held in this buffer.
+        """
+        return Time(self.span[0], format='gps', scale='utc')
+
+    @property
+    def duration(self):
+        """Duration of the data held in this buffer.
+        """
+        return units.Quantity(self.size * self.dt.value, self.dt.unit)
+
+    # -------------------------------------------
+    # methods
+
+    def update(self, other, gap='raise'):
+        """Add new data to the end of this buffer.
+
+        The oldest data are overwritten once the buffer is full.
+
+        Parameters
+        ----------
+        other : `TimeSeries`, `numpy.ndarray`
+            new data to add, a `TimeSeries` must start at the end of
+            the current data, while a simple array is assumed to do so
+        gap : `str`, optional, default: ``'raise'``
+            action to perform if ``other`` doesn't start at the end of
+            the current data, one of
+
+            - ``'raise'`` - raise a `ValueError`
+            - ``'ignore'`` - discard the current data, and start again
+              at the epoch of ``other``
+
+        Returns
+        -------
+        buffer : `TimeSeriesRingBuffer`
+            this buffer, updated in-place
+
+        Raises
+        ------
+        ValueError
+            if ``other`` has a different sample rate, or doesn't follow
+            on from the current data and ``gap='raise'``
+        """
+        if isinstance(other, TimeSeries):
+            if other.sample_rate != self.sample_rate:
+                raise ValueError("Cannot update %s at %s with TimeSeries "
+                                 "at %s" % (type(self).__name__,
+                                            self.sample_rate,
+                                            other.sample_rate))
+            start = float(other.span[0])
+            if self._t0 is None:
+                self._t0 = start
+            elif abs(start - self.span[1]) > self.dt.value / 2.:
+                if gap == 'ignore':
+                    self._t0 = start
+                    self._nwritten = self._head = 0
+                else:
+                    raise ValueError("Cannot update %s spanning %s with "
+                                     "discontiguous TimeSeries spanning %s"
+                                     % (type(self).__name__, self.span,
+                                        other.span))
+            other = other.data
+        elif self._t0 is None:
+            raise ValueError("Cannot update %s with no epoch from a simple "
+                             "array, please give a TimeSeries"
+                             % type(self).__name__)
+        other = numpy.asarray(other)
+        nnew = other.shape[0]
+        # only the last `capacity` samples can be kept
+        if nnew >= self.capacity:
+            self._data[:] = other[-self.capacity:]
+            self._head = 0
+        else:
+            nfirst = min(nnew, self.capacity - self._head)
+            self._data[self._head:self._head + nfirst] = other[:nfirst]
+            self._data[:nnew - nfirst] = other[nfirst:]
+            self._head = (self._head + nnew) % self.capacity
+        self._nwritten += nnew
+        return self
+
+    def window(self, start=None, end=None):
+        """Return the data in this buffer over a GPS [start, end) interval.
+
+        Parameters
+        ----------
+        start : `~gwpy.time.Time`, `float`, optional
+            GPS start time of the window, defaults to the start of the
+            buffer
+        end : `~gwpy.time.Time`, `float`, optional
+            GPS end time of the window, defaults to the end of the
+            buffer
+
+        Returns
+        -------
+        timeseries : `TimeSeries`
+            the data in the window, a view of the buffer if the window
+            is contiguous in memory, otherwise a copy
+
+        Raises
+        ------
+        ValueError
+            if the window is outside of the span of this buffer
+        """
+        span = self.span
+        dt = self.dt.value
+        if start is None:
+            idx0 = 0
+        else:
+            idx0 = int(round((float(to_gps(start)) - span[0]) / dt))
+        if end is None:
+            idx1 = self.size
+        else:
+            idx1 = int(round((float(to_gps(end)) - span[0]) / dt))
+        if idx0 < 0 or idx1 > self.size or idx1 < idx0:
+            raise ValueError("Cannot extract window [%s, %s) from %s "
+                             "spanning %s" % (start, end,
+                                              type(self).__name__, span))
+        # position of the oldest sample in the buffer
+        oldest = (self._head - self.size) % self.capacity
+        pos0 = (oldest + idx0) % self.capacity
+        nsamp = idx1 - idx0
+        if pos0 + nsamp <= self.capacity:
+            data = self._data[pos0:pos0 + nsamp]
+        else:
+            data = numpy.concatenate((self._data[pos0:],
+                                      self._data[:pos0 + nsamp -
+                                                 self.capacity]))
+        new = data.view(TimeSeries)
+        new.metadata = self._template.metadata.copy()
+        new.epoch = span[0] + idx0 * dt
+        return new
+
+    @property
+    def timeseries(self):
+        """All of the data in this buffer, as a `TimeSeries`.
+
+        See :meth:`window` for details.
+        """
+        return self.window()
+
+    def __repr__(self):
+        return '<%s(%s, capacity=%d, span=%s)>' % (
+            type(self).__name__, self.name, self.capacity,
+            self._t0 is not None and self.span or None)
+
+
+class TimeSeriesRingBufferDict(OrderedDict):
+    """Ordered key-value mapping of named `TimeSeriesRingBuffer` objects.
+
+    This is the rolling-buffer equivalent of the `TimeSeriesDict`.
+    """
+    EntryClass = TimeSeriesRingBuffer
+
+    @classmethod
+    def from_timeseriesdict(cls, tsd, duration=None):
+        """Create a new `TimeSeriesRingBufferDict` seeded with data.
+
+        Parameters
+        ----------
+        tsd : `TimeSeriesDict`
+            the input data
+        duration : `float`, optional
+            length (seconds) of each new buffer, defaults to the
+            duration of each input
+
+        Returns
+        -------
+        buffers : `TimeSeriesRingBufferDict`
+            a new dict of buffers, one for each input `TimeSeries`
+        """
+        new = cls()
+        for key, ts in tsd.iteritems():
+            new[key] = cls.EntryClass.from_timeseries(ts, duration=duration)
+        return new
+
+    def update(self, other, gap='raise'):
+        """Add new data to the end of each buffer in this dict.
+
+        Parameters
+        ----------
+        other : `TimeSeriesDict`
+            dict of (key, `TimeSeries`) pairs to add, each key must
+            already be present in this dict
+        gap : `str`, optional, default: ``'raise'``
+            action to perform on discontiguous data, see
+            :meth:`TimeSeriesRingBuffer.update`
+
+        Returns
+        -------
+        buffers : `TimeSeriesRingBufferDict`
+            this dict, updated in-place
+        """
+        for key, ts in other.iteritems():
+            self[key].update(ts, gap=gap)
+        return self
+
+    def window(self, start=None, end=None):
+        """Return the data in each buffer over a GPS [start, end) interval.
+
+        See :meth:`TimeSeriesRingBuffer.window` for details.
+
+        Returns
+        -------
+        tsd : `TimeSeriesDict`
+            a dict of (key, `TimeSeries`) pairs
+        """
+        out = TimeSeriesDict()
+        for key, buffer_ in self.iteritems():
+            out[key] = buffer_.window(start=start, end=end)
+        return out
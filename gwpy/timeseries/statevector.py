@@ -35,7 +35,6 @@ if sys.version_info[0] < 3:
 
 import numpy
 
-from glue.segmentsUtils import from_bitstream
 from astropy.units import Quantity
 
 from .core import (TimeSeries, TimeSeriesDict, ArrayTimeSeries,
@@ -87,7 +86,7 @@ class StateTimeSeries(TimeSeries):
         """
         if isinstance(data, (list, tuple)):
             data = numpy.asarray(data)
-        if not isinstance(data, cls):
+        if not isinstance(data, cls) and data.dtype != bool:
             data = data.astype(bool)
         return super(StateTimeSeries, cls).__new__(cls, data, name=name,
                                                    epoch=epoch,
@@ -127,17 +126,14 @@ class StateTimeSeries(TimeSeries):
         """
         start = self.x0.value
         dt = self.dx.value
-        active = from_bitstream(self.data, start, dt, minlen=int(minlen))
-        if dtype is not float:
-            active = active.__class__([Segment(dtype(s[0]), dtype(s[1])) for
-                                       s in active])
-        known = SegmentList([self.span])
-        out = DataQualityFlag(name=name or self.name, active=active,
-                              known=known, label=label or self.name,
-                              description=description)
-        if round:
-            out = out.round()
-        return out.coalesce()
+        _, starts, ends = _find_edges(self.data[:, None])
+        active = _edges_to_segments(starts, ends, start, dt, minlen=minlen,
+                                    dtype=dtype, round=round)
+        known = _edges_to_segments(numpy.array([0]), numpy.array([self.size]),
+                                   start, dt, round=round)
+        return DataQualityFlag(name=name or self.name, active=active,
+                               known=known, label=label or self.name,
+                               description=description)
 
     def to_lal(self, *args, **kwargs):
         """Bogus function inherited from superclass, do not use.
@@ -334,15 +330,14 @@ class StateVector(TimeSeries):
     def boolean(self):
         """A mapping of this `StateVector` to a 2-D array containing all
         binary bits as booleans, for each time point.
+
+        The array is computed once, by unpacking the bytes of all samples
+        in a single pass, and is cached for subsequent use.
         """
         try:
             return self._boolean
         except AttributeError:
-            nbits = len(self.bits)
-            boolean = numpy.zeros((self.size, nbits), dtype=bool)
-            for i, d in enumerate(self.data):
-                boolean[i, :] = [int(d) >> j & 1 for
-                                 j in range(nbits)]
+            boolean = _unpack_bits(self.data, len(self.bits))
             self._boolean = ArrayTimeSeries(boolean, name=self.name,
                                             epoch=self.epoch,
                                             sample_rate=self.sample_rate,
@@ -352,6 +347,9 @@ class StateVector(TimeSeries):
     def get_bit_series(self, bits=None):
         """Get the `StateTimeSeries` for each bit of this `StateVector`.
 
+        Each `StateTimeSeries` is a view of one column of the
+        :attr:`~StateVector.boolean` array, so no data are copied.
+
         Parameters
         ----------
         bits : `list`, optional
@@ -366,15 +364,30 @@ class StateVector(TimeSeries):
         """
         if bits is None:
             bits = [b for b in self.bits if b is not None]
-        for i, b in enumerate(bits):
-            if not b in self.bits and isinstance(b):
-                bits[i] = self.bits[b]
-        self._bitseries = TimeSeriesDict()
-        for i, bit in enumerate(self.bits):
-            self._bitseries[bit] = StateTimeSeries(
-                self.data >> i & 1, name=bit, epoch=self.x0.value,
+        boolean = self.boolean.data
+        out = TimeSeriesDict()
+        for bit in bits:
+            idx = self._get_bit_index(bit)
+            name = self.bits[idx]
+            out[name] = StateTimeSeries(
+                boolean[:, idx], name=name, epoch=self.x0.value,
                 channel=self.channel, sample_rate=self.sample_rate)
-        return self._bitseries
+        return out
+
+    def _get_bit_index(self, bit):
+        """Find the index of a bit, given its index or name.
+        """
+        if isinstance(bit, (int, numpy.integer)):
+            if not 0 <= bit < len(self.bits):
+                raise ValueError("Bit index %d out of range for %s with %d "
+                                 "bits" % (bit, type(self).__name__,
+                                           len(self.bits)))
+            return int(bit)
+        try:
+            return self.bits.index(bit)
+        except ValueError:
+            raise ValueError("Bit %r not found in %s bits"
+                             % (bit, type(self).__name__))
 
     # -------------------------------------------
     # StateVector methods
@@ -455,12 +468,26 @@ class StateVector(TimeSeries):
             for details on the segment representation method for
             `StateVector` bits
         """
+        if bits is None:
+            bits = [b for b in self.bits if b is not None]
+        indices = [self._get_bit_index(b) for b in bits]
+        start = self.x0.value
+        dt = self.dx.value
+        # find the edges of all bits in one pass
+        bitidx, starts, ends = _find_edges(self.boolean.data[:, indices])
+        splits = numpy.searchsorted(bitidx, numpy.arange(len(indices) + 1))
+        known = _edges_to_segments(numpy.array([0]), numpy.array([self.size]),
+                                   start, dt, round=round)
         out = DataQualityDict()
-        bitseries = self.get_bit_series(bits=bits)
-        for bit, sts in bitseries.iteritems():
-            out[bit] = sts.to_dqflag(name=bit, minlen=minlen, round=round,
-                                     dtype=dtype,
-                                     description=self.bits.description[bit])
+        for i, idx in enumerate(indices):
+            bit = self.bits[idx]
+            a, b = splits[i:i+2]
+            active = _edges_to_segments(starts[a:b], ends[a:b], start, dt,
+                                        minlen=minlen, dtype=dtype,
+                                        round=round)
+            out[bit] = DataQualityFlag(name=bit, active=active,
+                                       known=SegmentList(known), label=bit,
+                                       description=self.bits.description[bit])
         return out
 
     @classmethod
@@ -546,11 +573,11 @@ class StateVector(TimeSeries):
         raise ValueError("'format' argument must be one of: 'timeseries' or "
                          "'segments'")
 
-    def resample(self, rate):
+    def resample(self, rate, method='and'):
         """Resample this `StateVector` to a new rate
 
         Because of the nature of a state-vector, downsampling is done
-        by taking the logical 'and' of all original samples in each new
+        by combining each bit of all original samples in each new
         sampling interval, while upsampling is achieved by repeating
         samples.
 
@@ -560,6 +587,14 @@ class StateVector(TimeSeries):
             rate to which to resample this `StateVector`, must be a
             divisor of the original sample rate (when downsampling)
             or a multiple of the original (when upsampling).
+        method : `str`, optional, default: ``'and'``
+            how to combine the bits of the original samples when
+            downsampling, one of
+
+            - ``'and'`` - a bit is set if it was set in all samples
+            - ``'or'`` - a bit is set if it was set in any sample
+            - ``'majority'`` - a bit is set if it was set in more than
+              half of the samples
 
         Returns
         -------
@@ -571,47 +606,24 @@ class StateVector(TimeSeries):
             rate2 = rate.value
         else:
             rate2 = float(rate)
-        # upsample
-        if (rate2 / rate1).is_integer():
-            raise NotImplementedError("StateVector upsampling has not "
-                                      "been implemented yet, sorry.")
-        # downsample
-        elif (rate1 / rate2).is_integer():
-            factor = int(rate1 / rate2)
-            # reshape incoming data to one column per new sample
-            newsize = self.size / factor
-            old = self.data.reshape((newsize, self.size // newsize))
-            # work out number of bits
-            if len(self.bits):
-                nbits = len(self.bits)
-            else:
-                max = self.data.max()
-                nbits = max != 0 and int(ceil(log(self.data.max(), 2))) or 1
-            bits = range(nbits)
-            # construct an iterator over the columns of the old array
-            it = numpy.nditer([old, None],
-                              flags=['external_loop', 'reduce_ok'],
-                              op_axes=[None, [0, -1]],
-                              op_flags=[['readonly'],
-                                        ['readwrite', 'allocate']])
-            dtype = self.dtype
-            type_ = self.dtype.type
-            # for each new sample, each bit is logical AND of old samples
-            # bit is ON,
-            for x, y in it:
-                y[...] = numpy.sum([type_((x >> bit & 1).all() * (2 ** bit)) for
-                                   bit in bits], dtype=self.dtype)
-            new = StateVector(it.operands[1])
-            new.metadata = self.metadata.copy()
-            new.sample_rate = rate2
-            return new
-        # error for non-integer resampling factors
-        elif rate1 < rate2:
-            raise ValueError("New sample rate must be multiple of input "
-                             "series rate if upsampling a StateVector")
-        else:
-            raise ValueError("New sample rate must be divisor of input "
-                             "series rate if downsampling a StateVector")
+        data = _resample_bits(self.data, rate1, rate2, self._get_nbits(),
+                              method=method)
+        new = data.view(type(self))
+        new.metadata = self.metadata.copy()
+        new.sample_rate = rate2
+        return new
+
+    def _get_nbits(self):
+        """Return the number of bits used by this `StateVector`.
+        """
+        try:
+            nbits = len(self.bits)
+        except KeyError:
+            nbits = 0
+        if not nbits:
+            max_ = int(self.data.max()) if self.size else 0
+            nbits = max_ > 0 and int(ceil(log(max_ + 1, 2))) or 1
+        return nbits
 
     def spectrogram(self, *args, **kwargs):
         """Bogus function inherited from parent class, do not use.
@@ -622,6 +634,178 @@ class StateVector(TimeSeries):
                                   "BooleanTimeSeries structure")
 
 
+def _find_edges(boolean):
+    """Find the start and end of each run of `True` values.
+
+    Parameters
+    ----------
+    boolean : `numpy.ndarray`
+        2-D boolean array, with time along the first axis, and one
+        column per bit
+
+    Returns
+    -------
+    bitidx, starts, ends : `numpy.ndarray`
+        the column index, and the index of the first `True` sample and
+        of the first following `False` sample, for each run of `True`
+        values, sorted by column then time
+    """
+    boolean = numpy.asarray(boolean, dtype=bool)
+    padded = numpy.zeros((boolean.shape[1], boolean.shape[0] + 2),
+                         dtype=numpy.int8)
+    padded[:, 1:-1] = boolean.T
+    diff = numpy.diff(padded, axis=1)
+    bitidx, starts = numpy.nonzero(diff == 1)
+    ends = numpy.nonzero(diff == -1)[1]
+    return bitidx, starts, ends
+
+
+def _edges_to_segments(starts, ends, epoch, dt, minlen=1, dtype=float,
+                       round=False):
+    """Build a `SegmentList` from arrays of start and end indices.
+
+    Parameters
+    ----------
+    starts, ends : `numpy.ndarray`
+        sorted index arrays of the [start, end) of each run
+    epoch : `float`
+        GPS time of index 0
+    dt : `float`
+        time between samples
+    minlen : `int`, optional, default: 1
+        minimum number of samples in a segment, shorter runs are
+        discarded
+    dtype : `type`, `callable`, default: `float`
+        output segment entry type
+    round : `bool`, optional, default: `False`
+        round each segment to its enclosing integer boundaries, and
+        coalesce the result
+
+    Returns
+    -------
+    segments : `~gwpy.segments.SegmentList`
+        the list of segments
+    """
+    keep = (ends - starts) >= int(minlen)
+    t0 = epoch + starts[keep] * dt
+    t1 = epoch + ends[keep] * dt
+    if round and t0.size:
+        t0 = numpy.floor(t0)
+        t1 = numpy.ceil(t1)
+        # merge segments that now overlap or touch
+        runmax = numpy.maximum.accumulate(t1)
+        breaks = numpy.flatnonzero(t0[1:] > runmax[:-1]) + 1
+        t0 = t0[numpy.concatenate(([0], breaks))]
+        t1 = runmax[numpy.concatenate((breaks - 1, [runmax.size - 1]))]
+        t0 = t0.astype(int)
+        t1 = t1.astype(int)
+    t0 = t0.tolist()
+    t1 = t1.tolist()
+    if dtype is not float:
+        t0 = map(dtype, t0)
+        t1 = map(dtype, t1)
+    return SegmentList(map(Segment, t0, t1))
+
+
+def _unpack_bits(data, nbits):
+    """Unpack integer data into a 2-D array of booleans, one column per bit.
+
+    Parameters
+    ----------
+    data : `numpy.ndarray`
+        1-D array of integer (or integer-valued) data
+    nbits : `int`
+        number of bits to unpack, starting at bit 0
+
+    Returns
+    -------
+    boolean : `numpy.ndarray`
+        2-D array of shape ``(data.size, nbits)``, where
+        ``boolean[i, j]`` is the state of bit ``j`` in sample ``i``
+    """
+    data = numpy.asarray(data)
+    if nbits > 64:
+        raise ValueError("Cannot unpack more than 64 bits")
+    if data.dtype.kind not in 'iub':
+        data = data.astype(numpy.int64)
+    # use the smallest unsigned big-endian type holding all the bits
+    nbytes = 1
+    while nbytes * 8 < max(nbits, 1):
+        nbytes *= 2
+    raw = data.astype('>u%d' % nbytes).view(numpy.uint8).reshape(
+        (data.size, nbytes))
+    # unpackbits gives the most significant bit first, so reverse
+    unpacked = numpy.unpackbits(raw, axis=1)[:, ::-1]
+    return unpacked[:, :nbits].view(bool)
+
+
+def _resample_bits(data, rate1, rate2, nbits, method='and'):
+    """Resample bit-mask data along their last axis.
+
+    Parameters
+    ----------
+    data : `numpy.ndarray`
+        N-D array of bit-mask data, with time along the last axis
+    rate1 : `float`
+        sample rate of the input data
+    rate2 : `float`
+        new sample rate, an integer multiple or divisor of ``rate1``
+    nbits : `int`
+        number of bits to keep when downsampling
+    method : `str`, optional, default: ``'and'``
+        downsampling method, one of ``'and'``, ``'or'``, or
+        ``'majority'``
+
+    Returns
+    -------
+    resampled : `numpy.ndarray`
+        the resampled data, with the same type as the input
+    """
+    if method not in ['and', 'or', 'majority']:
+        raise ValueError("Unknown StateVector resample method %r, please "
+                         "select one of 'and', 'or', or 'majority'"
+                         % method)
+    data = numpy.asarray(data)
+    # upsample
+    if rate2 >= rate1 and (rate2 / rate1).is_integer():
+        return numpy.repeat(data, int(rate2 / rate1), axis=-1)
+    # downsample
+    elif (rate1 / rate2).is_integer():
+        factor = int(rate1 / rate2)
+        nsamp = data.shape[-1]
+        if nsamp % factor:
+            raise ValueError("Cannot downsample StateVector of %d samples "
+                             "by a factor of %d" % (nsamp, factor))
+        # reshape incoming data to one row per new sample
+        ints = data
+        if ints.dtype.kind not in 'iu':
+            ints = ints.astype(numpy.int64)
+        old = ints.reshape(data.shape[:-1] + (nsamp // factor, factor))
+        if method == 'and':
+            new = numpy.bitwise_and.reduce(old, axis=-1)
+        elif method == 'or':
+            new = numpy.bitwise_or.reduce(old, axis=-1)
+        else:
+            counts = _unpack_bits(old.ravel(), nbits).reshape(
+                old.shape + (nbits,)).sum(axis=-2, dtype=numpy.int64)
+            weights = numpy.left_shift(numpy.uint64(1),
+                                       numpy.arange(nbits, dtype=numpy.uint64))
+            new = numpy.dot(counts * 2 > factor, weights)
+        # only keep the defined bits
+        if nbits < 64:
+            mask = (1 << nbits) - 1
+            new = numpy.bitwise_and(new.astype(numpy.uint64),
+                                    numpy.uint64(mask))
+        return new.astype(data.dtype)
+    # error for non-integer resampling factors
+    elif rate1 < rate2:
+        raise ValueError("New sample rate must be multiple of input "
+                         "series rate if upsampling a StateVector")
+    else:
+        raise ValueError("New sample rate must be divisor of input "
+                         "series rate if downsampling a StateVector")
+
+
 @update_docstrings
 class StateVectorDict(TimeSeriesDict):
     """Analog of the :class:`~gwpy.timeseries.core.TimeSeriesDict`
@@ -674,3 +858,51 @@ class StateVectorDict(TimeSeriesDict):
 
         Notes
         -----"""))
+
+    def resample(self, rate, method='and'):
+        """Resample items in this dict.
+
+        This operation over-writes items inplace. All `StateVector`
+        items with the same length, data type, and number of bits, that
+        are resampled between the same two rates, are stacked and
+        resampled together in a single operation.
+
+        Parameters
+        ----------
+        rate : `dict`, `float`
+            either a `dict` of (channel, `float`) pairs for key-wise
+            resampling, or a single float/int to resample all items.
+        method : `str`, optional, default: ``'and'``
+            how to combine bits when downsampling, see
+            :meth:`StateVector.resample`
+
+        Returns
+        -------
+        self : `StateVectorDict`
+            this dict, with resampled items
+        """
+        if not isinstance(rate, dict):
+            rate = dict((c, rate) for c in self)
+        # group items that can be resampled together
+        groups = {}
+        for key, rate2 in rate.iteritems():
+            if isinstance(rate2, Quantity):
+                rate2 = rate2.value
+            sv = self[key]
+            group = (sv.sample_rate.value, float(rate2), sv.size,
+                     sv.dtype.str, sv._get_nbits())
+            groups.setdefault(group, []).append(key)
+        # resample each group
+        for (rate1, rate2, _, _, nbits), keys in groups.iteritems():
+            if len(keys) == 1:
+                self[keys[0]] = self[keys[0]].resample(rate2, method=method)
+                continue
+            data = _resample_bits(
+                numpy.vstack([self[key].data for key in keys]), rate1, rate2,
+                nbits, method=method)
+            for key, row in zip(keys, data):
+                new = row.view(type(self[key]))
+                new.metadata = self[key].metadata.copy()
+                new.sample_rate = rate2
+                self[key] = new
+        return self
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) Duncan Macleod (2013)
+#
+# This file is part of GWpy.
+#
+# GWpy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# GWpy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GWpy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent worker pools for parallel processing.
+
+All of the ``nproc`` code paths in GWpy share the worker pools managed by
+this module. Pools are created the first time they are needed, and are
+kept alive until the interpreter exits (or :func:`close_pools` is
+called), so that repeated calls do not pay to start new processes.
+
+Array data are passed to and from process workers through
+:class:`SharedArray` handles, memory-mapped files in shared memory, so
+that only a small handle is pickled for each task, rather than the data
+themselves. Thread workers share memory with the caller, so arrays are
+passed through unchanged.
+"""
+
+import atexit
+import os
+import sys
+import tempfile
+from multiprocessing import (Pool, cpu_count)
+from multiprocessing.pool import ThreadPool
+import warnings
+
+import numpy
+
+from .. import version
+__author__ = 'Duncan Macleod <duncan.macleod@ligo.org>'
+__version__ = version.version
+
+__all__ = ['SharedArray', 'get_pool', 'close_pools', 'map_pool',
+           'map_shared', 'share', 'unshare', 'close_shared']
+
+BACKENDS = ['process', 'thread']
+
+# use in-memory filesystem for shared buffers where available
+if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+    SHM_DIR = '/dev/shm'
+else:
+    SHM_DIR = tempfile.gettempdir()
+
+# cache of open pools, keyed by (backend, nproc)
+_POOLS = {}
+
+# registered unified I/O readers when each process pool was forked
+_POOL_READERS = {}
+
+
+# ---------------------------------------------------------------------------
+# shared memory
+
+class SharedArray(object):
+    """A picklable handle to a `numpy.ndarray` held in shared memory.
+
+    The array data are copied once into a memory-mapped file under
+    `SHM_DIR`; pickling this object only records the location, type
+    and shape of that file, so the data can be opened by any process
+    without being serialised.
+
+    Parameters
+    ----------
+    array : `numpy.ndarray`, optional
+        the data to share; if an `~gwpy.data.Array` is given, its
+        class and metadata are restored by :meth:`asarray`
+    shape : `tuple`, optional
+        shape of an empty array to allocate, only used if ``array`` is
+        not given
+    dtype : :class:`numpy.dtype`, optional
+        data type of an empty array to allocate
+    """
+    def __init__(self, array=None, shape=None, dtype=numpy.float64):
+        if array is not None:
+            shape = array.shape
+            dtype = array.dtype
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.cls = array is not None and type(array) or numpy.ndarray
+        self.metadata = getattr(array, 'metadata', None)
+        fd, self.path = tempfile.mkstemp(prefix='gwpy-shared-', dir=SHM_DIR)
+        os.close(fd)
+        if not self.size:
+            return
+        buffer_ = numpy.memmap(self.path, dtype=self.dtype, mode='w+',
+                               shape=self.shape)
+        if array is not None:
+            buffer_[...] = array
+        buffer_.flush()
+        del buffer_
+
+    @property
+    def size(self):
+        """Number of elements in the shared array.
+        """
+        return int(numpy.prod(self.shape))
+
+    def asarray(self, mode='r'):
+        """Map the shared data into this process.
+
+        Parameters
+        ----------
+        mode : `str`, optional, default: ``'r'``
+            memory-map access mode, use ``'r+'`` to write into the
+            shared buffer, or ``'c'`` for a private copy-on-write view
+
+        Returns
+        -------
+        array : `numpy.ndarray`
+            a view of the shared data, with the class and metadata of
+            the original array
+        """
+        if self.size:
+            data = numpy.memmap(self.path, dtype=self.dtype, mode=mode,
+                                shape=self.shape).view(numpy.ndarray)
+        else:
+            data = numpy.empty(self.shape, dtype=self.dtype)
+        if self.cls is numpy.ndarray:
+            return data
+        new = data.view(self.cls)
+        if self.metadata is not None:
+            new.metadata = self.metadata.copy()
+        return new
+
+    def release(self):
+        """Map the shared data into this process and free the buffer.
+
+        The returned array remains valid after the backing file has
+        been removed, and is writeable without affecting other processes.
+        """
+        try:
+            return self.asarray(mode='c')
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove the backing file for this `SharedArray`.
+        """
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def share(obj, backend='process'):
+    """Prepare an object to be passed to (or from) a worker.
+
+    Parameters
+    ----------
+    obj : `object`
+        object to share, arrays (and `dict` values that are arrays)
+        are placed in shared memory, anything else is returned as is
+    backend : `str`, optional, default: ``'process'``
+        type of worker that will receive the object, objects are never
+        copied for ``'thread'`` workers
+
+    Returns
+    -------
+    shared : `object`
+        a picklable version of ``obj``, to be recovered with
+        :func:`unshare`
+    """
+    if backend == 'thread':
+        return obj
+    if isinstance(obj, numpy.ndarray):
+        return SharedArray(obj)
+    if isinstance(obj, dict):
+        new = obj.__class__()
+        for key, val in obj.items():
+            new[key] = share(val, backend=backend)
+        return new
+    return obj
+
+
+def unshare(obj, release=False, mode='r'):
+    """Recover an object passed through :func:`share`.
+
+    Parameters
+    ----------
+    obj : `object`
+        the shared object
+    release : `bool`, optional, default: `False`
+        free the shared memory once it has been mapped, this should be
+        used once by the final receiver of the data
+    mode : `str`, optional, default: ``'r'``
+        memory-map access mode, use ``'r+'`` to write into a shared
+        output buffer, see :meth:`SharedArray.asarray`
+
+    Returns
+    -------
+    obj : `object`
+        the original object, with data mapped from shared memory
+    """
+    if isinstance(obj, SharedArray):
+        if release:
+            return obj.release()
+        return obj.asarray(mode=mode)
+    if isinstance(obj, dict):
+        for key, val in obj.items():
+            obj[key] = unshare(val, release=release, mode=mode)
+    return obj
+
+
+def close_shared(obj):
+    """Free any shared memory held by an object passed through :func:`share`.
+
+    This is safe to call on objects that have already been recovered
+    with :func:`unshare`, or that were never shared.
+
+    Parameters
+    ----------
+    obj : `object`
+        the shared object
+    """
+    if isinstance(obj, SharedArray):
+        obj.close()
+    elif isinstance(obj, dict):
+        for val in obj.values():
+            close_shared(val)
+
+
+# ---------------------------------------------------------------------------
+# worker pools
+
+def _registered_readers():
+    """Return the set of (format, class) pairs with a registered reader.
+    """
+    try:
+        from astropy.io import registry
+    except ImportError:
+        return frozenset()
+    return frozenset(getattr(registry, '_readers', {}))
+
+def get_pool(nproc, backend='process'):
+    """Return a persistent pool of workers.
+
+    Parameters
+    ----------
+    nproc : `int`
+        number of workers in the pool
+    backend : `str`, optional, default: ``'process'``
+        type of worker, either ``'process'`` or ``'thread'``
+
+    Returns
+    -------
+    pool : `multiprocessing.pool.Pool`
+        a pool of ``nproc`` workers, the same pool is returned for
+        all calls with the same arguments
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown parallel backend %r, please select one "
+                         "of: '%s'" % (backend, "', '".join(BACKENDS)))
+    key = (backend, nproc)
+    # process workers only see the readers registered before they were
+    # forked, so start a new pool if any have been registered since
+    if backend == 'process' and key in _POOLS:
+        if _POOL_READERS.get(key) != _registered_readers():
+            _close_pool(key)
+    try:
+        return _POOLS[key]
+    except KeyError:
+        if backend == 'process' and nproc > cpu_count():
+            warnings.warn("Using %d processes on a %d-core machine is "
+                          "unrecommended...but not forbidden."
+                          % (nproc, cpu_count()))
+        if backend == 'thread':
+            pool = _POOLS[key] = ThreadPool(nproc)
+        else:
+            _POOL_READERS[key] = _registered_readers()
+            pool = _POOLS[key] = Pool(nproc)
+        return pool
+
+
+def _close_pool(key):
+    """Terminate the pool with the given (backend, nproc) key.
+    """
+    pool = _POOLS.pop(key)
+    _POOL_READERS.pop(key, None)
+    pool.terminate()
+    pool.join()
+
+
+def close_pools():
+    """Terminate all open worker pools.
+    """
+    while _POOLS:
+        _close_pool(next(iter(_POOLS)))
+
+atexit.register(close_pools)
+
+
+def map_pool(func, tasks, nproc=1, backend='process', cleanup=None):
+    """Apply a function to each of a list of tasks in parallel.
+
+    Parameters
+    ----------
+    func : `callable`
+        function to apply, for the ``'process'`` backend this must be
+        importable from a module (i.e. not a closure or lambda)
+    tasks : `list`
+        list of single arguments to pass to ``func``
+    nproc : `int`, optional, default: ``1``
+        number of parallel workers to use, tasks are executed serially
+        in this process if ``nproc`` is ``1``, or if there is only one
+        task
+    backend : `str`, optional, default: ``'process'``
+        type of worker, either ``'process'`` or ``'thread'``
+    cleanup : `callable`, optional
+        function to apply to the output of each successful task if any
+        task fails, e.g. :func:`close_shared`
+
+    Returns
+    -------
+    results : `list`
+        the output of ``func`` for each task, in input order
+
+    Raises
+    ------
+    Exception
+        the first exception raised by a worker is re-raised here, once
+        all other parallel tasks have finished
+
+    Notes
+    -----
+    Pools are cached by ``nproc``, not by the number of tasks, so that
+    calls with different numbers of tasks share the same pool.
+    """
+    tasks = list(tasks)
+    serial = nproc <= 1 or len(tasks) <= 1
+    if serial:
+        pending = (_Serial(func, task) for task in tasks)
+    else:
+        pool = get_pool(nproc, backend=backend)
+        pending = [pool.apply_async(func, (task,)) for task in tasks]
+    results = []
+    error = None
+    for result in pending:
+        try:
+            results.append(result.get())
+        except Exception:
+            if error is None:
+                error = sys.exc_info()
+            # parallel tasks are already running, so collect them all
+            if serial:
+                break
+    if error is not None:
+        if cleanup is not None:
+            for result in results:
+                cleanup(result)
+        raise error[0], error[1], error[2]
+    return results
+
+
+def map_shared(func, tasks, nproc=1, backend='process'):
+    """Apply a function that returns shared objects to a list of tasks.
+
+    This is :func:`map_pool` for workers that return their output
+    through :func:`share`; each result is recovered with
+    :func:`unshare`, and the shared memory for all results is freed
+    even if a task fails.
+
+    Parameters
+    ----------
+    func : `callable`
+        function to apply, see :func:`map_pool`
+    tasks : `list`
+        list of single arguments to pass to ``func``
+    nproc : `int`, optional, default: ``1``
+        number of parallel workers to use
+    backend : `str`, optional, default: ``'process'``
+        type of worker, either ``'process'`` or ``'thread'``
+
+    Returns
+    -------
+    results : `list`
+        the unshared output of ``func`` for each task, in input order
+    """
+    results = map_pool(func, tasks, nproc=nproc, backend=backend,
+                       cleanup=close_shared)
+    try:
+        return [unshare(result, release=True) for result in results]
+    finally:
+        for result in results:
+            close_shared(result)
+
+
+class _Serial(object):
+    """Run a task in this process, with the interface of an
+    `~multiprocessing.pool.AsyncResult`.
+    """
+    def __init__(self, func, task):
+        self.func = func
+        self.task = task
+
+    def get(self):
+        return self.func(self.task)